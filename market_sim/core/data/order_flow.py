@@ -0,0 +1,100 @@
+"""
+Historical order-flow files.
+
+Order events are read in chunks of ORDER_EVENT_DTYPE records, so replaying
+a file of any size holds only one chunk in memory. CSV files are memory
+mapped and each chunk, cut at a line boundary, is parsed by NumPy's C
+loader; Parquet files (with pyarrow installed) are read in record batches.
+
+Columns, in any order after a header line:
+    timestamp  ns since the epoch (UTC)
+    event      A = add limit order, C = cancel, M = modify, X = market order
+    order_id   the source's order id, used to match cancels and modifies
+    symbol
+    side       B or S (may be empty for cancels)
+    price      limit price; empty for market orders and cancels
+    quantity   order quantity, or the new quantity of a modify
+"""
+
+import io
+import mmap
+import os
+from typing import Iterator
+
+import numpy as np
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency, only needed for Parquet files
+    pq = None
+
+ORDER_EVENT_DTYPE = np.dtype([
+    ('timestamp', np.int64),  # ns since the epoch, UTC
+    ('event', 'S1'),
+    ('order_id', np.int64),
+    ('symbol', 'S16'),
+    ('side', 'S1'),
+    ('price', np.float64),    # NaN when absent
+    ('quantity', np.float64),
+])
+
+ADD, CANCEL, MODIFY, MARKET = b'A', b'C', b'M', b'X'
+
+_NAN = float('nan')
+
+def _number(text: str) -> float:
+    return float(text) if text else _NAN
+
+def read_order_events_csv(path: str, chunk_bytes: int = 1 << 22) -> Iterator[np.ndarray]:
+    """Yield the events of a CSV file in chunks of about `chunk_bytes`."""
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            header_end = data.find(b'\n')
+            if header_end < 0:
+                return
+            names = [name.strip() for name in data[:header_end].decode().split(',')]
+            missing = [name for name in ORDER_EVENT_DTYPE.names if name not in names]
+            if missing:
+                raise ValueError(f"Order flow file {path} lacks columns {missing}")
+            usecols = [names.index(name) for name in ORDER_EVENT_DTYPE.names]
+            # Price and quantity may be empty, which the C parser rejects
+            converters = {names.index('price'): _number, names.index('quantity'): _number}
+
+            size = len(data)
+            position = header_end + 1
+            while position < size:
+                end = min(position + chunk_bytes, size)
+                if end < size:
+                    cut = data.rfind(b'\n', position, end)
+                    if cut < 0:  # A line longer than the chunk
+                        cut = data.find(b'\n', end)
+                    end = size if cut < 0 else cut + 1
+                chunk = data[position:end]
+                position = end
+                if not chunk.strip():
+                    continue
+                yield np.loadtxt(io.BytesIO(chunk), dtype=ORDER_EVENT_DTYPE, delimiter=',', usecols=usecols,
+                                 converters=converters, ndmin=1)
+
+def read_order_events_parquet(path: str, batch_size: int = 1 << 18) -> Iterator[np.ndarray]:
+    """Yield the events of a Parquet file one record batch at a time. Requires pyarrow."""
+    if pq is None:
+        raise ImportError("Reading Parquet order flow requires pyarrow")
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=list(ORDER_EVENT_DTYPE.names)):
+        events = np.empty(batch.num_rows, dtype=ORDER_EVENT_DTYPE)
+        for name in ORDER_EVENT_DTYPE.names:
+            column = batch.column(name).to_numpy(zero_copy_only=False)
+            if name == 'timestamp' and np.issubdtype(column.dtype, np.datetime64):
+                column = column.astype('datetime64[ns]').view(np.int64)
+            elif ORDER_EVENT_DTYPE[name].kind == 'S':
+                column = np.array([(value or '').encode() for value in column], dtype=ORDER_EVENT_DTYPE[name])
+            events[name] = column
+        yield events
+
+def read_order_events(path: str, **kwargs) -> Iterator[np.ndarray]:
+    """Yield the events of a CSV or (by extension) Parquet file in chunks."""
+    if path.endswith(('.parquet', '.pq')):
+        return read_order_events_parquet(path, **kwargs)
+    return read_order_events_csv(path, **kwargs)
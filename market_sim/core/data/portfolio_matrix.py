@@ -0,0 +1,147 @@
+"""
+Columnar portfolio state.
+
+PortfolioMatrix mirrors every agent's cash and positions in float64 NumPy
+arrays laid out agents x symbols, so marking all portfolios to market is a
+handful of array operations instead of a Python loop over Decimal
+positions per agent. Agents push their state in after each fill, and
+their short-selling limit when it changes; the Position objects stay the
+exact record.
+"""
+
+from typing import Any, Dict, Iterable, List, NamedTuple
+
+import numpy as np
+from core.models.base import Position
+
+class PortfolioValuation(NamedTuple):
+    """Mark-to-market of all agents at one set of prices."""
+    market_value: np.ndarray    # agents x symbols
+    unrealized_pnl: np.ndarray  # agents x symbols
+    total_value: np.ndarray     # agents: cash plus market value
+
+class PortfolioMatrix:
+    """Cash and positions of many agents in agents x symbols arrays."""
+
+    def __init__(self, agent_capacity: int = 16, symbol_capacity: int = 16):
+        self.agent_ids: List[str] = []
+        self.symbols: List[str] = []
+        self._agent_index: Dict[str, int] = {}
+        self._symbol_index: Dict[str, int] = {}
+        self._cash = np.zeros(agent_capacity)
+        self._max_short = np.zeros(agent_capacity)
+        self._quantity = np.zeros((agent_capacity, symbol_capacity))
+        self._entry_price = np.zeros((agent_capacity, symbol_capacity))
+        self._realized_pnl = np.zeros((agent_capacity, symbol_capacity))
+
+    @property
+    def cash(self) -> np.ndarray:
+        return self._cash[:len(self.agent_ids)]
+
+    @property
+    def max_short(self) -> np.ndarray:
+        """How far below zero each agent's sells may take a position."""
+        return self._max_short[:len(self.agent_ids)]
+
+    @property
+    def quantity(self) -> np.ndarray:
+        return self._quantity[:len(self.agent_ids), :len(self.symbols)]
+
+    @property
+    def entry_price(self) -> np.ndarray:
+        return self._entry_price[:len(self.agent_ids), :len(self.symbols)]
+
+    @property
+    def realized_pnl(self) -> np.ndarray:
+        return self._realized_pnl[:len(self.agent_ids), :len(self.symbols)]
+
+    def agent_index(self, agent_id: str) -> int:
+        return self._agent_index[agent_id]
+
+    def symbol_index(self, symbol: str) -> int:
+        """Get (registering if needed) the column of a symbol."""
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            index = self._symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            if index == self._quantity.shape[1]:
+                self._grow(self._quantity.shape[0], max(index * 2, 16))
+        return index
+
+    def agent_rows(self, agent_ids: Iterable[str]) -> np.ndarray:
+        """Rows of many registered agents at once."""
+        return np.fromiter(map(self._agent_index.__getitem__, agent_ids), dtype=np.intp)
+
+    def symbol_columns(self, symbols: Iterable[str]) -> np.ndarray:
+        """Columns of many registered symbols at once."""
+        return np.fromiter(map(self._symbol_index.__getitem__, symbols), dtype=np.intp)
+
+    def add_agent(self, agent_id: str, balance, positions: Iterable[Position] = (), max_short=0) -> int:
+        """Register an agent with its current balance, positions and short limit, returning its row."""
+        if agent_id in self._agent_index:
+            raise ValueError(f"Agent {agent_id} is already registered")
+        row = self._agent_index[agent_id] = len(self.agent_ids)
+        self.agent_ids.append(agent_id)
+        if row == len(self._cash):
+            self._grow(max(row * 2, 16), self._quantity.shape[1])
+        self._cash[row] = float(balance)
+        self._max_short[row] = float(max_short)
+        for position in positions:
+            self.update(agent_id, position, balance)
+        return row
+
+    def update(self, agent_id: str, position: Position, balance) -> None:
+        """Mirror an agent's balance and one of its positions after a change."""
+        row = self._agent_index[agent_id]
+        column = self.symbol_index(position.symbol)
+        self._cash[row] = float(balance)
+        self._quantity[row, column] = float(position.quantity)
+        self._entry_price[row, column] = float(position.average_entry_price)
+        self._realized_pnl[row, column] = float(position.realized_pnl)
+
+    def set_max_short(self, agent_id: str, max_short) -> None:
+        """Mirror a change of an agent's short-selling limit."""
+        self._max_short[self._agent_index[agent_id]] = float(max_short)
+
+    def valuation(self, prices: np.ndarray) -> PortfolioValuation:
+        """Mark every portfolio to `prices` (per symbol column, NaN where unknown)."""
+        quantity = self.quantity
+        priced = ~np.isnan(prices)
+        market_value = np.where(priced, quantity * prices, 0.0)
+        unrealized_pnl = np.where(priced, (prices - self.entry_price) * quantity, 0.0)
+        return PortfolioValuation(market_value, unrealized_pnl, self.cash + market_value.sum(axis=1))
+
+    def summaries(self, prices: np.ndarray, valuation: PortfolioValuation) -> List[Dict[str, Any]]:
+        """Per-agent summaries in the shape of BaseAgent.get_portfolio_summary, as floats."""
+        quantity = self.quantity
+        shown = (quantity != 0) & ~np.isnan(prices) & (prices != 0)
+        summaries = []
+        for row, agent_id in enumerate(self.agent_ids):
+            positions = {}
+            for column in np.flatnonzero(shown[row]):
+                positions[self.symbols[column]] = {
+                    'quantity': float(quantity[row, column]),
+                    'avg_entry_price': float(self._entry_price[row, column]),
+                    'current_price': float(prices[column]),
+                    'market_value': float(valuation.market_value[row, column]),
+                    'unrealized_pnl': float(valuation.unrealized_pnl[row, column]),
+                    'realized_pnl': float(self._realized_pnl[row, column])
+                }
+            summaries.append({
+                'agent_id': agent_id,
+                'cash_balance': float(self._cash[row]),
+                'total_value': float(valuation.total_value[row]),
+                'positions': positions
+            })
+        return summaries
+
+    def _grow(self, agents: int, symbols: int) -> None:
+        old_agents, old_symbols = self._quantity.shape
+        for name in ('_cash', '_max_short'):
+            array = np.zeros(agents)
+            array[:old_agents] = getattr(self, name)
+            setattr(self, name, array)
+        for name in ('_quantity', '_entry_price', '_realized_pnl'):
+            array = np.zeros((agents, symbols))
+            array[:old_agents, :old_symbols] = getattr(self, name)
+            setattr(self, name, array)
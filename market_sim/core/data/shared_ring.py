@@ -0,0 +1,85 @@
+"""
+Shared-memory ring buffer.
+
+A single-producer/single-consumer queue of fixed-size NumPy records laid out
+in a multiprocessing SharedMemory block, so bulk data (trades, book events)
+can cross a process boundary without pickling.
+
+Layout: two int64 counters (records written, records read) followed by
+`capacity` records. The producer only advances the write counter and the
+consumer only advances the read counter; aligned 8-byte stores keep each
+counter update atomic.
+"""
+
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional
+
+import numpy as np
+
+_HEADER_BYTES = 16
+
+class SharedRingBuffer:
+    """SPSC ring of `dtype` records in shared memory."""
+
+    def __init__(self, dtype: np.dtype, capacity: int, name: Optional[str] = None):
+        """Create a new ring, or attach to the ring called `name`."""
+        self.dtype = np.dtype(dtype)
+        self.capacity = capacity
+        self._owner = name is None
+        if self._owner:
+            self._shm = SharedMemory(create=True, size=_HEADER_BYTES + capacity * self.dtype.itemsize)
+        else:
+            # Workers share their parent's resource tracker, so attaching
+            # registers nothing new and only the owner's unlink cleans up
+            self._shm = SharedMemory(name=name)
+        self._counters = np.ndarray(2, dtype=np.int64, buffer=self._shm.buf)
+        self._records = np.ndarray(capacity, dtype=self.dtype, buffer=self._shm.buf, offset=_HEADER_BYTES)
+        if self._owner:
+            self._counters[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def __len__(self) -> int:
+        return int(self._counters[0] - self._counters[1])
+
+    def write(self, records: np.ndarray) -> None:
+        """Append records, waiting for the consumer whenever the ring is full."""
+        counters, capacity = self._counters, self.capacity
+        written, total = 0, len(records)
+        while written < total:
+            head = int(counters[0])
+            free = capacity - (head - int(counters[1]))
+            if not free:
+                time.sleep(0.0001)
+                continue
+            start = head % capacity
+            chunk = min(free, total - written, capacity - start)
+            self._records[start:start + chunk] = records[written:written + chunk]
+            # Publish only after the records themselves are in place
+            counters[0] = head + chunk
+            written += chunk
+
+    def read(self) -> np.ndarray:
+        """Remove and return a copy of every record currently available."""
+        counters, capacity = self._counters, self.capacity
+        head, tail = int(counters[0]), int(counters[1])
+        available = head - tail
+        if not available:
+            return self._records[:0].copy()
+        start = tail % capacity
+        if start + available <= capacity:
+            records = self._records[start:start + available].copy()
+        else:
+            records = np.concatenate((self._records[start:], self._records[:start + available - capacity]))
+        counters[1] = head
+        return records
+
+    def close(self) -> None:
+        """Detach from the block, unlinking it if this ring created it."""
+        self._counters = self._records = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,192 @@
+"""
+Columnar trade storage.
+
+Trades are appended to a preallocated NumPy structured array that grows
+geometrically, instead of being kept as one Python object per fill.
+Trade objects are only materialized when a consumer asks for them.
+
+Prices and quantities are stored twice: as float64 for vectorized analysis,
+and exactly as a decimal coefficient and exponent, from which materialized
+Trades get back the very Decimals that were recorded.
+"""
+
+from collections.abc import Sequence
+from decimal import Context, Decimal
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from core.models.base import Trade
+from core.utils.time_utils import datetime_to_ns, ns_to_datetime
+
+TRADE_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('timestamp', 'datetime64[ns]'),  # UTC
+    ('price', np.float64),            # Nearest float, for analysis
+    ('quantity', np.float64),
+    ('buyer_order_id', np.int64),
+    ('seller_order_id', np.int64),
+    ('symbol', np.int32),             # Index into TradeTape.symbols
+    ('price_digits', np.int64),       # Exact price, see decimal_to_fields
+    ('price_high_digits', np.int64),
+    ('price_exponent', np.int8),
+    ('quantity_digits', np.int64),    # Exact quantity
+    ('quantity_high_digits', np.int64),
+    ('quantity_exponent', np.int8),
+])
+
+# A decimal coefficient is split into two int64 words of 18 digits each
+_WORD = 10 ** 18
+_EXACT = Context(prec=80)
+NO_EXPONENT = -128  # Exponent field of a missing (None) value
+
+def decimal_to_fields(value: Optional[Decimal]) -> Tuple[int, int, int]:
+    """Exact (low digits, high digits, exponent) fields of a Decimal.
+
+    The value is (high * 10**18 + low) * 10**exponent, with both words
+    carrying its sign, so any Decimal of up to 36 digits round-trips,
+    exponent included. None is stored with exponent NO_EXPONENT.
+    """
+    if value is None:
+        return 0, 0, NO_EXPONENT
+    exponent = value.as_tuple()[2]
+    coefficient = int(value.scaleb(-exponent, _EXACT))
+    if not NO_EXPONENT < exponent <= 127 or abs(coefficient) >= _WORD * _WORD:
+        raise ValueError(f"{value} cannot be stored exactly")
+    high, low = divmod(abs(coefficient), _WORD)
+    return (-low, -high, exponent) if coefficient < 0 else (low, high, exponent)
+
+def decimal_from_fields(low, high, exponent) -> Optional[Decimal]:
+    """The Decimal stored by decimal_to_fields."""
+    exponent = int(exponent)
+    if exponent == NO_EXPONENT:
+        return None
+    return Decimal(f"{int(high) * _WORD + int(low)}E{exponent}")
+
+def trade_from_record(row, symbols: List[str]) -> Trade:
+    """Build a Trade object from one TRADE_DTYPE record."""
+    return Trade(
+        id=int(row['id']),
+        symbol=symbols[row['symbol']],
+        price=decimal_from_fields(row['price_digits'], row['price_high_digits'], row['price_exponent']),
+        quantity=decimal_from_fields(row['quantity_digits'], row['quantity_high_digits'], row['quantity_exponent']),
+        buyer_order_id=int(row['buyer_order_id']),
+        seller_order_id=int(row['seller_order_id']),
+        timestamp=ns_to_datetime(int(row['timestamp'].astype(np.int64)))
+    )
+
+class TradeTape:
+    """Growable columnar store of trades backed by a NumPy structured array."""
+
+    def __init__(self, capacity: int = 1024):
+        self._data = np.empty(max(capacity, 1), dtype=TRADE_DTYPE)
+        self._size = 0
+        self.symbols: List[str] = []
+        self._symbol_index: Dict[str, int] = {}
+        self._last_timestamp = None
+        self._last_ns = 0
+        self._last_price = None
+        self._last_price_fields = (0, 0, NO_EXPONENT)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Trade, 'TradeView']:
+        return self.trades()[index]
+
+    def __iter__(self) -> Iterator[Trade]:
+        return iter(self.trades())
+
+    def symbol_index(self, symbol: str) -> int:
+        """Get (registering if needed) the integer code of a symbol."""
+        index = self._symbol_index.get(symbol)
+        if index is None:
+            index = self._symbol_index[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return index
+
+    def append(self, trade: Trade) -> None:
+        """Append a single trade."""
+        if self._size == len(self._data):
+            self._grow(self._size + 1)
+        self._data[self._size] = self._row(trade)
+        self._size += 1
+
+    def extend(self, trades: Iterable[Trade]) -> None:
+        """Append a batch of trades with one array assignment."""
+        rows = [self._row(trade) for trade in trades]
+        if not rows:
+            return
+        end = self._size + len(rows)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size:end] = rows
+        self._size = end
+
+    def extend_records(self, records: np.ndarray) -> None:
+        """Append TRADE_DTYPE records whose symbol codes index `self.symbols`."""
+        end = self._size + len(records)
+        if end > len(self._data):
+            self._grow(end)
+        self._data[self._size:end] = records
+        self._size = end
+
+    def record(self, trade: Trade) -> tuple:
+        """Encode a trade as a TRADE_DTYPE record tuple against this tape's symbols."""
+        return self._row(trade)
+
+    def view(self) -> np.ndarray:
+        """Zero-copy view of the filled part of the tape.
+
+        The view stays valid after further appends but will not see them once
+        the tape has grown into a new buffer.
+        """
+        return self._data[:self._size]
+
+    def trades(self) -> 'TradeView':
+        """Lazy sequence of Trade objects over the current contents."""
+        return TradeView(self.view(), self.symbols)
+
+    def _row(self, trade: Trade) -> tuple:
+        timestamp = trade.timestamp
+        if timestamp is not self._last_timestamp:
+            # Fills from one order share a timestamp object; convert it once
+            self._last_timestamp = timestamp
+            self._last_ns = datetime_to_ns(timestamp)
+        price = trade.price
+        if price is not self._last_price:
+            # Fills against one price level share its price
+            self._last_price = price
+            self._last_price_fields = decimal_to_fields(price)
+        return (trade.id, self._last_ns, price, trade.quantity,
+                trade.buyer_order_id, trade.seller_order_id, self.symbol_index(trade.symbol),
+                *self._last_price_fields, *decimal_to_fields(trade.quantity))
+
+    def _grow(self, minimum: int) -> None:
+        capacity = len(self._data)
+        while capacity < minimum:
+            capacity *= 2
+        data = np.empty(capacity, dtype=TRADE_DTYPE)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+class TradeView(Sequence):
+    """Read-only sequence adapter that builds Trade objects on access."""
+
+    def __init__(self, rows: np.ndarray, symbols: List[str]):
+        self.rows = rows
+        self.symbols = symbols
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Trade, 'TradeView']:
+        if isinstance(index, slice):
+            return TradeView(self.rows[index], self.symbols)
+        return self._materialize(self.rows[index])
+
+    def __iter__(self) -> Iterator[Trade]:
+        for row in self.rows:
+            yield self._materialize(row)
+
+    def _materialize(self, row) -> Trade:
+        return trade_from_record(row, self.symbols)
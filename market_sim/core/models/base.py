@@ -2,12 +2,14 @@
 Base models for market simulation entities.
 """
 
-from dataclasses import dataclass
+import heapq
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from decimal import Decimal
 from enum import Enum
-from typing import Optional, List, Dict, Union
-from uuid import UUID, uuid4
+from itertools import count
+from typing import Optional, List, Dict, Union, Iterator, Tuple
+from uuid import UUID
 from core.utils.time_utils import utc_now
 from core.utils.time_utils import utc_now
 
@@ -27,11 +29,68 @@ class OrderStatus(Enum):
     FILLED = "filled"
     CANCELLED = "cancelled"
     REJECTED = "rejected"
+    EXPIRED = "expired"
 
-@dataclass
+class TimeInForce(Enum):
+    GTC = "gtc"              # Good till cancelled
+    IOC = "ioc"              # Immediate or cancel: unfilled remainder is cancelled
+    FOK = "fok"              # Fill or kill: fills completely at once or not at all
+    POST_ONLY = "post_only"  # Rejected if it would take liquidity
+    GTD = "gtd"              # Good till date: expires at `expires_at`
+
+_ZERO = Decimal('0')
+
+class IdSequences:
+    """Order and trade id counters.
+
+    Ids are cheap sequences; UUIDs are only rendered on request. One set of
+    sequences is current in a process and numbers every order and trade
+    created; a MarketSimulation makes its own current while it runs.
+    """
+    __slots__ = ('orders', 'trades', 'trade_step')
+
+    def __init__(self, start: int = 1, trade_start: Optional[int] = None, trade_step: int = 1):
+        self.orders = count(start)
+        self.trades = count(start if trade_start is None else trade_start, trade_step)
+        self.trade_step = trade_step
+
+    def state(self) -> Tuple[int, int]:
+        """Next order and trade ids, as IdSequences(*state) continues them."""
+        next_order_id, next_trade_id = next(self.orders), next(self.trades)
+        self.orders = count(next_order_id)
+        self.trades = count(next_trade_id, self.trade_step)
+        return next_order_id, next_trade_id
+
+    def __getstate__(self) -> Tuple[int, int, int]:
+        return (*self.state(), self.trade_step)
+
+    def __setstate__(self, state: Tuple[int, int, int]) -> None:
+        self.__init__(*state[:2], trade_step=state[2])
+
+_ids = IdSequences()
+
+def use_id_sequences(sequences: IdSequences) -> IdSequences:
+    """Make `sequences` current for new orders and trades, returning the previous ones."""
+    global _ids
+    previous, _ids = _ids, sequences
+    return previous
+
+def current_id_sequences() -> IdSequences:
+    """The id sequences new orders and trades are numbered from."""
+    return _ids
+
+def reset_id_sequences(start: int = 1, trade_start: Optional[int] = None) -> None:
+    """Restart the current order and trade ids, so a reproducible run also reproduces its ids."""
+    use_id_sequences(IdSequences(start, trade_start))
+
+def id_sequence_state() -> Tuple[int, int]:
+    """Next order and trade ids, as reset_id_sequences(*state) restores them."""
+    return _ids.state()
+
+@dataclass(slots=True)
 class Order:
     """Base class for market orders."""
-    id: UUID
+    id: int
     symbol: str
     side: OrderSide
     type: OrderType
@@ -44,12 +103,20 @@ class Order:
     created_at: datetime
     updated_at: datetime
     agent_id: str
+    time_in_force: TimeInForce = TimeInForce.GTC
+    expires_at: Optional[datetime] = None
+    
+    @property
+    def uuid(self) -> UUID:
+        """UUID rendering of the order id for external consumers."""
+        return UUID(int=self.id)
     
     @classmethod
-    def create_market_order(cls, symbol: str, side: OrderSide, quantity: Decimal, agent_id: str) -> 'Order':
-        now = utc_now()
+    def create_market_order(cls, symbol: str, side: OrderSide, quantity: Decimal, agent_id: str,
+                            timestamp: Optional[datetime] = None) -> 'Order':
+        now = timestamp or utc_now()
         return cls(
-            id=uuid4(),
+            id=next(_ids.orders),
             symbol=symbol,
             side=side,
             type=OrderType.MARKET,
@@ -57,7 +124,7 @@ class Order:
             price=None,
             stop_price=None,
             status=OrderStatus.PENDING,
-            filled_quantity=Decimal('0'),
+            filled_quantity=_ZERO,
             remaining_quantity=quantity,
             created_at=now,
             updated_at=now,
@@ -66,10 +133,13 @@ class Order:
     
     @classmethod
     def create_limit_order(cls, symbol: str, side: OrderSide, quantity: Decimal, 
-                          price: Decimal, agent_id: str) -> 'Order':
-        now = utc_now()
+                          price: Decimal, agent_id: str,
+                          timestamp: Optional[datetime] = None,
+                          time_in_force: TimeInForce = TimeInForce.GTC,
+                          expires_at: Optional[datetime] = None) -> 'Order':
+        now = timestamp or utc_now()
         return cls(
-            id=uuid4(),
+            id=next(_ids.orders),
             symbol=symbol,
             side=side,
             type=OrderType.LIMIT,
@@ -77,75 +147,317 @@ class Order:
             price=price,
             stop_price=None,
             status=OrderStatus.PENDING,
-            filled_quantity=Decimal('0'),
+            filled_quantity=_ZERO,
             remaining_quantity=quantity,
             created_at=now,
             updated_at=now,
-            agent_id=agent_id
+            agent_id=agent_id,
+            time_in_force=time_in_force,
+            expires_at=expires_at
         )
 
-@dataclass
+    @classmethod
+    def create_stop_order(cls, symbol: str, side: OrderSide, quantity: Decimal,
+                          stop_price: Decimal, agent_id: str,
+                          limit_price: Optional[Decimal] = None,
+                          timestamp: Optional[datetime] = None,
+                          time_in_force: TimeInForce = TimeInForce.GTC,
+                          expires_at: Optional[datetime] = None) -> 'Order':
+        """Create a stop order, or a stop-limit order when `limit_price` is given."""
+        now = timestamp or utc_now()
+        return cls(
+            id=next(_ids.orders),
+            symbol=symbol,
+            side=side,
+            type=OrderType.STOP if limit_price is None else OrderType.STOP_LIMIT,
+            quantity=quantity,
+            price=limit_price,
+            stop_price=stop_price,
+            status=OrderStatus.PENDING,
+            filled_quantity=_ZERO,
+            remaining_quantity=quantity,
+            created_at=now,
+            updated_at=now,
+            agent_id=agent_id,
+            time_in_force=time_in_force,
+            expires_at=expires_at
+        )
+
+@dataclass(slots=True)
 class Trade:
     """Represents a completed trade between two orders."""
-    id: UUID
+    id: int
     symbol: str
     price: Decimal
     quantity: Decimal
-    buyer_order_id: UUID
-    seller_order_id: UUID
+    buyer_order_id: int
+    seller_order_id: int
     timestamp: datetime
     
+    @property
+    def uuid(self) -> UUID:
+        """UUID rendering of the trade id for external consumers."""
+        return UUID(int=self.id)
+    
     @classmethod
     def create(cls, symbol: str, price: Decimal, quantity: Decimal, 
-               buyer_order_id: UUID, seller_order_id: UUID) -> 'Trade':
+               buyer_order_id: int, seller_order_id: int,
+               timestamp: Optional[datetime] = None) -> 'Trade':
         return cls(
-            id=uuid4(),
+            id=next(_ids.trades),
             symbol=symbol,
             price=price,
             quantity=quantity,
             buyer_order_id=buyer_order_id,
             seller_order_id=seller_order_id,
-            timestamp=datetime.utcnow()
+            timestamp=timestamp or utc_now()
         )
 
+class OrderNode:
+    """Intrusive queue node linking a resting order into its price level."""
+    __slots__ = ('order', 'level', 'quantity', 'prev', 'next')
+
+    def __init__(self, order: Order, level: 'PriceLevel', quantity):
+        self.order = order
+        self.level = level
+        self.quantity = quantity  # Remaining quantity in book units (Decimal or lots)
+        self.prev: Optional[OrderNode] = None
+        self.next: Optional[OrderNode] = None
+
+class PriceLevel:
+    """FIFO queue of resting orders at a single price.
+
+    Orders are kept in a doubly linked list of OrderNodes so that an order
+    can be unlinked in O(1) from anywhere in the queue given its node.
+    `total` is the aggregate remaining quantity in book units; whoever
+    reduces a node's quantity must reduce it too.
+    """
+    __slots__ = ('price', 'head', 'tail', 'count', 'total')
+
+    def __init__(self, price: Decimal):
+        self.price = price
+        self.head: Optional[OrderNode] = None
+        self.tail: Optional[OrderNode] = None
+        self.count = 0
+        self.total = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Order]:
+        node = self.head
+        while node is not None:
+            yield node.order
+            node = node.next
+
+    def nodes(self) -> Iterator[OrderNode]:
+        """Iterate the level's queue nodes in time priority."""
+        node = self.head
+        while node is not None:
+            yield node
+            node = node.next
+
+    def append(self, order: Order, quantity) -> OrderNode:
+        """Queue an order at the back of the level."""
+        node = OrderNode(order, self, quantity)
+        tail = self.tail
+        if tail is None:
+            self.head = node
+        else:
+            tail.next = node
+            node.prev = tail
+        self.tail = node
+        self.count += 1
+        self.total += quantity
+        return node
+
+    def unlink(self, node: OrderNode) -> None:
+        """Remove a node from the level in O(1)."""
+        prev, nxt = node.prev, node.next
+        if prev is None:
+            self.head = nxt
+        else:
+            prev.next = nxt
+        if nxt is None:
+            self.tail = prev
+        else:
+            nxt.prev = prev
+        node.prev = node.next = None
+        self.count -= 1
+        self.total -= node.quantity
+
+class BookSide:
+    """One side of an order book with price levels kept in priority order.
+
+    Levels are stored in a dict keyed by price and their prices in a heap
+    (negated for bids), so the best level is available in O(1) and levels
+    are inserted in O(log n). Levels emptied away from the top of the book
+    are dropped from the heap lazily. `version` is bumped on every change to
+    the side so readers can cache derived views.
+    """
+
+    def __init__(self, side: OrderSide):
+        self.side = side
+        self.version = 0
+        self.levels: Dict[Decimal, PriceLevel] = {}
+        self._sign = -1 if side == OrderSide.BUY else 1
+        self._heap: List[Decimal] = []
+        self._in_heap = set()
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def __contains__(self, price: Decimal) -> bool:
+        return price in self.levels
+
+    def __getitem__(self, price: Decimal) -> PriceLevel:
+        return self.levels[price]
+
+    def __iter__(self) -> Iterator[Decimal]:
+        return self.prices()
+
+    def get(self, price: Decimal, default=None) -> Optional[PriceLevel]:
+        return self.levels.get(price, default)
+
+    def keys(self) -> Iterator[Decimal]:
+        return self.prices()
+
+    def values(self) -> Iterator[PriceLevel]:
+        return (self.levels[price] for price in self.prices())
+
+    def items(self) -> Iterator[Tuple[Decimal, PriceLevel]]:
+        return ((price, self.levels[price]) for price in self.prices())
+
+    def best_price(self) -> Optional[Decimal]:
+        """Best (highest bid / lowest ask) price, or None if the side is empty."""
+        return self._heap[0] * self._sign if self._heap else None
+
+    def best_level(self) -> Optional[PriceLevel]:
+        """Price level at the top of this side of the book."""
+        return self.levels[self._heap[0] * self._sign] if self._heap else None
+
+    def get_or_create_level(self, price: Decimal) -> PriceLevel:
+        """Get the level at a price, inserting it in O(log n) if missing."""
+        level = self.levels.get(price)
+        if level is None:
+            level = self.levels[price] = PriceLevel(price)
+            if price not in self._in_heap:
+                self._in_heap.add(price)
+                heapq.heappush(self._heap, price * self._sign)
+        return level
+
+    def remove_level(self, price: Decimal) -> None:
+        """Remove an (empty) price level from this side."""
+        del self.levels[price]
+        heap = self._heap
+        # Keep the invariant that the top of the heap is a live level
+        while heap and heap[0] * self._sign not in self.levels:
+            self._in_heap.discard(heapq.heappop(heap) * self._sign)
+        if len(heap) > 2 * len(self.levels) + 64:
+            self._compact()
+
+    def prices(self) -> Iterator[Decimal]:
+        """Iterate live prices best-first without sorting the whole side."""
+        heap, sign, levels = self._heap, self._sign, self.levels
+        if not heap:
+            return
+        # Best-first walk of the heap tree: only visited nodes are ordered
+        frontier = [(heap[0], 0)]
+        size = len(heap)
+        while frontier:
+            key, index = heapq.heappop(frontier)
+            price = key * sign
+            if price in levels:
+                yield price
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < size:
+                    heapq.heappush(frontier, (heap[child], child))
+
+    def _compact(self) -> None:
+        """Rebuild the heap from live levels once stale entries dominate."""
+        self._heap = [price * self._sign for price in self.levels]
+        heapq.heapify(self._heap)
+        self._in_heap = set(self.levels)
+
 @dataclass
 class OrderBook:
     """Represents the order book for a single symbol."""
     symbol: str
-    bids: Dict[Decimal, List[Order]]  # Price -> Orders
-    asks: Dict[Decimal, List[Order]]  # Price -> Orders
+    bids: BookSide
+    asks: BookSide
     last_updated: datetime
+    order_index: Dict[int, OrderNode] = field(default_factory=dict)  # Order id -> queue node
     
     @classmethod
-    def create(cls, symbol: str) -> 'OrderBook':
+    def create(cls, symbol: str, timestamp: Optional[datetime] = None) -> 'OrderBook':
         return cls(
             symbol=symbol,
-            bids={},
-            asks={},
-            last_updated=datetime.utcnow()
+            bids=BookSide(OrderSide.BUY),
+            asks=BookSide(OrderSide.SELL),
+            last_updated=timestamp or utc_now()
         )
     
-    def add_order(self, order: Order) -> None:
-        """Add an order to the book."""
+    def side(self, side: OrderSide) -> BookSide:
+        """Get the book side holding orders of the given side."""
+        return self.bids if side == OrderSide.BUY else self.asks
+    
+    def add_order(self, order: Order, price=None, quantity=None,
+                  timestamp: Optional[datetime] = None) -> None:
+        """Add an order to the book.
+
+        `price` and `quantity` are the book's keys for the order and default to
+        its Decimal price and remaining quantity; a fixed-point engine passes
+        integer ticks and lots instead.
+        """
         book = self.bids if order.side == OrderSide.BUY else self.asks
-        if order.price not in book:
-            book[order.price] = []
-        book[order.price].append(order)
-        self.last_updated = utc_now()
+        if price is None:
+            price = order.price
+        if quantity is None:
+            quantity = order.remaining_quantity
+        node = book.get_or_create_level(price).append(order, quantity)
+        book.version += 1
+        self.order_index[order.id] = node
+        self.last_updated = timestamp or utc_now()
     
     def get_orders_at_price(self, side: OrderSide, price: Decimal) -> List[Order]:
         """Get all orders at a specific price level."""
         book = self.bids if side == OrderSide.BUY else self.asks
-        return book.get(price, [])
+        level = book.get(price)
+        return list(level) if level is not None else []
     
-    def remove_order(self, order: Order) -> None:
+    def get_order(self, order_id: int) -> Optional[Order]:
+        """Look up a resting order by id."""
+        node = self.order_index.get(order_id)
+        return node.order if node is not None else None
+    
+    def remove_order(self, order: Order, timestamp: Optional[datetime] = None) -> None:
         """Remove an order from the book."""
-        orders = self.bids if order.side == OrderSide.BUY else self.asks
-        if order.price in orders:
-            orders[order.price] = [o for o in orders[order.price] if o.id != order.id]
-            if not orders[order.price]:
-                del orders[order.price]
-        self.last_updated = datetime.utcnow()
+        node = self.order_index.pop(order.id, None)
+        if node is not None:
+            self._unlink(node)
+        self.last_updated = timestamp or utc_now()
+    
+    def remove_order_by_id(self, order_id: int, timestamp: Optional[datetime] = None) -> Optional[Order]:
+        """Remove an order from the book by id in O(1), returning it if found."""
+        node = self.order_index.pop(order_id, None)
+        if node is None:
+            return None
+        self._unlink(node)
+        self.last_updated = timestamp or utc_now()
+        return node.order
+    
+    def remove_node(self, node: OrderNode) -> None:
+        """Remove a resting order given its queue node, without restamping the book."""
+        del self.order_index[node.order.id]
+        self._unlink(node)
+    
+    def _unlink(self, node: OrderNode) -> None:
+        level = node.level
+        level.unlink(node)
+        book = self.bids if node.order.side == OrderSide.BUY else self.asks
+        book.version += 1
+        if not level.count:
+            book.remove_level(level.price)
 
 @dataclass
 class Asset:
@@ -170,7 +482,7 @@ class Position:
     last_updated: datetime
     
     @classmethod
-    def create(cls, agent_id: str, symbol: str) -> 'Position':
+    def create(cls, agent_id: str, symbol: str, timestamp: Optional[datetime] = None) -> 'Position':
         return cls(
             agent_id=agent_id,
             symbol=symbol,
@@ -178,21 +490,28 @@ class Position:
             average_entry_price=Decimal('0'),
             unrealized_pnl=Decimal('0'),
             realized_pnl=Decimal('0'),
-            last_updated=utc_now()
+            last_updated=timestamp or utc_now()
         )
     
-    def update(self, trade_quantity: Decimal, trade_price: Decimal, side: OrderSide) -> None:
-        """Update position after a trade."""
-        if side == OrderSide.BUY:
+    def update(self, trade_quantity: Decimal, trade_price: Decimal, side: OrderSide,
+               timestamp: Optional[datetime] = None) -> None:
+        """Update position after a trade; short positions have negative quantity."""
+        signed_quantity = trade_quantity if side == OrderSide.BUY else -trade_quantity
+        if self.quantity == 0 or (self.quantity > 0) == (signed_quantity > 0):
+            # Opening or adding to the position: average the entry price
+            quantity = self.quantity + signed_quantity
+            total_cost = self.average_entry_price * abs(self.quantity) + trade_price * trade_quantity
+            self.average_entry_price = total_cost / abs(quantity)
+            self.quantity = quantity
+        else:
+            # Reducing, closing or reversing the position
+            closed = min(trade_quantity, abs(self.quantity))
+            direction = 1 if self.quantity > 0 else -1
+            self.realized_pnl += (trade_price - self.average_entry_price) * closed * direction
+            self.quantity += signed_quantity
             if self.quantity == 0:
+                self.average_entry_price = Decimal('0')
+            elif (self.quantity > 0) != (direction > 0):
                 self.average_entry_price = trade_price
-            else:
-                total_cost = self.average_entry_price * self.quantity + trade_price * trade_quantity
-                self.quantity += trade_quantity
-                self.average_entry_price = total_cost / self.quantity
-        else:  # SELL
-            realized_pnl = (trade_price - self.average_entry_price) * trade_quantity
-            self.realized_pnl += realized_pnl
-            self.quantity -= trade_quantity
             
-        self.last_updated = utc_now() 
\ No newline at end of file
+        self.last_updated = timestamp or utc_now() 
\ No newline at end of file
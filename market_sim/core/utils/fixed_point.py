@@ -0,0 +1,46 @@
+"""Fixed-point conversion between Decimal prices/quantities and integer ticks/lots."""
+
+from decimal import Decimal
+from typing import Optional
+
+class FixedPointScale:
+    """Maps prices to integer ticks and quantities to integer lots.
+
+    Conversions are exact: values that are not a whole number of ticks or
+    lots raise ValueError instead of being rounded.
+    """
+    __slots__ = ('tick_size', 'lot_size')
+
+    def __init__(self, tick_size: Decimal, lot_size: Decimal = Decimal('1')):
+        if tick_size <= 0 or lot_size <= 0:
+            raise ValueError("tick_size and lot_size must be positive")
+        self.tick_size = tick_size
+        self.lot_size = lot_size
+
+    @classmethod
+    def from_asset(cls, asset, lot_size: Optional[Decimal] = None) -> 'FixedPointScale':
+        """Build a scale from an Asset's tick size (lots default to its min trade size)."""
+        tick_size = asset.tick_size or Decimal(1).scaleb(-asset.decimals)
+        return cls(tick_size, lot_size or asset.min_trade_size)
+
+    def to_ticks(self, price: Decimal) -> int:
+        """Convert a price to a whole number of ticks."""
+        ticks, remainder = divmod(price, self.tick_size)
+        if remainder:
+            raise ValueError(f"Price {price} is not a multiple of tick size {self.tick_size}")
+        return int(ticks)
+
+    def from_ticks(self, ticks: int) -> Decimal:
+        """Convert ticks back to a price."""
+        return ticks * self.tick_size
+
+    def to_lots(self, quantity: Decimal) -> int:
+        """Convert a quantity to a whole number of lots."""
+        lots, remainder = divmod(quantity, self.lot_size)
+        if remainder:
+            raise ValueError(f"Quantity {quantity} is not a multiple of lot size {self.lot_size}")
+        return int(lots)
+
+    def from_lots(self, lots: int) -> Decimal:
+        """Convert lots back to a quantity."""
+        return lots * self.lot_size
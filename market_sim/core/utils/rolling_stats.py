@@ -0,0 +1,114 @@
+"""
+Streaming volatility estimators.
+
+Both estimators take one price at a time and give the standard deviation
+of its log returns in O(1) per update, without keeping or rescanning a
+price history. RollingVolatility covers a fixed window of recent returns;
+EwmaVolatility weights all returns with exponentially decaying weights.
+"""
+
+import math
+from typing import List, Optional
+
+class RollingVolatility:
+    """Population standard deviation of the log returns of the last `window` prices.
+
+    Matches np.std(np.diff(np.log(prices[-window:]))). The window's
+    `window - 1` returns sit in a ring buffer; a sliding Welford update adds
+    the newest and drops the oldest, and the sums are recomputed from the
+    buffer once per lap of the ring so rounding cannot accumulate.
+    """
+    __slots__ = ('window', '_returns', '_head', '_count', '_mean', '_m2', '_last_log')
+
+    def __init__(self, window: int):
+        if window < 2:
+            raise ValueError("window must cover at least two prices")
+        self.window = window
+        self._returns: List[float] = [0.0] * (window - 1)
+        self._head = 0      # Slot of the next return, i.e. the oldest once full
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0      # Sum of squared deviations from the mean
+        self._last_log: Optional[float] = None
+
+    def __len__(self) -> int:
+        """Number of returns currently in the window."""
+        return self._count
+
+    def update(self, price: float) -> None:
+        log_price = math.log(price)
+        last = self._last_log
+        self._last_log = log_price
+        if last is None:
+            return
+        value = log_price - last
+        capacity = len(self._returns)
+        head = self._head
+        if self._count < capacity:
+            self._count += 1
+            delta = value - self._mean
+            self._mean += delta / self._count
+            self._m2 += delta * (value - self._mean)
+        else:
+            oldest = self._returns[head]
+            mean = self._mean
+            self._mean = mean + (value - oldest) / capacity
+            self._m2 += (value - oldest) * (value - self._mean + oldest - mean)
+        self._returns[head] = value
+        self._head = head = (head + 1) % capacity
+        if head == 0 and self._count == capacity:
+            self._resync()
+
+    def _resync(self) -> None:
+        """Recompute the mean and squared deviations exactly from the buffer."""
+        returns = self._returns
+        mean = math.fsum(returns) / len(returns)
+        self._mean = mean
+        self._m2 = math.fsum((value - mean) ** 2 for value in returns)
+
+    def std(self) -> float:
+        if self._count == 0:
+            return 0.0
+        return math.sqrt(max(self._m2, 0.0) / self._count)
+
+class EwmaVolatility:
+    """Exponentially weighted standard deviation of log returns.
+
+    Each return updates the weighted mean and variance with weight `alpha`
+    (2 / (span + 1) when given a span), so recent moves count most.
+    """
+    __slots__ = ('alpha', '_count', '_mean', '_variance', '_last_log')
+
+    def __init__(self, span: Optional[float] = None, alpha: Optional[float] = None):
+        if (span is None) == (alpha is None):
+            raise ValueError("Give exactly one of span and alpha")
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        if not 0.0 < self.alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self._count = 0
+        self._mean = 0.0
+        self._variance = 0.0
+        self._last_log: Optional[float] = None
+
+    def __len__(self) -> int:
+        """Number of returns seen."""
+        return self._count
+
+    def update(self, price: float) -> None:
+        log_price = math.log(price)
+        last = self._last_log
+        self._last_log = log_price
+        if last is None:
+            return
+        value = log_price - last
+        self._count += 1
+        if self._count == 1:
+            self._mean = value
+            return
+        delta = value - self._mean
+        increment = self.alpha * delta
+        self._mean += increment
+        self._variance = (1.0 - self.alpha) * (self._variance + delta * increment)
+
+    def std(self) -> float:
+        return math.sqrt(self._variance)
@@ -1,7 +1,46 @@
 """Time utilities for market simulation."""
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 def utc_now() -> datetime:
     """Get current UTC timestamp."""
-    return datetime.now(timezone.utc) #UTC Universal Time Coordinated
\ No newline at end of file
+    return datetime.now(timezone.utc) #UTC Universal Time Coordinated
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+def datetime_to_ns(timestamp: datetime) -> int:
+    """Convert a datetime (naive values are taken as UTC) to ns since the epoch."""
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (timestamp - _EPOCH) // _MICROSECOND * 1000
+
+def ns_to_datetime(ns: int) -> datetime:
+    """Convert ns since the epoch to an aware UTC datetime."""
+    return _EPOCH + timedelta(microseconds=ns // 1000)
+
+class SimulationClock:
+    """Simulated time source shared by a simulation, its exchanges and agents.
+
+    Instances are callable, so they can be passed anywhere a `utc_now`-style
+    clock function is expected.
+    """
+
+    def __init__(self, start: datetime):
+        self.current_time = start
+
+    def __call__(self) -> datetime:
+        return self.current_time
+
+    def now(self) -> datetime:
+        """Get the current simulated time."""
+        return self.current_time
+
+    def set(self, timestamp: datetime) -> None:
+        """Move the clock to `timestamp`."""
+        self.current_time = timestamp
+
+    def advance(self, step: timedelta) -> datetime:
+        """Move the clock forward by `step` and return the new time."""
+        self.current_time += step
+        return self.current_time
@@ -2,12 +2,16 @@
 Base trading agent class.
 """
 
+import random
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any
 from decimal import Decimal
 from datetime import datetime
-from core.models.base import Order, Trade, Position, OrderSide, OrderType, OrderStatus
+from core.data.portfolio_matrix import PortfolioMatrix
+from core.data.trade_tape import TradeTape
+from core.models.base import Order, Trade, Position, OrderSide, OrderType, OrderStatus, TimeInForce
 from core.utils.time_utils import utc_now
+from market.exchange.market_data import BookDelta, LocalOrderBook, Subscription
 
 class BaseAgent(ABC):
     def __init__(self, agent_id: str, initial_balance: Decimal):
@@ -15,35 +19,93 @@ class BaseAgent(ABC):
         self.balance = initial_balance
         self.positions: Dict[str, Position] = {}  # symbol -> Position
         self.orders: Dict[str, Order] = {}  # order_id -> Order
-        self.trades: List[Trade] = []
-        self.last_update = utc_now()
+        self.trades = TradeTape(capacity=64)
+        self.local_books: Dict[str, LocalOrderBook] = {}  # symbol -> book rebuilt from deltas
+        # Time source and random stream; MarketSimulation.add_agent replaces
+        # them with the simulation clock and a per-agent seeded stream
+        self.clock: Callable[[], datetime] = utc_now
+        self.rng = random.Random()
+        # Columnar copy of balance and positions kept by MarketSimulation
+        self.portfolio_mirror: Optional[PortfolioMatrix] = None
+        # Set by MarketSimulation.add_agent to receive request_wakeup calls
+        self.wakeup_scheduler: Optional[Callable[['BaseAgent', datetime], None]] = None
+        # Set by MarketSimulation.add_agent; submit_order and cancel_order go through it
+        self.order_gateway: Optional[Any] = None
+        self._max_short_position = Decimal('0')
+        self.last_update = self.clock()
         
+    @property
+    def max_short_position(self) -> Decimal:
+        """How far below zero sells may take a position (0: no short selling)."""
+        return self._max_short_position
+    
+    @max_short_position.setter
+    def max_short_position(self, value: Decimal) -> None:
+        self._max_short_position = value
+        if self.portfolio_mirror is not None:
+            self.portfolio_mirror.set_max_short(self.agent_id, value)
+    
+    def market_data_subscriptions(self) -> List[Subscription]:
+        """Market data the simulation should send this agent.
+        
+        The default is every symbol's book; override to narrow it down or
+        to receive public trades.
+        """
+        return [Subscription()]
+    
     @abstractmethod
     def on_order_book_update(self, symbol: str, bids: List[tuple], asks: List[tuple]) -> None:
         """Called when order book is updated."""
         pass
     
+    def on_book_delta(self, symbol: str, deltas: List[BookDelta]) -> Optional[Order]:
+        """Called with the book events for a symbol since the last update.
+        
+        The default applies them to a local book and forwards its top levels
+        to on_order_book_update, so snapshot-based agents work unchanged.
+        """
+        book = self.local_books.get(symbol)
+        if book is None:
+            book = self.local_books[symbol] = LocalOrderBook(symbol)
+        book.apply(deltas)
+        bids, asks = book.snapshot()
+        return self.on_order_book_update(symbol, bids, asks)
+    
     @abstractmethod
     def on_trade(self, trade: Trade) -> None:
-        """Called when a trade occurs."""
+        """Called with public trades, once subscribed through MarketSimulation.subscribe_trades."""
         pass
     
+    def on_trades(self, trades: List[Trade]) -> None:
+        """Called once with all trades from a batch of orders."""
+        for trade in trades:
+            self.on_trade(trade)
+    
     @abstractmethod
     def on_time_update(self, timestamp: datetime) -> None:
         """Called on each time step in the simulation."""
         pass
     
+    def request_wakeup(self, timestamp: datetime) -> None:
+        """Ask for an on_time_update call at `timestamp`.
+        
+        Event-driven simulations only call on_time_update on request; fixed-step
+        simulations call it every step regardless.
+        """
+        if self.wakeup_scheduler is not None:
+            self.wakeup_scheduler(self, timestamp)
+    
     def get_position(self, symbol: str) -> Position:
         """Get current position for a symbol."""
         if symbol not in self.positions:
-            self.positions[symbol] = Position.create(self.agent_id, symbol)
+            self.positions[symbol] = Position.create(self.agent_id, symbol, self.clock())
         return self.positions[symbol]
     
     def update_position(self, trade: Trade, is_buyer: bool) -> None:
         """Update position based on a trade."""
         position = self.get_position(trade.symbol)
         side = OrderSide.BUY if is_buyer else OrderSide.SELL
-        position.update(trade.quantity, trade.price, side)
+        position.update(trade.quantity, trade.price, side, trade.timestamp)
         
         # Update cash balance
         trade_value = trade.price * trade.quantity
@@ -51,28 +113,68 @@ class BaseAgent(ABC):
             self.balance -= trade_value
         else:
             self.balance += trade_value
+        
+        if self.portfolio_mirror is not None:
+            self.portfolio_mirror.update(self.agent_id, position, self.balance)
     
     def create_market_order(self, symbol: str, side: OrderSide, quantity: Decimal) -> Order:
         """Create a market order."""
-        order = Order.create_market_order(symbol, side, quantity, self.agent_id)
+        order = Order.create_market_order(symbol, side, quantity, self.agent_id, self.clock())
         self.orders[str(order.id)] = order
         return order
     
     def create_limit_order(self, symbol: str, side: OrderSide, quantity: Decimal, 
-                          price: Decimal) -> Order:
+                          price: Decimal, time_in_force: TimeInForce = TimeInForce.GTC,
+                          expires_at: Optional[datetime] = None) -> Order:
         """Create a limit order."""
-        order = Order.create_limit_order(symbol, side, quantity, price, self.agent_id)
+        order = Order.create_limit_order(symbol, side, quantity, price, self.agent_id, self.clock(),
+                                         time_in_force=time_in_force, expires_at=expires_at)
         self.orders[str(order.id)] = order
         return order
     
+    def create_stop_order(self, symbol: str, side: OrderSide, quantity: Decimal,
+                          stop_price: Decimal, limit_price: Optional[Decimal] = None) -> Order:
+        """Create a stop (or stop-limit) order."""
+        order = Order.create_stop_order(symbol, side, quantity, stop_price, self.agent_id, limit_price,
+                                        self.clock())
+        self.orders[str(order.id)] = order
+        return order
+    
+    def submit_order(self, order: Order) -> List[Trade]:
+        """Send an order to the exchange through the simulation's order gateway.
+        
+        Returns the order's trades when the gateway matches synchronously.
+        Outside a simulation the order is only recorded locally.
+        """
+        if self.order_gateway is None:
+            return []
+        return self.order_gateway.submit(order)
+    
+    def cancel_order(self, order: Order) -> None:
+        """Cancel one of the agent's orders, on its exchange if it is resting there."""
+        if self.order_gateway is not None:
+            self.order_gateway.cancel(order)
+        if order.status in [OrderStatus.PENDING, OrderStatus.PARTIAL]:
+            order.status = OrderStatus.CANCELLED
+            order.updated_at = self.clock()
+        self.orders.pop(str(order.id), None)
+    
     def on_order_fill(self, order: Order, trade: Trade) -> None:
-        """Called when one of agent's orders is filled."""
+        """Called by the simulation with each fill of one of the agent's orders."""
         self.trades.append(trade)
         is_buyer = trade.buyer_order_id == order.id
         self.update_position(trade, is_buyer)
         
         if order.status == OrderStatus.FILLED:
-            del self.orders[str(order.id)]
+            self.orders.pop(str(order.id), None)
+    
+    def on_order_done(self, order: Order) -> None:
+        """Called by the simulation when one of the agent's orders ends other than by filling.
+        
+        The order was cancelled (e.g. an IOC or market remainder), rejected or
+        expired, possibly after partial fills; the default forgets it.
+        """
+        self.orders.pop(str(order.id), None)
     
     def get_portfolio_value(self, current_prices: Dict[str, Decimal]) -> Decimal:
         """Calculate total portfolio value including cash balance."""
@@ -106,7 +208,7 @@ class BaseAgent(ABC):
                     }
         
         return {
-            'timestamp': utc_now(),
+            'timestamp': self.clock(),
             'agent_id': self.agent_id,
             'cash_balance': self.balance,
             'total_value': total_value,
@@ -117,9 +219,11 @@ class BaseAgent(ABC):
     
     def validate_order(self, order: Order, current_prices: Dict[str, Decimal]) -> bool:
         """Validate if order can be placed based on current portfolio state."""
+        if order.type in (OrderType.STOP, OrderType.STOP_LIMIT) and order.stop_price is None:
+            return False
         if order.side == OrderSide.SELL:
             position = self.get_position(order.symbol)
-            return position.quantity >= order.quantity
+            return position.quantity + self.max_short_position >= order.quantity
         else:  # BUY
             if order.type == OrderType.MARKET:
                 # For market orders, use last price as estimate
@@ -127,6 +231,9 @@ class BaseAgent(ABC):
                 if not estimated_price:
                     return False
                 estimated_cost = estimated_price * order.quantity
+            elif order.type == OrderType.STOP:
+                # Stops execute as market orders around their stop price
+                estimated_cost = order.stop_price * order.quantity
             else:
                 estimated_cost = order.price * order.quantity
             
@@ -137,8 +244,6 @@ class BaseAgent(ABC):
         cancelled_orders = []
         for order_id, order in list(self.orders.items()):
             if order.status in [OrderStatus.PENDING, OrderStatus.PARTIAL]:
-                order.status = OrderStatus.CANCELLED
-                order.updated_at = utc_now()
-                del self.orders[order_id]
+                self.cancel_order(order)
                 cancelled_orders.append(order_id)
         return cancelled_orders 
\ No newline at end of file
@@ -0,0 +1,153 @@
+"""
+Vectorized noise trader population.
+
+TraderPopulation is one agent standing for many identical noise traders.
+Their cash and positions live in NumPy arrays, and each tick one set of
+array draws decides which traders act, on which symbol, on which side and
+for how much; only the resulting orders become Python objects. Each trader
+acts on at most one symbol per tick, and cash and holdings committed to
+orders still working are set aside until they end, so a trader does not
+commit more than its own cash or position.
+"""
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from core.models.base import Order, OrderSide, OrderStatus, Trade
+from market.agents.base_agent import BaseAgent
+from market.exchange.market_data import Subscription
+
+class TraderPopulation(BaseAgent):
+    """`num_traders` noise traders sending random market orders as one agent.
+
+    Each tick every trader acts with probability `trade_frequency`: it picks
+    a symbol and side at random and a size uniform in whole multiples of
+    `min_trade_size` up to `max_trade_size`. Buys must be covered by the
+    trader's free cash at the best ask and sells by its free position (no
+    shorting). The cash check is approximate: a market order that walks past
+    the best ask can cost more than was set aside for it.
+    The agent's own balance and positions are the population's totals.
+    """
+
+    def __init__(self, agent_id: str, num_traders: int, initial_balance: Decimal,
+                 symbols: List[str],
+                 trade_frequency: float = 0.1,  # Probability of each trader acting each tick
+                 min_trade_size: Decimal = Decimal('1'),
+                 max_trade_size: Decimal = Decimal('1000'),
+                 decision_interval: timedelta = timedelta(milliseconds=100)):
+        super().__init__(agent_id, initial_balance * num_traders)
+        self.num_traders = num_traders
+        self.symbols = list(symbols)
+        self.trade_frequency = trade_frequency
+        self.min_trade_size = min_trade_size
+        self.max_lots = int(max_trade_size // min_trade_size)
+        self.decision_interval = decision_interval
+
+        # Per-trader state: traders x symbols positions
+        self.cash = np.full(num_traders, float(initial_balance))
+        self.holdings = np.zeros((num_traders, len(self.symbols)))
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.best_bids = np.full(len(self.symbols), np.nan)
+        self.best_asks = np.full(len(self.symbols), np.nan)
+        # Cash and holdings set aside for orders still working
+        self.reserved_cash = np.zeros(num_traders)
+        self.reserved_holdings = np.zeros((num_traders, len(self.symbols)))
+
+        # Working order id -> (trader, symbol column, best ask when sent)
+        self._owners: Dict[int, Tuple[int, int, float]] = {}
+        self._np_rng: Optional[np.random.Generator] = None
+        self._awake = False
+
+    def market_data_subscriptions(self) -> List[Subscription]:
+        """Top of book of the traded symbols."""
+        return [Subscription(symbols=self.symbols, depth=1)]
+
+    def on_order_book_update(self, symbol: str, bids: List[tuple], asks: List[tuple]) -> None:
+        """Remember the top of book; the population acts on the clock."""
+        column = self._symbol_index[symbol]
+        self.best_bids[column] = bids[0][0] if bids else np.nan
+        self.best_asks[column] = asks[0][0] if asks else np.nan
+        if not self._awake:
+            self._awake = True
+            self.request_wakeup(self.clock())
+
+    def on_trade(self, trade: Trade) -> None:
+        pass
+
+    def on_time_update(self, timestamp: datetime) -> None:
+        """Draw this tick's decisions for every trader and submit the orders."""
+        self.request_wakeup(timestamp + self.decision_interval)
+        for order in self.decide(timestamp):
+            self.submit_order(order)
+
+    def decide(self, timestamp: datetime) -> List[Order]:
+        """One tick of decisions for the whole population, as orders."""
+        if self._np_rng is None:
+            # Derived from the agent's stream, which a seeded simulation sets
+            self._np_rng = np.random.default_rng(self.rng.getrandbits(64))
+        rng = self._np_rng
+
+        traders = np.flatnonzero(rng.random(self.num_traders) < self.trade_frequency)
+        columns = rng.integers(0, len(self.symbols), len(traders))
+        buy = rng.random(len(traders)) < 0.5
+        lots = rng.integers(1, self.max_lots + 1, len(traders))
+        quantity = lots * float(self.min_trade_size)
+
+        # Buys need an ask and the free cash to pay it; sells a bid and the free holding
+        asks = self.best_asks[columns]
+        free_cash = self.cash[traders] - self.reserved_cash[traders]
+        free_holdings = self.holdings[traders, columns] - self.reserved_holdings[traders, columns]
+        ok = np.where(buy,
+                      free_cash >= quantity * asks,
+                      (free_holdings >= quantity) & ~np.isnan(self.best_bids[columns]))
+
+        # One order per trader, so the reservations can be made in one go
+        traders, columns, buy, lots, quantity, asks = (
+            traders[ok], columns[ok], buy[ok], lots[ok], quantity[ok], asks[ok])
+        self.reserved_cash[traders[buy]] += quantity[buy] * asks[buy]
+        self.reserved_holdings[traders[~buy], columns[~buy]] += quantity[~buy]
+
+        orders = []
+        min_trade_size = self.min_trade_size
+        for trader, column, is_buy, lot_count, ask in zip(traders.tolist(), columns.tolist(), buy.tolist(),
+                                                          lots.tolist(), asks.tolist()):
+            order = Order.create_market_order(self.symbols[column], OrderSide.BUY if is_buy else OrderSide.SELL,
+                                              lot_count * min_trade_size, self.agent_id, timestamp)
+            self._owners[order.id] = (trader, column, ask)
+            orders.append(order)
+        return orders
+
+    def _release(self, order: Order, quantity: float) -> None:
+        """Free what was set aside for `quantity` of a working order."""
+        trader, column, ask = self._owners[order.id]
+        if order.side == OrderSide.BUY:
+            self.reserved_cash[trader] -= quantity * ask
+        else:
+            self.reserved_holdings[trader, column] -= quantity
+
+    def on_order_fill(self, order: Order, trade: Trade) -> None:
+        """Book the fill to the trader that sent the order, and to the population's totals."""
+        owner = self._owners.get(order.id)
+        if owner is not None:
+            trader, column, _ = owner
+            quantity = float(trade.quantity)
+            self._release(order, quantity)
+            value = quantity * float(trade.price)
+            if trade.buyer_order_id == order.id:
+                self.cash[trader] -= value
+                self.holdings[trader, column] += quantity
+            else:
+                self.cash[trader] += value
+                self.holdings[trader, column] -= quantity
+            if order.status == OrderStatus.FILLED:
+                del self._owners[order.id]
+        super().on_order_fill(order, trade)
+
+    def on_order_done(self, order: Order) -> None:
+        """Free what is still set aside for an order that ended unfilled, and forget it."""
+        if order.id in self._owners:
+            self._release(order, float(order.remaining_quantity))
+            del self._owners[order.id]
+        super().on_order_done(order)
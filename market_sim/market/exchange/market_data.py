@@ -0,0 +1,113 @@
+"""
+Incremental market data.
+
+The matching engine can publish a sequenced stream of book events instead
+of full snapshots: L2 level add/update/delete, trades, and (at L3)
+individual order adds and cancels. LocalOrderBook rebuilds a book from
+that stream on the consumer side. Agents choose which of it they receive
+with Subscriptions.
+"""
+
+import heapq
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import Decimal
+from enum import Enum
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from core.models.base import OrderSide
+
+class BookEventType(Enum):
+    LEVEL_ADD = "level_add"
+    LEVEL_UPDATE = "level_update"
+    LEVEL_DELETE = "level_delete"
+    TRADE = "trade"
+    ORDER_ADD = "order_add"
+    ORDER_CANCEL = "order_cancel"
+
+@dataclass(slots=True)
+class BookDelta:
+    """A single market data event.
+
+    Level events carry the level's new aggregate quantity. Trade events
+    carry the resting (maker) side, price, quantity and maker order id;
+    order events carry the order's side, price and remaining quantity.
+    """
+    sequence: int
+    symbol: str
+    type: BookEventType
+    side: Optional[OrderSide]
+    price: Optional[Decimal]
+    quantity: Optional[Decimal]
+    order_id: Optional[int]
+    timestamp: datetime
+
+@dataclass
+class Subscription:
+    """The market data an agent wants.
+
+    `symbols` of None means every symbol. Book updates are snapshots of
+    `depth` levels (or deltas, when the simulation publishes them) and,
+    with a `throttle`, arrive at most once per interval per symbol: the
+    changes in between are conflated into the next update. Trades are
+    delivered as they happen, through on_trades.
+    """
+    symbols: Optional[FrozenSet[str]] = None
+    books: bool = True
+    trades: bool = False
+    depth: int = 10
+    throttle: Optional[timedelta] = None
+
+    def __post_init__(self):
+        if self.symbols is not None:
+            self.symbols = frozenset(self.symbols)
+
+class LocalOrderBook:
+    """Consumer-side order book rebuilt from a BookDelta stream."""
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.bids: Dict[Decimal, Decimal] = {}
+        self.asks: Dict[Decimal, Decimal] = {}
+        self.orders: Dict[int, Tuple[OrderSide, Decimal, Decimal]] = {}  # L3: id -> (side, price, qty)
+        self.last_sequence = 0
+        self.last_trade: Optional[BookDelta] = None
+        self._snapshot: Optional[tuple] = None  # ((sequence, depth), (bids, asks))
+
+    def apply(self, deltas: Iterable[BookDelta]) -> None:
+        """Apply deltas in sequence order, raising ValueError on a gap."""
+        for delta in deltas:
+            if delta.sequence != self.last_sequence + 1:
+                raise ValueError(
+                    f"Sequence gap on {self.symbol}: expected {self.last_sequence + 1}, got {delta.sequence}")
+            self.last_sequence = delta.sequence
+            
+            event_type = delta.type
+            if event_type == BookEventType.LEVEL_ADD or event_type == BookEventType.LEVEL_UPDATE:
+                self._levels(delta.side)[delta.price] = delta.quantity
+            elif event_type == BookEventType.LEVEL_DELETE:
+                self._levels(delta.side).pop(delta.price, None)
+            elif event_type == BookEventType.TRADE:
+                self.last_trade = delta
+                resting = self.orders.get(delta.order_id)
+                if resting is not None:
+                    remaining = resting[2] - delta.quantity
+                    if remaining > 0:
+                        self.orders[delta.order_id] = (resting[0], resting[1], remaining)
+                    else:
+                        del self.orders[delta.order_id]
+            elif event_type == BookEventType.ORDER_ADD:
+                self.orders[delta.order_id] = (delta.side, delta.price, delta.quantity)
+            elif event_type == BookEventType.ORDER_CANCEL:
+                self.orders.pop(delta.order_id, None)
+
+    def snapshot(self, depth: int = 10) -> Tuple[List[Tuple[Decimal, Decimal]], List[Tuple[Decimal, Decimal]]]:
+        """Top `depth` (price, quantity) levels per side, in the engine's snapshot format."""
+        if self._snapshot is not None and self._snapshot[0] == (self.last_sequence, depth):
+            return self._snapshot[1]
+        bids = heapq.nlargest(depth, self.bids.items())
+        asks = heapq.nsmallest(depth, self.asks.items())
+        self._snapshot = ((self.last_sequence, depth), (bids, asks))
+        return bids, asks
+
+    def _levels(self, side: OrderSide) -> Dict[Decimal, Decimal]:
+        return self.bids if side == OrderSide.BUY else self.asks
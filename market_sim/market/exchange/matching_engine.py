@@ -2,114 +2,294 @@
 Matching engine for order execution.
 """
 
-from typing import List, Optional, Tuple
+import heapq
+from itertools import count, islice
+from typing import Callable, Dict, List, Optional, Tuple, Union
 from decimal import Decimal
 from datetime import datetime
-from core.models.base import Order, Trade, OrderBook, OrderSide, OrderStatus, OrderType
+from uuid import UUID
+from core.data.trade_tape import TradeTape
+from market.exchange.market_data import BookDelta, BookEventType
+from market.exchange.trigger_index import StopTriggerIndex
+from core.models.base import Order, Trade, OrderBook, BookSide, OrderSide, OrderStatus, OrderType, TimeInForce
+from core.utils.fixed_point import FixedPointScale
 from core.utils.time_utils import utc_now
 
 class MatchingEngine:
-    def __init__(self, symbol: str):
-        self.order_book = OrderBook.create(symbol)
-        self.trades: List[Trade] = []
+    def __init__(self, symbol: str, scale: Optional[FixedPointScale] = None,
+                 clock: Callable[[], datetime] = utc_now):
+        # Source of timestamps for orders, trades and the book (simulation time
+        # when driven by MarketSimulation)
+        self.clock = clock
+        self.order_book = OrderBook.create(symbol, clock())
+        self.trades = TradeTape()
+        # With a scale the book is keyed by integer ticks and lots; Decimal
+        # values are converted only when orders enter and trades leave
+        self.scale = scale
+        # Depth snapshots per (side, depth), valid while the side's version holds
+        self._snapshot_cache: Dict[Tuple[OrderSide, int], Tuple[int, List[Tuple[Decimal, Decimal]]]] = {}
+        # Incremental market data: 0 = off, 2 = levels and trades, 3 = also orders
+        self.market_data_level = 0
+        self._deltas: List[BookDelta] = []
+        self._sequence = 0
+        # Stop and stop-limit orders waiting for the last price to reach them
+        self.stops = StopTriggerIndex()
+        self.last_price = None  # Last trade price in book units
+        # GTD expirations: heap of (expires_at, sequence, order id), popped by expire_orders
+        self._expiries: List[Tuple[datetime, int, int]] = []
+        self._expiry_sequence = count()
+    
+    def enable_market_data(self, level: int = 2) -> None:
+        """Start publishing incremental book events at L2 or L3 detail."""
+        if level not in (2, 3):
+            raise ValueError(f"Unsupported market data level: {level}")
+        self.market_data_level = level
+    
+    def drain_deltas(self) -> List[BookDelta]:
+        """Return and clear the book events published since the last drain."""
+        deltas, self._deltas = self._deltas, []
+        return deltas
         
     def process_order(self, order: Order) -> List[Trade]:
         """Process an incoming order and generate trades."""
+        trades = self._process(order, self.clock())
+        if trades:
+            self.trades.extend(trades)
+        return trades
+    
+    def process_orders(self, orders: List[Order]) -> List[Trade]:
+        """Process a batch of orders in sequence and return all their trades.
+        
+        The batch shares one timestamp and is recorded on the tape with a
+        single append, so per-order overhead is just the matching itself.
+        """
+        now = self.clock()
+        process = self._process
+        trades = []
+        for order in orders:
+            fills = process(order, now)
+            if fills:
+                trades.extend(fills)
+        if trades:
+            self.trades.extend(trades)
+        return trades
+    
+    def _process(self, order: Order, now: datetime) -> List[Trade]:
+        """Convert an order to book units and dispatch it by type."""
+        stop_price = order.stop_price
+        if self.scale is not None:
+            try:
+                price = self.scale.to_ticks(order.price) if order.price is not None else None
+                quantity = self.scale.to_lots(order.remaining_quantity)
+                if stop_price is not None:
+                    stop_price = self.scale.to_ticks(stop_price)
+            except ValueError:
+                order.status = OrderStatus.REJECTED
+                order.updated_at = now
+                return []
+        else:
+            price, quantity = order.price, order.remaining_quantity
+        
         if order.type == OrderType.MARKET:
-            return self._process_market_order(order)
+            trades = self._process_market_order(order, quantity, now)
+        elif order.type == OrderType.LIMIT:
+            trades = self._process_limit_order(order, price, quantity, now)
         else:
-            return self._process_limit_order(order)
+            if stop_price is None:
+                order.status = OrderStatus.REJECTED
+                order.updated_at = now
+                return []
+            last = self.last_price
+            triggered = last is not None and \
+                ((order.side == OrderSide.BUY and last >= stop_price) or
+                 (order.side == OrderSide.SELL and last <= stop_price))
+            if not triggered:
+                if order.time_in_force == TimeInForce.GTD and not self._schedule_expiry(order, now):
+                    return []
+                self.stops.add(order, stop_price, price, quantity)
+                return []
+            trades = self._activate_stop(order, price, quantity, now)
+        
+        if trades and self.stops:
+            trades.extend(self._trigger_stops(now))
+        return trades
     
-    def _process_market_order(self, order: Order) -> List[Trade]:
-        """Process a market order."""
+    def _activate_stop(self, order: Order, price, quantity, now: datetime,
+                       expiry_scheduled: bool = False) -> List[Trade]:
+        """Send a triggered stop to the book as a market or limit order."""
+        if order.type == OrderType.STOP:
+            return self._process_market_order(order, quantity, now)
+        return self._process_limit_order(order, price, quantity, now, expiry_scheduled)
+    
+    def _trigger_stops(self, now: datetime) -> List[Trade]:
+        """Activate stops crossed by the last price, including cascades."""
         trades = []
-        opposite_side = OrderSide.SELL if order.side == OrderSide.BUY else OrderSide.BUY
-        opposite_book = self.order_book.asks if order.side == OrderSide.BUY else self.order_book.bids
+        while True:
+            # Each activation may move the last price and trigger more stops
+            triggered = self.stops.pop_triggered(self.last_price)
+            if triggered is None:
+                break
+            order, price, quantity = triggered
+            # A GTD stop's expiry was scheduled when it started waiting
+            trades.extend(self._activate_stop(order, price, quantity, now, expiry_scheduled=True))
+        return trades
+    
+    def _process_market_order(self, order: Order, quantity, now: datetime) -> List[Trade]:
+        """Process a market order."""
+        if order.time_in_force == TimeInForce.FOK and not self._can_fill(order.side, None, quantity):
+            order.status = OrderStatus.CANCELLED
+            order.updated_at = now
+            return []
+        trades, remaining = self._match(order, None, quantity, now)
         
-        # Sort prices: ascending for asks (buying) or descending for bids (selling)
-        prices = sorted(opposite_book.keys(), reverse=(order.side == OrderSide.SELL))
+        # Market orders never rest; any unfilled remainder is cancelled
+        if remaining > 0:
+            order.status = OrderStatus.CANCELLED
+            order.updated_at = now
+
+        return trades
+    
+    def _process_limit_order(self, order: Order, price, quantity, now: datetime,
+                             expiry_scheduled: bool = False) -> List[Trade]:
+        """Process a limit order, enforcing its time in force."""
+        time_in_force = order.time_in_force
+        if time_in_force != TimeInForce.GTC:
+            if time_in_force == TimeInForce.POST_ONLY and self._can_fill(order.side, price, None):
+                order.status = OrderStatus.REJECTED
+                order.updated_at = now
+                return []
+            if time_in_force == TimeInForce.FOK and not self._can_fill(order.side, price, quantity):
+                order.status = OrderStatus.CANCELLED
+                order.updated_at = now
+                return []
+            if time_in_force == TimeInForce.GTD and not expiry_scheduled and \
+                    not self._schedule_expiry(order, now):
+                return []
         
-        for price in prices:
-            if order.remaining_quantity <= 0:
-                break
-                
-            resting_orders = self.order_book.get_orders_at_price(opposite_side, price)
-            for resting_order in resting_orders[:]:  # Copy to allow modification
-                if order.remaining_quantity <= 0:
-                    break
-                    
-                # Calculate trade quantity
-                trade_quantity = min(order.remaining_quantity, resting_order.remaining_quantity)
-                
-                # Create and record the trade
-                trade = self._create_trade(order, resting_order, trade_quantity, price)
-                trades.append(trade)
-                
-                # Update orders
-                self._update_order_quantities(order, resting_order, trade_quantity)
-                
-                # Remove filled resting order
-                if resting_order.remaining_quantity == 0:
-                    self.order_book.remove_order(resting_order)
+        trades, remaining = self._match(order, price, quantity, now)
         
+        if remaining > 0 and time_in_force == TimeInForce.IOC:
+            order.status = OrderStatus.CANCELLED
+            order.updated_at = now
         # If order still has quantity remaining, add to book
-        if order.remaining_quantity > 0:
-            self.order_book.add_order(order)
-
+        elif remaining > 0:
+            book = self.order_book.bids if order.side == OrderSide.BUY else self.order_book.asks
+            new_level = price not in book
+            self.order_book.add_order(order, price, remaining, now)
+            if self.market_data_level:
+                if self.market_data_level == 3:
+                    self._emit(BookEventType.ORDER_ADD, order.side, price, remaining, order.id, now)
+                self._emit_level(book, price, now, new_level)
+        
         return trades
     
-    def _process_limit_order(self, order: Order) -> List[Trade]:
-        """Process a limit order."""
-        trades = []
-        opposite_side = OrderSide.SELL if order.side == OrderSide.BUY else OrderSide.BUY
-        opposite_book = self.order_book.asks if order.side == OrderSide.BUY else self.order_book.bids
+    def _can_fill(self, side: OrderSide, limit_price, quantity) -> bool:
+        """Whether the opposite side holds `quantity` within the limit (any, if None)."""
+        is_buy = side == OrderSide.BUY
+        opposite_book = self.order_book.asks if is_buy else self.order_book.bids
+        available = 0
+        for price in opposite_book.prices():
+            if limit_price is not None and \
+               ((is_buy and price > limit_price) or (not is_buy and price < limit_price)):
+                break
+            if quantity is None:
+                return True
+            available += opposite_book[price].total
+            if available >= quantity:
+                return True
+        return False
+    
+    def _schedule_expiry(self, order: Order, now: datetime) -> bool:
+        """Register a GTD order's expiry; rejects or expires it if that is impossible."""
+        if order.expires_at is None:
+            order.status = OrderStatus.REJECTED
+        elif order.expires_at <= now:
+            order.status = OrderStatus.EXPIRED
+        else:
+            heapq.heappush(self._expiries, (order.expires_at, next(self._expiry_sequence), order.id))
+            return True
+        order.updated_at = now
+        return False
+    
+    def next_expiry(self) -> Optional[datetime]:
+        """Earliest expiry of a GTD order still resting, or None."""
+        expiries = self._expiries
+        order_index, stops = self.order_book.order_index, self.stops
+        # Entries of orders filled or cancelled since are dropped here
+        while expiries and expiries[0][2] not in order_index and expiries[0][2] not in stops:
+            heapq.heappop(expiries)
+        return expiries[0][0] if expiries else None
+    
+    def expire_orders(self, now: datetime) -> List[Order]:
+        """Expire GTD orders due by `now`; costs O(log n) per due expiry."""
+        expired = []
+        expiries = self._expiries
+        while expiries and expiries[0][0] <= now:
+            order_id = heapq.heappop(expiries)[2]
+            # Orders filled or cancelled since are simply no longer resting
+            order = self._remove_resting(order_id, now)
+            if order is not None:
+                order.status = OrderStatus.EXPIRED
+                order.updated_at = now
+                expired.append(order)
+        return expired
+    
+    def _match(self, order: Order, limit_price, quantity, now: datetime) -> Tuple[List[Trade], object]:
+        """Match an order against the opposite side, walking levels best-first.
         
-        # Check if we can match immediately
-        can_match = False
-        if opposite_book:
-            best_price = min(opposite_book.keys()) if order.side == OrderSide.BUY else max(opposite_book.keys())
-            can_match = (order.side == OrderSide.BUY and order.price >= best_price) or \
-                       (order.side == OrderSide.SELL and order.price <= best_price)
+        Prices and quantities are in book units (Decimal, or ticks and lots in
+        fixed-point mode). Returns the trades and the unfilled quantity.
+        """
+        trades = []
+        scale = self.scale
+        publish = self.market_data_level
+        is_buy = order.side == OrderSide.BUY
+        opposite_book = self.order_book.asks if is_buy else self.order_book.bids
         
-        if can_match:
-            # Match against existing orders
-            prices = sorted(opposite_book.keys(), reverse=(order.side == OrderSide.SELL))
+        while quantity > 0:
+            level = opposite_book.best_level()
+            if level is None:
+                break
+            
+            # Stop at the first level that doesn't cross the limit
+            if limit_price is not None and \
+               ((is_buy and level.price > limit_price) or (not is_buy and level.price < limit_price)):
+                break
+            price = level.price if scale is None else scale.from_ticks(level.price)
             
-            for price in prices:
-                if order.remaining_quantity <= 0:
-                    break
-                    
-                # Skip prices that don't match
-                if (order.side == OrderSide.BUY and price > order.price) or \
-                   (order.side == OrderSide.SELL and price < order.price):
-                    break
+            while level.head is not None and quantity > 0:
+                node = level.head
+                resting_order = node.order
+                fill = min(quantity, node.quantity)
+                quantity -= fill
+                node.quantity -= fill
+                level.total -= fill
+                trade_quantity = fill if scale is None else scale.from_lots(fill)
                 
-                resting_orders = self.order_book.get_orders_at_price(opposite_side, price)
-                for resting_order in resting_orders[:]:  # Copy to allow modification
-                    if order.remaining_quantity <= 0:
-                        break
-                        
-                    trade_quantity = min(order.remaining_quantity, resting_order.remaining_quantity)
-                    
-                    # Create and record the trade
-                    trade = self._create_trade(order, resting_order, trade_quantity, price)
-                    trades.append(trade)
-                    
-                    # Update orders
-                    self._update_order_quantities(order, resting_order, trade_quantity)
-                    
-                    # Remove filled resting order
-                    if resting_order.remaining_quantity == 0:
-                        self.order_book.remove_order(resting_order)
-        
-        # If order still has quantity remaining, add to book
-        if order.remaining_quantity > 0:
-            self.order_book.add_order(order)
+                # Create and record the trade
+                trade = self._create_trade(order, resting_order, trade_quantity, price, now)
+                trades.append(trade)
+                if publish:
+                    self._emit(BookEventType.TRADE, opposite_book.side, level.price, fill, resting_order.id, now)
+                
+                # Update orders
+                self._update_order_quantities(order, resting_order, trade_quantity, now)
+                
+                # Remove filled resting order (drops the level once empty)
+                if node.quantity == 0:
+                    self.order_book.remove_node(node)
+            
+            self.last_price = level.price
+            if publish:
+                self._emit_level(opposite_book, level.price, now)
         
-        return trades
+        if trades:
+            opposite_book.version += 1
+            self.order_book.last_updated = now
+        return trades, quantity
     
     def _create_trade(self, taker_order: Order, maker_order: Order, 
-                     quantity: Decimal, price: Decimal) -> Trade:
+                     quantity: Decimal, price: Decimal, timestamp: datetime) -> Trade:
         """Create a trade between two orders."""
         if taker_order.side == OrderSide.BUY:
             buyer_order_id = taker_order.id
@@ -123,52 +303,107 @@ class MatchingEngine:
             price=price,
             quantity=quantity,
             buyer_order_id=buyer_order_id,
-            seller_order_id=seller_order_id
+            seller_order_id=seller_order_id,
+            timestamp=timestamp
         )
     
     def _update_order_quantities(self, taker_order: Order, maker_order: Order, 
-                               trade_quantity: Decimal) -> None:
+                               trade_quantity: Decimal, timestamp: datetime) -> None:
         """Update order quantities after a trade."""
         # Update taker order
         taker_order.filled_quantity += trade_quantity
         taker_order.remaining_quantity -= trade_quantity
         taker_order.status = OrderStatus.FILLED if taker_order.remaining_quantity == 0 else OrderStatus.PARTIAL
-        taker_order.updated_at = utc_now()
+        taker_order.updated_at = timestamp
         
         # Update maker order
         maker_order.filled_quantity += trade_quantity
         maker_order.remaining_quantity -= trade_quantity
         maker_order.status = OrderStatus.FILLED if maker_order.remaining_quantity == 0 else OrderStatus.PARTIAL
-        maker_order.updated_at = utc_now()
-    
-    def cancel_order(self, order_id: str) -> Optional[Order]:
-        """Cancel an order in the book."""
-        # Search in both bid and ask books
-        for orders in self.order_book.bids.values():
-            for order in orders:
-                if str(order.id) == order_id:
-                    self.order_book.remove_order(order)
-                    order.status = OrderStatus.CANCELLED
-                    order.updated_at = utc_now()
-                    return order
-                    
-        for orders in self.order_book.asks.values():
-            for order in orders:
-                if str(order.id) == order_id:
-                    self.order_book.remove_order(order)
-                    order.status = OrderStatus.CANCELLED
-                    order.updated_at = utc_now()
-                    return order
+        maker_order.updated_at = timestamp
+    
+    def cancel_order(self, order_id: Union[int, str]) -> Optional[Order]:
+        """Cancel an order in the book or a resting stop order.
         
-        return None
+        The id may also be given as a string, in decimal or UUID form.
+        """
+        if isinstance(order_id, str):
+            order_id = _parse_order_id(order_id)
+            if order_id is None:
+                return None
+        now = self.clock()
+        order = self._remove_resting(order_id, now)
+        if order is not None:
+            order.status = OrderStatus.CANCELLED
+            order.updated_at = now
+        return order
+    
+    def _remove_resting(self, order_id: int, now: datetime) -> Optional[Order]:
+        """Take a resting order or stop out of the engine, publishing the change."""
+        node = self.order_book.order_index.get(order_id)
+        if node is not None:
+            order = self.order_book.remove_order_by_id(order_id, now)
+            if self.market_data_level:
+                book = self.order_book.bids if order.side == OrderSide.BUY else self.order_book.asks
+                if self.market_data_level == 3:
+                    self._emit(BookEventType.ORDER_CANCEL, order.side, node.level.price, node.quantity, order.id, now)
+                self._emit_level(book, node.level.price, now)
+        else:
+            order = self.stops.remove(order_id)
+        return order
+    
+    def _emit(self, event_type: BookEventType, side: OrderSide, price, quantity,
+              order_id: Optional[int], now: datetime) -> None:
+        """Publish a book event; price and quantity are given in book units."""
+        if self.scale is not None:
+            price = self.scale.from_ticks(price)
+            if quantity is not None:
+                quantity = self.scale.from_lots(quantity)
+        self._sequence += 1
+        self._deltas.append(BookDelta(self._sequence, self.order_book.symbol, event_type,
+                                      side, price, quantity, order_id, now))
+    
+    def _emit_level(self, book: BookSide, price, now: datetime, new_level: bool = False) -> None:
+        """Publish the current state of one price level."""
+        level = book.get(price)
+        if level is None:
+            self._emit(BookEventType.LEVEL_DELETE, book.side, price, None, None, now)
+        else:
+            event_type = BookEventType.LEVEL_ADD if new_level else BookEventType.LEVEL_UPDATE
+            self._emit(event_type, book.side, price, level.total, None, now)
     
     def get_order_book_snapshot(self, depth: int = 10) -> Tuple[List[Tuple[Decimal, Decimal]], List[Tuple[Decimal, Decimal]]]:
         """Get a snapshot of the order book up to specified depth."""
-        bids = sorted(((price, sum(o.remaining_quantity for o in orders)) 
-                      for price, orders in self.order_book.bids.items()),
-                     reverse=True)[:depth]
+        return self._side_snapshot(self.order_book.bids, depth), self._side_snapshot(self.order_book.asks, depth)
+    
+    def _side_snapshot(self, book: BookSide, depth: int) -> List[Tuple[Decimal, Decimal]]:
+        """Top `depth` (price, quantity) levels of one side, cached until it changes.
         
-        asks = sorted(((price, sum(o.remaining_quantity for o in orders))
-                      for price, orders in self.order_book.asks.items()))[:depth]
+        Callers share the cached list and must not mutate it.
+        """
+        key = (book.side, depth)
+        cached = self._snapshot_cache.get(key)
+        if cached is not None and cached[0] == book.version:
+            return cached[1]
         
-        return bids, asks 
\ No newline at end of file
+        # Level totals are maintained incrementally, so a rebuild only visits
+        # the top `depth` levels
+        levels = []
+        for price in islice(book.prices(), depth):
+            quantity = book[price].total
+            if self.scale is not None:
+                price, quantity = self.scale.from_ticks(price), self.scale.from_lots(quantity)
+            levels.append((price, quantity))
+        self._snapshot_cache[key] = (book.version, levels)
+        return levels
+
+def _parse_order_id(order_id: str) -> Optional[int]:
+    """Integer order id from its decimal or UUID string, or None if it is neither."""
+    try:
+        return int(order_id)
+    except ValueError:
+        pass
+    try:
+        return UUID(order_id).int
+    except ValueError:
+        return None
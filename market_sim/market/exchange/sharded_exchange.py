@@ -0,0 +1,483 @@
+"""
+Sharded exchange host.
+
+Symbols are spread across worker processes, each owning the MatchingEngines
+for its shard. Orders are routed to the worker that owns their symbol and
+are matched there in submission order, so per-symbol sequencing is the same
+as with a local engine. Trades and book deltas come back through one
+shared-memory ring per worker; order state changes ride on the reply.
+
+MarketSimulation uses the host through RemoteMatchingEngine proxies, which
+stand in for MatchingEngine in `MarketSimulation.exchanges`.
+"""
+
+import heapq
+import multiprocessing
+import os
+import weakref
+from decimal import Decimal
+from datetime import datetime
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from core.data.shared_ring import SharedRingBuffer
+from core.data.trade_tape import (TRADE_DTYPE, TradeTape, decimal_from_fields, decimal_to_fields,
+                                  trade_from_record)
+from core.models import base
+from core.models.base import Order, OrderSide, OrderStatus, OrderType, TimeInForce, Trade
+from core.utils.fixed_point import FixedPointScale
+from core.utils.time_utils import datetime_to_ns, ns_to_datetime, utc_now
+from market.exchange.market_data import BookDelta, BookEventType
+from market.exchange.matching_engine import MatchingEngine
+
+DELTA_DTYPE = np.dtype([
+    ('sequence', np.int64),
+    ('timestamp', 'datetime64[ns]'),  # UTC
+    ('type', np.int8),                # Index into _EVENT_TYPES
+    ('side', np.int8),                # 0 = none, 1 = buy, 2 = sell
+    ('price_digits', np.int64),       # Exact price and quantity as in TRADE_DTYPE,
+    ('price_high_digits', np.int64),  # with exponent NO_EXPONENT for none
+    ('price_exponent', np.int8),
+    ('quantity_digits', np.int64),
+    ('quantity_high_digits', np.int64),
+    ('quantity_exponent', np.int8),
+    ('order_id', np.int64),           # -1 for none
+    ('symbol', np.int32),             # Index into ShardedExchangeHost.symbols
+])
+
+_EVENT_TYPES = list(BookEventType)
+_EVENT_CODES = {event_type: code for code, event_type in enumerate(_EVENT_TYPES)}
+_SIDES = [None, OrderSide.BUY, OrderSide.SELL]
+_SIDE_CODES = {side: code for code, side in enumerate(_SIDES)}
+
+_RESTING = (OrderStatus.PENDING, OrderStatus.PARTIAL)
+
+# Worker commands and reply status
+_ORDERS, _CANCEL, _EXPIRE, _SNAPSHOT, _STOP = range(5)
+_OK, _ERROR = range(2)
+
+# Orders cross the pipe as flat tuples of builtins: pickling the dataclass with
+# its Decimal, Enum and datetime members costs several times more
+def _encode_decimal(value: Optional[Decimal]) -> Optional[str]:
+    return None if value is None else str(value)
+
+def _decode_decimal(value: Optional[str]) -> Optional[Decimal]:
+    return None if value is None else Decimal(value)
+
+def _encode_order(order: Order) -> tuple:
+    created_at = datetime_to_ns(order.created_at)
+    updated_at = created_at if order.updated_at is order.created_at else datetime_to_ns(order.updated_at)
+    return (order.id, order.symbol, order.side.value, order.type.value,
+            str(order.quantity), _encode_decimal(order.price), _encode_decimal(order.stop_price),
+            order.status.value, str(order.filled_quantity), str(order.remaining_quantity),
+            created_at, updated_at, order.agent_id,
+            order.time_in_force.value,
+            None if order.expires_at is None else datetime_to_ns(order.expires_at))
+
+def _decode_order(fields: tuple) -> Order:
+    (order_id, symbol, side, order_type, quantity, price, stop_price, status, filled, remaining,
+     created_at, updated_at, agent_id, time_in_force, expires_at) = fields
+    return Order(
+        id=order_id,
+        symbol=symbol,
+        side=OrderSide(side),
+        type=OrderType(order_type),
+        quantity=Decimal(quantity),
+        price=_decode_decimal(price),
+        stop_price=_decode_decimal(stop_price),
+        status=OrderStatus(status),
+        filled_quantity=Decimal(filled),
+        remaining_quantity=Decimal(remaining),
+        created_at=ns_to_datetime(created_at),
+        updated_at=ns_to_datetime(updated_at),
+        agent_id=agent_id,
+        time_in_force=TimeInForce(time_in_force),
+        expires_at=None if expires_at is None else ns_to_datetime(expires_at)
+    )
+
+def _order_state(order: Order) -> tuple:
+    return (order.id, order.status.value, str(order.filled_quantity), str(order.remaining_quantity),
+            datetime_to_ns(order.updated_at))
+
+def _delta_records(deltas: List[BookDelta], codes: Dict[str, int]) -> np.ndarray:
+    return np.array([
+        (delta.sequence, datetime_to_ns(delta.timestamp), _EVENT_CODES[delta.type], _SIDE_CODES[delta.side],
+         *decimal_to_fields(delta.price), *decimal_to_fields(delta.quantity),
+         -1 if delta.order_id is None else delta.order_id,
+         codes[delta.symbol])
+        for delta in deltas
+    ], dtype=DELTA_DTYPE)
+
+def _delta_from_record(row, symbols: List[str]) -> BookDelta:
+    order_id = int(row['order_id'])
+    return BookDelta(
+        sequence=int(row['sequence']),
+        symbol=symbols[row['symbol']],
+        type=_EVENT_TYPES[row['type']],
+        side=_SIDES[row['side']],
+        price=decimal_from_fields(row['price_digits'], row['price_high_digits'], row['price_exponent']),
+        quantity=decimal_from_fields(row['quantity_digits'], row['quantity_high_digits'], row['quantity_exponent']),
+        order_id=None if order_id < 0 else order_id,
+        timestamp=ns_to_datetime(int(row['timestamp'].astype(np.int64)))
+    )
+
+def _run_shard(conn, shard: int, num_shards: int, symbols: List[str], owned: List[str],
+               scales: Dict[str, FixedPointScale], levels: Dict[str, int],
+               capacity: int, trade_ring: str, delta_ring: str) -> None:
+    """Worker loop: own the engines for `owned` and serve commands until told to stop."""
+    # Interleave trade ids so they stay unique across shards
+    base.use_id_sequences(base.IdSequences(trade_start=shard + 1, trade_step=num_shards))
+    now: List[Optional[datetime]] = [None]
+    clock = lambda: now[0]
+    engines: Dict[str, MatchingEngine] = {}
+    for symbol in owned:
+        engine = engines[symbol] = MatchingEngine(symbol, scale=scales.get(symbol), clock=clock)
+        if levels.get(symbol):
+            engine.enable_market_data(levels[symbol])
+    codes = {symbol: code for code, symbol in enumerate(symbols)}
+    encoder = TradeTape(capacity=1)
+    for symbol in symbols:
+        encoder.symbol_index(symbol)
+    trades_out = SharedRingBuffer(TRADE_DTYPE, capacity, name=trade_ring)
+    deltas_out = SharedRingBuffer(DELTA_DTYPE, capacity, name=delta_ring)
+    # Orders still resting here, to report maker fills back to the host
+    live: Dict[int, Order] = {}
+
+    def track(order: Order) -> None:
+        if order.status in _RESTING and order.type != OrderType.MARKET:
+            live[order.id] = order
+        else:
+            live.pop(order.id, None)
+
+    try:
+        while True:
+            command, now[0], payload = conn.recv()
+            if command == _STOP:
+                break
+            try:
+                touched: Dict[int, Order] = {}
+                result = None
+                if command == _ORDERS:
+                    by_symbol: Dict[str, List[Order]] = {}
+                    for fields in payload:
+                        order = _decode_order(fields)
+                        by_symbol.setdefault(order.symbol, []).append(order)
+                        touched[order.id] = order
+                    trades: List[Trade] = []
+                    for symbol, orders in by_symbol.items():
+                        trades.extend(engines[symbol].process_orders(orders))
+                    for trade in trades:
+                        for order_id in (trade.buyer_order_id, trade.seller_order_id):
+                            if order_id not in touched and order_id in live:
+                                touched[order_id] = live[order_id]
+                    if trades:
+                        trades_out.write(np.array([encoder.record(trade) for trade in trades], dtype=TRADE_DTYPE))
+                elif command == _CANCEL:
+                    symbol, order_id = payload
+                    order = engines[symbol].cancel_order(order_id)
+                    if order is not None:
+                        touched[order.id] = order
+                elif command == _EXPIRE:
+                    for engine in ([engines[payload]] if payload is not None else engines.values()):
+                        for order in engine.expire_orders(now[0]):
+                            touched[order.id] = order
+                elif command == _SNAPSHOT:
+                    symbol, depth = payload
+                    result = engines[symbol].get_order_book_snapshot(depth)
+
+                for order in touched.values():
+                    track(order)
+                deltas = [delta for engine in engines.values() if engine.market_data_level
+                          for delta in engine.drain_deltas()]
+                if deltas:
+                    deltas_out.write(_delta_records(deltas, codes))
+                conn.send((_OK, [_order_state(order) for order in touched.values()], result))
+            except Exception as exc:
+                conn.send((_ERROR, [], exc))
+    finally:
+        trades_out.close()
+        deltas_out.close()
+        conn.close()
+
+class _Shard:
+    __slots__ = ('process', 'conn', 'trades', 'deltas', 'symbols')
+
+    def __init__(self, process, conn, trades: SharedRingBuffer, deltas: SharedRingBuffer, symbols: List[str]):
+        self.process = process
+        self.conn = conn
+        self.trades = trades
+        self.deltas = deltas
+        self.symbols = symbols
+
+def _shutdown(shards: List[_Shard]) -> None:
+    """Stop the workers and release their rings; safe to call more than once."""
+    for shard in shards:
+        try:
+            shard.conn.send((_STOP, None, None))
+        except (OSError, ValueError):
+            pass
+    for shard in shards:
+        shard.process.join(timeout=5)
+        if shard.process.is_alive():
+            shard.process.terminate()
+            shard.process.join()
+        shard.conn.close()
+        shard.trades.close()
+        shard.deltas.close()
+    shards.clear()
+
+class RemoteMatchingEngine:
+    """Stand-in for the MatchingEngine of a symbol matched in a shard worker.
+
+    Provides the engine methods MarketSimulation relies on. Snapshots are
+    cached until the symbol's book is next touched.
+    """
+
+    def __init__(self, host: 'ShardedExchangeHost', symbol: str, scale: Optional[FixedPointScale] = None):
+        self.host = host
+        self.symbol = symbol
+        self.scale = scale
+        self.trades = TradeTape()
+        self.trades.symbol_index(symbol)
+        self.market_data_level = 0
+        self._deltas: List[BookDelta] = []
+        self._snapshots: Dict[int, Tuple[List[Tuple[Decimal, Decimal]], List[Tuple[Decimal, Decimal]]]] = {}
+
+    def enable_market_data(self, level: int = 2) -> None:
+        """Start publishing incremental book events; only before the host starts."""
+        if level not in (2, 3):
+            raise ValueError(f"Unsupported market data level: {level}")
+        if self.host.started:
+            raise RuntimeError("Market data must be enabled before the exchange host starts")
+        self.market_data_level = level
+
+    def drain_deltas(self) -> List[BookDelta]:
+        """Return and clear the book events received since the last drain."""
+        deltas, self._deltas = self._deltas, []
+        return deltas
+
+    def process_order(self, order: Order) -> List[Trade]:
+        """Process an incoming order in the owning worker."""
+        return self.host.process_orders([order])
+
+    def process_orders(self, orders: List[Order]) -> List[Trade]:
+        """Process a batch of orders for this symbol in the owning worker."""
+        return self.host.process_orders(orders)
+
+    def cancel_order(self, order_id: Union[int, str]) -> Optional[Order]:
+        """Cancel an order in the book or a resting stop order."""
+        return self.host.cancel_order(self.symbol, order_id)
+
+    def expire_orders(self, now: datetime) -> List[Order]:
+        """Expire this symbol's GTD orders due by `now`."""
+        return self.host.expire_orders(now, self.symbol)
+
+    def next_expiry(self) -> Optional[datetime]:
+        """Earliest expiry of a GTD order resting on any hosted symbol."""
+        return self.host.next_expiry()
+
+    def get_order_book_snapshot(self, depth: int = 10) -> Tuple[List[Tuple[Decimal, Decimal]], List[Tuple[Decimal, Decimal]]]:
+        """Get current order book snapshot."""
+        snapshot = self._snapshots.get(depth)
+        if snapshot is None:
+            snapshot = self._snapshots[depth] = self.host.snapshot(self.symbol, depth)
+        return snapshot
+
+class ShardedExchangeHost:
+    """Runs the matching engines for many symbols across worker processes.
+
+    Symbols are registered with `add_symbol` and assigned round-robin to
+    `num_workers` shards; the workers start on first use. Every call blocks
+    until the workers involved have replied, and batches spanning several
+    shards are matched in parallel.
+    """
+
+    def __init__(self, num_workers: Optional[int] = None, ring_capacity: int = 1 << 16,
+                 clock: Callable[[], datetime] = utc_now):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.ring_capacity = ring_capacity
+        self.clock = clock
+        self.symbols: List[str] = []
+        self.engines: Dict[str, RemoteMatchingEngine] = {}
+        self._shard_of: Dict[str, int] = {}
+        self._shards: List[_Shard] = []
+        # Host-side orders still resting in a worker, updated from replies
+        self._live: Dict[int, Order] = {}
+        # GTD expiries of routed orders: heap of (expires_at, order id)
+        self._expiries: List[Tuple[datetime, int]] = []
+        self._finalizer = None
+
+    @property
+    def started(self) -> bool:
+        return bool(self._shards)
+
+    def add_symbol(self, symbol: str, scale: Optional[FixedPointScale] = None) -> RemoteMatchingEngine:
+        """Register a symbol and return the engine proxy for it."""
+        if self.started:
+            raise RuntimeError("Symbols must be added before the exchange host starts")
+        if symbol in self.engines:
+            raise ValueError(f"Symbol {symbol} is already hosted")
+        self.symbols.append(symbol)
+        engine = self.engines[symbol] = RemoteMatchingEngine(self, symbol, scale)
+        return engine
+
+    def start(self) -> None:
+        """Spawn the shard workers."""
+        if self.started:
+            return
+        if not self.symbols:
+            raise RuntimeError("No symbols to host")
+        num_shards = min(self.num_workers, len(self.symbols))
+        owned: List[List[str]] = [[] for _ in range(num_shards)]
+        for index, symbol in enumerate(self.symbols):
+            self._shard_of[symbol] = index % num_shards
+            owned[index % num_shards].append(symbol)
+        scales = {symbol: engine.scale for symbol, engine in self.engines.items() if engine.scale is not None}
+        levels = {symbol: engine.market_data_level for symbol, engine in self.engines.items()}
+
+        context = multiprocessing.get_context()
+        for shard in range(num_shards):
+            trades = SharedRingBuffer(TRADE_DTYPE, self.ring_capacity)
+            deltas = SharedRingBuffer(DELTA_DTYPE, self.ring_capacity)
+            conn, child_conn = context.Pipe()
+            process = context.Process(
+                target=_run_shard,
+                args=(child_conn, shard, num_shards, self.symbols, owned[shard], scales, levels,
+                      self.ring_capacity, trades.name, deltas.name),
+                name=f"exchange-shard-{shard}",
+                daemon=True
+            )
+            process.start()
+            child_conn.close()
+            self._shards.append(_Shard(process, conn, trades, deltas, owned[shard]))
+        self._finalizer = weakref.finalize(self, _shutdown, self._shards)
+
+    def close(self) -> None:
+        """Stop the workers; the host cannot be restarted afterwards."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def __enter__(self) -> 'ShardedExchangeHost':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def process_orders(self, orders: List[Order]) -> List[Trade]:
+        """Match a batch of orders, each shard's share in parallel.
+
+        Orders keep their relative order within each symbol. Trades are
+        returned grouped by shard, in matching order within a shard.
+        """
+        self.start()
+        batches: Dict[int, List[tuple]] = {}
+        for order in orders:
+            shard = self._shard_of.get(order.symbol)
+            if shard is None:
+                raise KeyError(f"Symbol {order.symbol} is not hosted")
+            batches.setdefault(shard, []).append(_encode_order(order))
+            self._live[order.id] = order
+            if order.time_in_force == TimeInForce.GTD and order.expires_at is not None:
+                heapq.heappush(self._expiries, (order.expires_at, order.id))
+            self.engines[order.symbol]._snapshots.clear()
+
+        now = self.clock()
+        for shard, batch in batches.items():
+            self._shards[shard].conn.send((_ORDERS, now, batch))
+        _, records = self._gather(list(batches))
+
+        symbols = self.symbols
+        trades = [trade_from_record(row, symbols) for shard in sorted(records) for row in records[shard]]
+        for shard_records in records.values():
+            for code in np.unique(shard_records['symbol']):
+                engine = self.engines[symbols[code]]
+                rows = shard_records[shard_records['symbol'] == code]
+                rows['symbol'] = 0
+                engine.trades.extend_records(rows)
+        return trades
+
+    def cancel_order(self, symbol: str, order_id: Union[int, str]) -> Optional[Order]:
+        """Cancel a resting order on `symbol`, returning the host-side order."""
+        self.start()
+        self.engines[symbol]._snapshots.clear()
+        shard = self._shard_of[symbol]
+        self._shards[shard].conn.send((_CANCEL, self.clock(), (symbol, order_id)))
+        updated, _ = self._gather([shard])
+        return updated[0] if updated else None
+
+    def expire_orders(self, now: datetime, symbol: Optional[str] = None) -> List[Order]:
+        """Expire GTD orders due by `now` on one symbol, or on every shard."""
+        self.start()
+        shards = [self._shard_of[symbol]] if symbol is not None else list(range(len(self._shards)))
+        for shard in shards:
+            self._shards[shard].conn.send((_EXPIRE, now, symbol))
+        expired, _ = self._gather(shards)
+        for order in expired:
+            self.engines[order.symbol]._snapshots.clear()
+        return expired
+
+    def next_expiry(self) -> Optional[datetime]:
+        """Earliest expiry of a GTD order still resting in a worker, or None."""
+        expiries, live = self._expiries, self._live
+        while expiries and expiries[0][1] not in live:
+            heapq.heappop(expiries)
+        return expiries[0][0] if expiries else None
+
+    def snapshot(self, symbol: str, depth: int = 10) -> Tuple[List[Tuple[Decimal, Decimal]], List[Tuple[Decimal, Decimal]]]:
+        """Fetch a depth snapshot of `symbol` from its worker."""
+        self.start()
+        shard = self._shard_of[symbol]
+        self._shards[shard].conn.send((_SNAPSHOT, self.clock(), (symbol, depth)))
+        conn = self._shards[shard].conn
+        status, _, result = conn.recv()
+        if status == _ERROR:
+            raise RuntimeError(f"Exchange shard {shard} failed") from result
+        return result
+
+    def _gather(self, shards: List[int]) -> Tuple[List[Order], Dict[int, np.ndarray]]:
+        """Wait for replies from `shards`, draining their rings meanwhile.
+
+        Applies the reported order states to the host-side orders and returns
+        the orders that changed plus each shard's trade records.
+        """
+        pending = {self._shards[shard].conn: shard for shard in shards}
+        chunks: Dict[int, List[np.ndarray]] = {shard: [] for shard in shards}
+        replies = {}
+        while pending:
+            for conn in wait(list(pending), timeout=0.001):
+                replies[pending.pop(conn)] = conn.recv()
+            # Keep reading so a worker with more output than a ring holds can finish
+            for shard in pending.values():
+                chunks[shard].append(self._shards[shard].trades.read())
+                self._drain_deltas(shard)
+
+        updated = []
+        records = {}
+        for shard in shards:
+            status, states, result = replies[shard]
+            self._drain_deltas(shard)
+            chunks[shard].append(self._shards[shard].trades.read())
+            if status == _ERROR:
+                raise RuntimeError(f"Exchange shard {shard} failed") from result
+            for order_id, status, filled, remaining, updated_at in states:
+                order = self._live.get(order_id)
+                if order is None:
+                    continue
+                order.status = OrderStatus(status)
+                order.filled_quantity = Decimal(filled)
+                order.remaining_quantity = Decimal(remaining)
+                order.updated_at = ns_to_datetime(updated_at)
+                if order.status not in _RESTING:
+                    del self._live[order_id]
+                updated.append(order)
+            shard_records = np.concatenate(chunks[shard])
+            if len(shard_records):
+                records[shard] = shard_records
+        return updated, records
+
+    def _drain_deltas(self, shard: int) -> None:
+        # Book events reach the ring before the reply, so one read gets them all
+        for row in self._shards[shard].deltas.read():
+            delta = _delta_from_record(row, self.symbols)
+            self.engines[delta.symbol]._deltas.append(delta)
@@ -0,0 +1,70 @@
+"""
+Trigger index for resting stop and stop-limit orders.
+"""
+
+import heapq
+from itertools import count
+from typing import Dict, List, Optional, Tuple
+from core.models.base import Order, OrderSide
+
+class StopTriggerIndex:
+    """Resting stop orders per side, kept in heaps ordered by trigger price.
+
+    Buy stops trigger once the last price rises to their stop price, so they
+    sit in a min-heap; sell stops trigger once it falls to theirs and sit in
+    a max-heap. Finding the k stops crossed by a new last price therefore
+    costs O(k log n). Prices and quantities are in the engine's book units.
+    Cancelled stops are removed from the heaps lazily.
+    """
+
+    def __init__(self):
+        self._buy_heap: List[tuple] = []   # (stop, sequence, order_id)
+        self._sell_heap: List[tuple] = []  # (-stop, sequence, order_id)
+        self._live: Dict[int, Tuple[Order, object, object]] = {}  # id -> (order, limit price, quantity)
+        self._sequence = count()
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self._live
+
+    def add(self, order: Order, stop_price, limit_price, quantity) -> None:
+        """Rest a stop order until the last price crosses its stop price."""
+        order_id = order.id
+        self._live[order_id] = (order, limit_price, quantity)
+        if order.side == OrderSide.BUY:
+            heapq.heappush(self._buy_heap, (stop_price, next(self._sequence), order_id))
+        else:
+            heapq.heappush(self._sell_heap, (-stop_price, next(self._sequence), order_id))
+
+    def remove(self, order_id: int) -> Optional[Order]:
+        """Remove a resting stop, returning its order if it was live."""
+        entry = self._live.pop(order_id, None)
+        if entry is None:
+            return None
+        if len(self._buy_heap) + len(self._sell_heap) > 2 * len(self._live) + 64:
+            self._compact()
+        return entry[0]
+
+    def pop_triggered(self, last_price) -> Optional[Tuple[Order, object, object]]:
+        """Pop one stop triggered by `last_price` (buys first, then by stop and arrival)."""
+        if last_price is None:
+            return None
+        buy_heap, sell_heap, live = self._buy_heap, self._sell_heap, self._live
+        while buy_heap and buy_heap[0][2] not in live:
+            heapq.heappop(buy_heap)
+        if buy_heap and buy_heap[0][0] <= last_price:
+            return live.pop(heapq.heappop(buy_heap)[2])
+        while sell_heap and sell_heap[0][2] not in live:
+            heapq.heappop(sell_heap)
+        if sell_heap and -sell_heap[0][0] >= last_price:
+            return live.pop(heapq.heappop(sell_heap)[2])
+        return None
+
+    def _compact(self) -> None:
+        """Drop cancelled entries once they dominate the heaps."""
+        self._buy_heap = [entry for entry in self._buy_heap if entry[2] in self._live]
+        self._sell_heap = [entry for entry in self._sell_heap if entry[2] in self._live]
+        heapq.heapify(self._buy_heap)
+        heapq.heapify(self._sell_heap)
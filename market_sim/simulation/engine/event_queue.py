@@ -0,0 +1,163 @@
+"""
+Simulation event queue.
+
+Events are heap entries of (key, type code, data) where the integer key packs
+(timestamp in ns, priority, sequence number). Ordering is therefore total
+and stable, ties go to the lower priority value and then to the earlier
+scheduled event, and heap operations compare plain ints instead of calling
+a Python __lt__.
+"""
+
+import heapq
+from datetime import datetime
+from enum import IntEnum
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from core.utils.time_utils import datetime_to_ns, ns_to_datetime
+
+class EventType(IntEnum):
+    ORDER = 0
+    ORDERS = 1
+    MARKET_EVENT = 2
+
+_PRIORITY_BITS = 8
+_SEQUENCE_BITS = 40
+_SEQUENCE_MASK = (1 << _SEQUENCE_BITS) - 1
+MAX_PRIORITY = (1 << _PRIORITY_BITS) - 1
+
+class SimulationEvent:
+    def __init__(self, timestamp: datetime, event_type: str, data: Any):
+        self.timestamp = timestamp
+        self.event_type = event_type
+        self.data = data
+
+    def __lt__(self, other):
+        return self.timestamp < other.timestamp
+
+def event_key(timestamp_ns: int, priority: int, sequence: int) -> int:
+    """Pack an event's sort fields into one integer heap key."""
+    return (((timestamp_ns << _PRIORITY_BITS) | priority) << _SEQUENCE_BITS) | sequence
+
+def key_timestamp_ns(key: int) -> int:
+    """Timestamp in ns of a packed event key."""
+    return key >> (_PRIORITY_BITS + _SEQUENCE_BITS)
+
+class EventQueue:
+    """Priority queue of typed simulation events with cancellation.
+
+    Event types are registered by name and dispatched by integer code; the
+    built-in types are 'order', 'orders' and 'market_event'.
+    """
+
+    def __init__(self):
+        self._heap: List[Tuple[int, int, Any]] = []
+        self._sequence = 0
+        # Handles of events still pending; cancelled entries stay in the heap
+        # until reached but leave this set at once
+        self._live: Set[int] = set()
+        self.codes: Dict[str, int] = {event_type.name.lower(): event_type.value for event_type in EventType}
+        self.names: Dict[int, str] = {code: name for name, code in self.codes.items()}
+
+    def register(self, name: str) -> int:
+        """Register an event type name, returning its code."""
+        code = self.codes.get(name)
+        if code is None:
+            code = self.codes[name] = len(self.codes)
+            self.names[code] = name
+        return code
+
+    def code(self, event_type: Union[str, int]) -> int:
+        """Integer code of an event type given by name or code."""
+        if isinstance(event_type, int):
+            if event_type not in self.names:
+                raise ValueError(f"Unknown event type code: {event_type}")
+            return int(event_type)
+        code = self.codes.get(event_type)
+        if code is None:
+            raise ValueError(f"Unknown event type: {event_type}")
+        return code
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def __iter__(self) -> Iterator[SimulationEvent]:
+        """Pending events in no particular order."""
+        for key, code, data in self._heap:
+            if key in self._live:
+                yield SimulationEvent(ns_to_datetime(key_timestamp_ns(key)), self.names[code], data)
+
+    def _key(self, timestamp: Union[datetime, int], priority: int) -> int:
+        if not 0 <= priority <= MAX_PRIORITY:
+            raise ValueError(f"Event priority must be between 0 and {MAX_PRIORITY}")
+        self._sequence += 1
+        timestamp_ns = timestamp if isinstance(timestamp, int) else datetime_to_ns(timestamp)
+        return event_key(timestamp_ns, priority, self._sequence)
+
+    def push(self, timestamp: Union[datetime, int], event_type: Union[str, int], data: Any,
+             priority: int = 0) -> int:
+        """Schedule an event at a datetime or ns timestamp, returning its handle."""
+        key = self._key(timestamp, priority)
+        heapq.heappush(self._heap, (key, self.code(event_type), data))
+        self._live.add(key)
+        return key
+
+    def schedule_many(self, events: Iterable[Tuple[Union[datetime, int], Union[str, int], Any]],
+                      priority: int = 0) -> List[int]:
+        """Schedule (timestamp, event type, data) events in bulk, returning their handles.
+
+        The batch is appended and the heap rebuilt in O(n), which beats n
+        pushes when the batch is large relative to the queue.
+        """
+        code = self.code
+        key = self._key
+        entries = [(key(timestamp, priority), code(event_type), data) for timestamp, event_type, data in events]
+        heap = self._heap
+        if len(entries) > len(heap):
+            heap.extend(entries)
+            heapq.heapify(heap)
+        else:
+            for entry in entries:
+                heapq.heappush(heap, entry)
+        handles = [entry[0] for entry in entries]
+        self._live.update(handles)
+        return handles
+
+    def cancel(self, handle: int) -> bool:
+        """Cancel an event that has not run yet; it is dropped when reached.
+
+        Returns whether the event was pending: handles already run, already
+        cancelled or never issued are ignored.
+        """
+        if handle not in self._live:
+            return False
+        self._live.discard(handle)
+        return True
+
+    def peek_ns(self) -> Optional[int]:
+        """Timestamp in ns of the next pending event, or None if there is none."""
+        self._discard_cancelled()
+        return key_timestamp_ns(self._heap[0][0]) if self._heap else None
+
+    def pop(self) -> Tuple[int, int, Any]:
+        """Remove the next event, returning (timestamp ns, type code, data)."""
+        self._discard_cancelled()
+        key, code, data = heapq.heappop(self._heap)
+        self._live.discard(key)
+        return key_timestamp_ns(key), code, data
+
+    def pop_due(self, until_ns: int) -> Iterator[Tuple[int, Any]]:
+        """Remove and yield (type code, data) for events due by `until_ns`, in order."""
+        heap, live = self._heap, self._live
+        limit = event_key(until_ns + 1, 0, 0)  # Every key at or before until_ns is below this
+        heappop = heapq.heappop
+        while heap and heap[0][0] < limit:
+            key, code, data = heappop(heap)
+            if key not in live:
+                continue  # Cancelled
+            live.discard(key)
+            yield code, data
+
+    def _discard_cancelled(self) -> None:
+        heap, live = self._heap, self._live
+        while heap and heap[0][0] not in live:
+            heapq.heappop(heap)
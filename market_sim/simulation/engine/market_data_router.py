@@ -0,0 +1,139 @@
+"""
+Market data routing.
+
+MarketDataRouter indexes agents' Subscriptions by symbol, so the simulation
+calls only the agents subscribed to a symbol's books or trades instead of
+every agent for every symbol. Book updates for throttled subscriptions are
+held back until due; snapshots then show the latest book and deltas arrive
+concatenated, so nothing in between is lost.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from core.models.base import Order, Trade
+from market.exchange.market_data import BookDelta, Subscription
+
+class _Subscriber:
+    """One subscription of an agent, with its throttling state per symbol."""
+    __slots__ = ('agent', 'subscription', 'next_due', 'held')
+
+    def __init__(self, agent, subscription: Subscription):
+        self.agent = agent
+        self.subscription = subscription
+        self.next_due: Dict[str, datetime] = {}
+        # Symbols with an update held back by the throttle -> deltas since
+        # the last delivery (empty for snapshots)
+        self.held: Dict[str, List[BookDelta]] = {}
+
+    def wants(self, symbol: str) -> bool:
+        symbols = self.subscription.symbols
+        return symbols is None or symbol in symbols
+
+class MarketDataRouter:
+    """Delivers book updates and trades to the agents subscribed to them."""
+
+    def __init__(self):
+        self._subscribers: List[_Subscriber] = []
+        self._book_routes: Dict[str, List[_Subscriber]] = {}  # Built per symbol on first use
+        self._all_trades: List[_Subscriber] = []
+        self._symbol_trades: Dict[str, List[_Subscriber]] = {}
+        self._throttled: List[_Subscriber] = []
+
+    def subscribe(self, agent, subscription: Subscription) -> None:
+        self._subscribers.append(_Subscriber(agent, subscription))
+        self._reindex()
+
+    def unsubscribe(self, agent_id: str) -> None:
+        """Drop every subscription of an agent."""
+        self._subscribers = [subscriber for subscriber in self._subscribers
+                             if subscriber.agent.agent_id != agent_id]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self._book_routes = {}
+        self._all_trades = []
+        self._symbol_trades = {}
+        self._throttled = [subscriber for subscriber in self._subscribers
+                           if subscriber.subscription.books and subscriber.subscription.throttle is not None]
+        for subscriber in self._subscribers:
+            subscription = subscriber.subscription
+            if not subscription.trades:
+                continue
+            if subscription.symbols is None:
+                self._all_trades.append(subscriber)
+            else:
+                for symbol in subscription.symbols:
+                    self._symbol_trades.setdefault(symbol, []).append(subscriber)
+
+    def book_subscribers(self, symbol: str) -> List[_Subscriber]:
+        routes = self._book_routes.get(symbol)
+        if routes is None:
+            routes = self._book_routes[symbol] = [subscriber for subscriber in self._subscribers
+                                                  if subscriber.subscription.books and subscriber.wants(symbol)]
+        return routes
+
+    def publish_book(self, symbol: str, exchange, now: datetime,
+                     deltas: Optional[List[BookDelta]] = None) -> List[Order]:
+        """Send a symbol's book to its due subscribers, returning the orders they send back.
+
+        Without `deltas` subscribers get snapshots of their depth; with
+        them (possibly empty) they get the deltas since their last update.
+        """
+        orders = []
+        for subscriber in self.book_subscribers(symbol):
+            throttle = subscriber.subscription.throttle
+            if throttle is None:
+                if deltas is None:
+                    bids, asks = exchange.get_order_book_snapshot(subscriber.subscription.depth)
+                    order = subscriber.agent.on_order_book_update(symbol, bids, asks)
+                elif deltas:
+                    order = subscriber.agent.on_book_delta(symbol, deltas)
+                else:
+                    continue
+            else:
+                held = subscriber.held.get(symbol)
+                if deltas:
+                    if held is None:
+                        held = subscriber.held[symbol] = []
+                    held.extend(deltas)
+                elif deltas is None and held is None:
+                    held = subscriber.held[symbol] = []
+                if held is None:
+                    continue
+                if now < subscriber.next_due.get(symbol, now):
+                    continue  # Conflated into the next update
+                del subscriber.held[symbol]
+                subscriber.next_due[symbol] = now + throttle
+                if deltas is None:
+                    bids, asks = exchange.get_order_book_snapshot(subscriber.subscription.depth)
+                    order = subscriber.agent.on_order_book_update(symbol, bids, asks)
+                else:
+                    order = subscriber.agent.on_book_delta(symbol, held)
+            if order is not None:
+                orders.append(order)
+        return orders
+
+    def held_symbols(self, now: datetime) -> Set[str]:
+        """Symbols with a held-back update that is due by `now`."""
+        return {symbol for subscriber in self._throttled for symbol in subscriber.held
+                if subscriber.next_due[symbol] <= now}
+
+    def next_held(self) -> Optional[datetime]:
+        """When the earliest held-back update falls due."""
+        return min((subscriber.next_due[symbol] for subscriber in self._throttled for symbol in subscriber.held),
+                   default=None)
+
+    def publish_trades(self, trades: List[Trade]) -> None:
+        """Send a batch of trades to its subscribers, split by symbol for symbol subscriptions."""
+        for subscriber in self._all_trades:
+            subscriber.agent.on_trades(trades)
+        if not self._symbol_trades:
+            return
+        by_symbol: Dict[str, List[Trade]] = {}
+        for trade in trades:
+            if trade.symbol in self._symbol_trades:
+                by_symbol.setdefault(trade.symbol, []).append(trade)
+        for symbol, symbol_trades in by_symbol.items():
+            for subscriber in self._symbol_trades[symbol]:
+                subscriber.agent.on_trades(symbol_trades)
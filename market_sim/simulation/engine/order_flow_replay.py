@@ -0,0 +1,194 @@
+"""
+Order-flow replay.
+
+Feeds a historical order-flow file (see core.data.order_flow) into a
+MarketSimulation as scheduled events. Only one chunk of the file is
+scheduled at a time: a marker event at the chunk's last timestamp loads
+and schedules the next one, so memory stays flat however large the file.
+
+Adds and market orders become 'order' events and go through the usual
+batched order path. Cancels and modifies are looked up by the source's
+order id when they run; a modify cancels the order and enters a new one
+for the new price and quantity, losing time priority.
+"""
+
+import time
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from core.data.order_flow import ADD, CANCEL, MARKET, MODIFY, read_order_events
+from core.models.base import Order, OrderSide, OrderStatus
+from core.utils.time_utils import datetime_to_ns, ns_to_datetime
+
+_SIDES = {b'B': OrderSide.BUY, b'S': OrderSide.SELL}
+_DONE = (OrderStatus.FILLED, OrderStatus.CANCELLED, OrderStatus.REJECTED, OrderStatus.EXPIRED)
+
+class OrderFlowReplay:
+    """Replays an order-flow file into a simulation, a chunk at a time.
+
+    The file must be in time order. Events for symbols without an exchange,
+    events after the simulation's end and orders missing their price or
+    quantity are skipped; events before its start run in the first step. A replay cannot be checkpointed, as it
+    holds an open file.
+    """
+
+    def __init__(self, sim, path: str, agent_id: str = 'REPLAY', name: str = 'replay', **read_options):
+        self.sim = sim
+        self.path = path
+        self.agent_id = agent_id
+        self._reader: Iterator[np.ndarray] = read_order_events(path, **read_options)
+        self._end_ns = datetime_to_ns(sim.end_time)
+        self._symbols: Dict[bytes, str] = {}
+        # Source order id -> our order, for orders that may still be resting
+        self._live: Dict[int, Order] = {}
+        # Market orders submitted since the last sweep
+        self._market_orders: List[Order] = []
+
+        self._cancel_type = f"{name}_cancel"
+        self._modify_type = f"{name}_modify"
+        self._chunk_type = f"{name}_chunk"
+        sim.register_event_handler(self._cancel_type, self._handle_cancel)
+        sim.register_event_handler(self._modify_type, self._handle_modify)
+        sim.register_event_handler(self._chunk_type, self._handle_chunk)
+
+        # Statistics
+        self.events_parsed = 0
+        self.events_skipped = 0
+        self.parse_seconds = 0.0
+        self.orders_submitted = 0
+        self.orders_matched = 0  # Submitted orders that traded, counted once they are done
+        self.cancels = 0
+        self.modifies = 0
+        self.missed = 0          # Cancels and modifies whose order was no longer live
+        self.finished = False
+
+        self._schedule_next_chunk()
+
+    def _schedule_next_chunk(self) -> None:
+        """Parse the next chunk and schedule its events, plus a marker to load the one after."""
+        self._sweep()
+        while True:
+            started = time.perf_counter()
+            events = next(self._reader, None)
+            self.parse_seconds += time.perf_counter() - started
+            if events is None:
+                self.finished = True
+                return
+            self.events_parsed += len(events)
+            last_ns = int(events['timestamp'][-1])
+            keep = (events['timestamp'] <= self._end_ns) & np.isin(events['symbol'], self._known_symbols()) & \
+                self._complete(events)
+            if not keep.all():
+                self.events_skipped += len(events) - int(keep.sum())
+                events = events[keep]
+            if len(events) or last_ns > self._end_ns:
+                break
+
+        if len(events):
+            self.sim.schedule_events(self._scheduled(events))
+        if last_ns > self._end_ns:
+            self.finished = True
+        else:
+            self.sim.schedule_event(ns_to_datetime(last_ns), self._chunk_type, None)
+
+    def _scheduled(self, events: np.ndarray) -> List[Tuple[int, str, Any]]:
+        """Turn a chunk of event records into (ns, event type, data) entries."""
+        scheduled = []
+        append = scheduled.append
+        symbols = self._symbols
+        live = self._live
+        agent_id = self.agent_id
+        for timestamp, event, order_id, symbol, side, price, quantity in events.tolist():
+            if event == ADD:
+                order = Order.create_limit_order(symbols[symbol], _SIDES[side], Decimal(repr(quantity)),
+                                                 Decimal(repr(price)), agent_id, ns_to_datetime(timestamp))
+                live[order_id] = order
+                self.orders_submitted += 1
+                append((timestamp, 'order', order))
+            elif event == MARKET:
+                order = Order.create_market_order(symbols[symbol], _SIDES[side], Decimal(repr(quantity)),
+                                                  agent_id, ns_to_datetime(timestamp))
+                self._market_orders.append(order)
+                self.orders_submitted += 1
+                append((timestamp, 'order', order))
+            elif event == CANCEL:
+                append((timestamp, self._cancel_type, order_id))
+            elif event == MODIFY:
+                append((timestamp, self._modify_type, (order_id, price, quantity)))
+            else:
+                self.events_skipped += 1
+        return scheduled
+
+    @staticmethod
+    def _complete(events: np.ndarray) -> np.ndarray:
+        """Rows carrying the fields their event needs: adds a price and all orders a quantity."""
+        kind = events['event']
+        missing_quantity = np.isnan(events['quantity']) & np.isin(kind, [ADD, MARKET, MODIFY])
+        missing_price = np.isnan(events['price']) & (kind == ADD)
+        return ~(missing_quantity | missing_price)
+
+    def _known_symbols(self) -> np.ndarray:
+        for symbol in self.sim.exchanges:
+            self._symbols.setdefault(symbol.encode(), symbol)
+        return np.array(list(self._symbols), dtype='S16')
+
+    def _cancel_live(self, order_id: int) -> Optional[Order]:
+        """Cancel the order a source id refers to, if it is still resting."""
+        order = self._live.pop(order_id, None)
+        if order is not None:
+            self.sim.cancel_order(order.symbol, order.id)
+            self._done(order)
+            return order
+        self.missed += 1
+        return None
+
+    def _handle_cancel(self, order_id: int) -> None:
+        self.cancels += 1
+        self._cancel_live(order_id)
+
+    def _handle_modify(self, data: Tuple[int, float, float]) -> None:
+        order_id, price, quantity = data
+        self.modifies += 1
+        old = self._cancel_live(order_id)
+        if old is None:
+            return
+        order = Order.create_limit_order(old.symbol, old.side, Decimal(repr(quantity)),
+                                         old.price if np.isnan(price) else Decimal(repr(price)),
+                                         self.agent_id, self.sim.current_time)
+        self._live[order_id] = order
+        self.orders_submitted += 1
+        self.sim.process_order(order)
+
+    def _handle_chunk(self, _: Any) -> None:
+        self._schedule_next_chunk()
+
+    def _done(self, order: Order) -> None:
+        if order.filled_quantity > 0:
+            self.orders_matched += 1
+
+    def _sweep(self) -> None:
+        """Count and forget orders that can no longer trade."""
+        for order in self._market_orders:
+            self._done(order)
+        self._market_orders = []
+        done = [order_id for order_id, order in self._live.items() if order.status in _DONE]
+        for order_id in done:
+            self._done(self._live.pop(order_id))
+
+    def stats(self) -> Dict[str, Any]:
+        """Parse throughput and how much of the replayed flow found a counterparty."""
+        matched = self.orders_matched + sum(order.filled_quantity > 0 for order in self._market_orders) + \
+            sum(order.filled_quantity > 0 for order in self._live.values())
+        return {
+            'events_parsed': self.events_parsed,
+            'events_skipped': self.events_skipped,
+            'parse_seconds': self.parse_seconds,
+            'parse_rate': self.events_parsed / self.parse_seconds if self.parse_seconds else 0.0,
+            'orders_submitted': self.orders_submitted,
+            'orders_matched': matched,
+            'match_rate': matched / self.orders_submitted if self.orders_submitted else 0.0,
+            'cancels': self.cancels,
+            'modifies': self.modifies,
+            'missed_cancels_and_modifies': self.missed,
+        }
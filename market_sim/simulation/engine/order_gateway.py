@@ -0,0 +1,141 @@
+"""
+Order gateway.
+
+Agents send orders and cancels to the exchanges through the simulation's
+OrderGateway. Each order first passes the pre-trade checks of
+BaseAgent.validate_order: buys must be covered by cash and sells by the
+position plus the agent's max_short_position.
+
+In queued mode (the default) orders wait until the simulation flushes the
+gateway, after the agents' time updates and again after book
+notifications, and each flush checks the whole batch with array operations
+on the simulation's PortfolioMatrix and routes it in one process_orders
+call. In sync mode every order is checked and matched as it is submitted.
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+from core.models.base import Order, OrderSide, OrderStatus, OrderType, Trade
+
+class OrderGateway:
+    """Pre-trade checks and routing of agent orders for a MarketSimulation."""
+
+    def __init__(self, sim, queued: bool = True):
+        self.sim = sim
+        self.queued = queued
+        self._pending: List[Order] = []
+        self._pending_ids = set()
+
+        # Statistics
+        self.submitted = 0
+        self.rejected = 0
+        self.routed = 0
+        self.cancels = 0
+
+    def submit(self, order: Order) -> List[Trade]:
+        """Send an order, returning its trades in sync mode (always [] when queued)."""
+        self.submitted += 1
+        if self.queued:
+            self._pending.append(order)
+            self._pending_ids.add(order.id)
+            return []
+        if not self._accept([order])[0]:
+            return []
+        self.routed += 1
+        return self.sim.process_order(order)
+
+    def cancel(self, order: Order) -> Optional[Order]:
+        """Cancel an order, whether still queued here or resting on its exchange."""
+        self.cancels += 1
+        if order.id in self._pending_ids:
+            self._pending_ids.discard(order.id)
+            self._pending.remove(order)
+            order.status = OrderStatus.CANCELLED
+            order.updated_at = self.sim.current_time
+            return order
+        return self.sim.cancel_order(order.symbol, order.id)
+
+    def flush(self) -> List[Trade]:
+        """Check and route every queued order as one batch."""
+        if not self._pending:
+            return []
+        orders = self._pending
+        self._pending = []
+        self._pending_ids = set()
+        accepted = [order for order, ok in zip(orders, self._accept(orders)) if ok]
+        self.routed += len(accepted)
+        return self.sim.process_orders(accepted) if accepted else []
+
+    def _accept(self, orders: List[Order]) -> np.ndarray:
+        """Check a batch of orders, marking and dropping the rejected ones."""
+        ok = self.check(orders)
+        for order in (order for order, accepted in zip(orders, ok) if not accepted):
+            order.status = OrderStatus.REJECTED
+            order.updated_at = self.sim.current_time
+            agent = self.sim.agents.get(order.agent_id)
+            if agent is not None:
+                agent.on_order_done(order)
+            self.rejected += 1
+        return ok
+
+    def check(self, orders: List[Order]) -> np.ndarray:
+        """Whether each order passes the pre-trade checks, in one vectorized pass.
+
+        Orders earlier in the batch count against the same agent's cash and
+        position, so a batch cannot commit more than one order could. Market
+        buys are costed at the best ask and rejected on an empty book. Cash
+        and positions are the float mirror in the simulation's PortfolioMatrix.
+        Orders for unknown symbols or from agents not in the simulation fail.
+        """
+        sim = self.sim
+        portfolio = sim.portfolio
+        agents = sim.agents
+        exchanges = sim.exchanges
+        known = np.array([order.agent_id in agents and order.symbol in exchanges for order in orders], dtype=bool)
+        if not known.all():
+            orders = [order for order, ok in zip(orders, known) if ok]
+        rows = portfolio.agent_rows([order.agent_id for order in orders])
+        columns = portfolio.symbol_columns([order.symbol for order in orders])
+        buy = np.array([order.side is OrderSide.BUY for order in orders], dtype=bool)
+        quantity = np.array([float(order.quantity) for order in orders])
+        best_asks: Dict[str, float] = {}
+        price = np.array([np.nan if order.side is not OrderSide.BUY else
+                          self._best_ask(order.symbol, best_asks) if order.type is OrderType.MARKET else
+                          float(order.stop_price) if order.type is OrderType.STOP else
+                          float(order.price) for order in orders])
+
+        # Buys: a price is known and cash covers the cumulative cost of the
+        # agent's priced buys so far
+        priced = ~np.isnan(price)
+        cost = np.where(buy & priced, quantity * price, 0.0)
+        committed = _running_total(rows, cost)
+        buys_ok = priced & (portfolio.cash[rows] >= committed)
+        # Sells: the position less the agent's sells of the symbol so far
+        # stays within the allowed short position
+        keys = rows * len(portfolio.symbols) + columns
+        sold = _running_total(keys, np.where(buy, 0.0, quantity))
+        sells_ok = portfolio.quantity[rows, columns] - sold >= -portfolio.max_short[rows]
+        known[known] = np.where(buy, buys_ok, sells_ok)
+        return known
+
+    def _best_ask(self, symbol: str, cache: Dict[str, float]) -> float:
+        if symbol not in cache:
+            _, asks = self.sim.exchanges[symbol].get_order_book_snapshot(depth=1)
+            cache[symbol] = float(asks[0][0]) if asks else np.nan
+        return cache[symbol]
+
+def _running_total(keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Cumulative sum of `values` within each key, in batch order."""
+    if len(keys) == 0:
+        return values
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    totals = np.cumsum(values[order])
+    # Subtract the running total reached before each key's first entry
+    starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+    offsets = np.r_[0.0, totals][starts]
+    lengths = np.diff(np.r_[starts, len(keys)])
+    result = np.empty_like(totals)
+    result[order] = totals - np.repeat(offsets, lengths)
+    return result
@@ -8,70 +8,236 @@ This module provides the core simulation engine that:
 4. Collects and records simulation results
 """
 
-from typing import Dict, List, Optional, Any
+from typing import Callable, Dict, Iterable, List, Optional, Any, Set, Tuple, Union
 from datetime import datetime, timedelta
 from decimal import Decimal
+import gzip
 import heapq
 import logging
-from core.models.base import Order, Trade, Asset
+import os
+import pickle
+import random
+import numpy as np
+from core.data.portfolio_matrix import PortfolioMatrix, PortfolioValuation
+from core.data.trade_tape import TradeTape
+from core.models.base import Order, OrderStatus, Trade, Asset, IdSequences, id_sequence_state, use_id_sequences
+from core.utils.fixed_point import FixedPointScale
+from core.utils.time_utils import SimulationClock, datetime_to_ns
+from market.exchange.market_data import Subscription
 from market.exchange.matching_engine import MatchingEngine
+from market.exchange.sharded_exchange import ShardedExchangeHost
 from market.agents.base_agent import BaseAgent
+from simulation.engine.event_queue import EventQueue, EventType, SimulationEvent
+from simulation.engine.market_data_router import MarketDataRouter
+from simulation.engine.order_gateway import OrderGateway
+from simulation.results.metrics_sinks import InMemoryMetricsSink, MetricsSink
 
-class SimulationEvent:
-    def __init__(self, timestamp: datetime, event_type: str, data: Any):
-        self.timestamp = timestamp
-        self.event_type = event_type
-        self.data = data
-    
-    def __lt__(self, other):
-        return self.timestamp < other.timestamp
+CHECKPOINT_FORMAT = 6
+
+# Orders in these states can no longer trade
+_DONE = (OrderStatus.FILLED, OrderStatus.CANCELLED, OrderStatus.REJECTED, OrderStatus.EXPIRED)
+# Event types the simulation handles itself; others come from register_event_handler
+_BUILTIN_HANDLERS = (EventType.ORDER, EventType.ORDERS, EventType.MARKET_EVENT)
 
 class MarketSimulation:
     def __init__(self, 
                  start_time: datetime,
                  end_time: datetime,
-                 time_step: timedelta = timedelta(milliseconds=100)):
+                 time_step: timedelta = timedelta(milliseconds=100),
+                 market_data_level: int = 0,
+                 exchange_host: Optional[ShardedExchangeHost] = None,
+                 seed: Optional[int] = None,
+                 fixed_step: bool = True,
+                 metrics_sink: Optional[MetricsSink] = None,
+                 metrics_intervals: Optional[Dict[str, timedelta]] = None,
+                 checkpoint_interval: Optional[timedelta] = None,
+                 checkpoint_path: Optional[str] = None,
+                 queue_agent_orders: bool = True):
         self.start_time = start_time
         self.end_time = end_time
         self.time_step = time_step
-        self.current_time = start_time
+        # Fixed-step runs visit every time step and call every agent each time.
+        # Otherwise the run jumps to the next step with a due event, agent
+        # wake-up request or book change; time_step is then the resolution
+        self.fixed_step = fixed_step
+        self.step_count = 0
+        # Simulated time for everything in the run: exchanges, agents and the
+        # orders and trades they stamp
+        self.clock = SimulationClock(start_time)
+        # With a seed the run is reproducible: ids restart from 1 and every
+        # agent draws from its own stream derived from the seed and its id
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # Order and trade ids come from the simulation's own sequences, made
+        # current now and whenever it runs, so another simulation created in
+        # the meantime cannot hand out ids it has already used
+        self.id_sequences = IdSequences() if seed is not None else IdSequences(*id_sequence_state())
+        use_id_sequences(self.id_sequences)
+        # 0 sends every agent full snapshots each tick; 2 or 3 sends only
+        # L2 (or L3) book deltas for symbols that changed
+        self.market_data_level = market_data_level
+        # With a host, exchanges run in its worker processes instead of in-process
+        self.exchange_host = exchange_host
+        if exchange_host is not None:
+            exchange_host.clock = self.clock
         
         # Components
         self.exchanges: Dict[str, MatchingEngine] = {}
         self.agents: Dict[str, BaseAgent] = {}
         self.assets: Dict[str, Asset] = {}
         
-        # Event queue
-        self.event_queue = []
-        
-        # Results collection
-        self.trades: List[Trade] = []
-        self.metrics: Dict[str, List[Dict]] = {
-            'order_book_snapshots': [],
-            'agent_metrics': [],
-            'market_metrics': []
+        # Event queue, dispatched by integer event type code
+        self.event_queue = EventQueue()
+        self._handlers: Dict[int, Callable[[Any], Any]] = {
+            EventType.ORDER: self.process_order,
+            EventType.ORDERS: self.process_orders,
+            EventType.MARKET_EVENT: self._handle_market_event,
         }
+        # Agent wake-up requests (timestamp, sequence, agent id) and symbols
+        # whose books changed since agents were last notified
+        self._timers: List[Tuple[datetime, int, str]] = []
+        self._timer_sequence = 0
+        self._dirty_symbols: Set[str] = set()
+        # Agents' orders and cancels go through the gateway's pre-trade checks;
+        # queued orders are routed in batches after each round of agent callbacks
+        self.gateway = OrderGateway(self, queued=queue_agent_orders)
+        
+        # Results collection. Metric families are written to the sink once per
+        # step, and at most once per interval for families given one
+        self.trades = TradeTape()
+        # Called with every batch of trades as it is recorded, e.g. bar aggregators
+        self._trade_listeners: List[Callable[[List[Trade]], None]] = []
+        # Fills go only to the owners of the two orders, found through this
+        # index of agents' live orders; owners also hear of orders that end
+        # unfilled through on_order_done
+        self._order_owners: Dict[int, Tuple[BaseAgent, Order]] = {}
+        # Book updates and public trades go only to the agents subscribed to them
+        self.market_data = MarketDataRouter()
+        self.metrics_sink = metrics_sink if metrics_sink is not None else InMemoryMetricsSink()
+        self.metrics_intervals: Dict[str, timedelta] = dict(metrics_intervals or {})
+        self._next_samples: Dict[str, datetime] = {}
+        # Agents' cash and positions as agents x symbols arrays, marked to the
+        # mid prices once per step
+        self.portfolio = PortfolioMatrix()
+        self.portfolio_valuation: Optional[PortfolioValuation] = None
+        
+        # Every checkpoint_interval of simulated time the run saves itself to
+        # checkpoint_path, which MarketSimulation.restore resumes from
+        if checkpoint_interval and not checkpoint_path:
+            raise ValueError("checkpoint_interval requires a checkpoint_path")
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpoint_path = checkpoint_path
+        self._next_checkpoint = start_time + checkpoint_interval if checkpoint_interval else None
         
         # Setup logging
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
     
-    def add_exchange(self, symbol: str) -> None:
-        """Add a new exchange for a symbol."""
-        self.exchanges[symbol] = MatchingEngine(symbol)
+    def add_exchange(self, symbol: str, fixed_point: bool = False) -> None:
+        """Add a new exchange for a symbol.
+        
+        With `fixed_point` the engine matches on integer ticks and lots derived
+        from the symbol's asset, which must have been added first.
+        """
+        scale = None
+        if fixed_point:
+            if symbol not in self.assets:
+                raise ValueError(f"Fixed-point exchange for {symbol} requires its asset to be added first")
+            scale = FixedPointScale.from_asset(self.assets[symbol])
+        self.portfolio.symbol_index(symbol)
+        if self.exchange_host is not None:
+            self.exchanges[symbol] = self.exchange_host.add_symbol(symbol, scale)
+        else:
+            self.exchanges[symbol] = MatchingEngine(symbol, scale=scale, clock=self.clock)
+        if self.market_data_level:
+            self.exchanges[symbol].enable_market_data(self.market_data_level)
+    
+    @property
+    def metrics(self) -> Dict[str, Any]:
+        """Collected metrics as reported by the sink (lists of records in memory)."""
+        return self.metrics_sink.results()
+    
+    @property
+    def current_time(self) -> datetime:
+        return self.clock.current_time
+    
+    @current_time.setter
+    def current_time(self, timestamp: datetime) -> None:
+        self.clock.set(timestamp)
     
     def add_agent(self, agent: BaseAgent) -> None:
-        """Add a trading agent to the simulation."""
+        """Add a trading agent, giving it the simulation clock and its own random stream.
+        
+        The agent receives the market data of its market_data_subscriptions().
+        """
+        agent.clock = self.clock
+        agent.wakeup_scheduler = self.schedule_wakeup
+        agent.order_gateway = self.gateway
+        self.portfolio.add_agent(agent.agent_id, agent.balance, agent.positions.values(),
+                                 agent.max_short_position)
+        agent.portfolio_mirror = self.portfolio
+        if self.seed is not None:
+            agent.rng = random.Random(f"{self.seed}:{agent.agent_id}")
         self.agents[agent.agent_id] = agent
+        for subscription in agent.market_data_subscriptions():
+            self.market_data.subscribe(agent, subscription)
     
     def add_asset(self, asset: Asset) -> None:
         """Add an asset to the simulation."""
         self.assets[asset.symbol] = asset
     
-    def schedule_event(self, timestamp: datetime, event_type: str, data: Any) -> None:
-        """Schedule an event for future processing."""
-        event = SimulationEvent(timestamp, event_type, data)
-        heapq.heappush(self.event_queue, event)
+    def schedule_event(self, timestamp: datetime, event_type: str, data: Any, priority: int = 0) -> int:
+        """Schedule an event for future processing, returning a handle for cancel_event.
+        
+        Events at the same time run by ascending priority, then in the order
+        they were scheduled.
+        """
+        return self.event_queue.push(timestamp, event_type, data, priority)
+    
+    def schedule_events(self, events: Iterable[Tuple[datetime, str, Any]]) -> List[int]:
+        """Schedule many (timestamp, event type, data) events at once, e.g. pre-generated order flow."""
+        return self.event_queue.schedule_many(events)
+    
+    def cancel_event(self, handle: int) -> bool:
+        """Cancel a scheduled event that has not run yet, returning whether it was pending."""
+        return self.event_queue.cancel(handle)
+    
+    def add_trade_listener(self, listener: Callable[[List[Trade]], None]) -> None:
+        """Call `listener(trades)` with each batch of trades as the run records them.
+        
+        Listeners are saved with checkpoints, so a checkpointed run needs
+        picklable ones (not lambdas or closures).
+        """
+        self._trade_listeners.append(listener)
+    
+    def subscribe(self, agent_id: str, subscription: Subscription) -> None:
+        """Add a market data subscription for an agent, on top of those it declared."""
+        self.market_data.subscribe(self.agents[agent_id], subscription)
+    
+    def subscribe_trades(self, agent_id: str) -> None:
+        """Send an agent every public trade print through on_trades.
+        
+        Agents always hear about their own fills through on_order_fill.
+        """
+        self.subscribe(agent_id, Subscription(books=False, trades=True))
+    
+    def unsubscribe(self, agent_id: str) -> None:
+        """Stop all market data to an agent; its own fills still arrive."""
+        self.market_data.unsubscribe(agent_id)
+    
+    def register_event_handler(self, event_type: str, handler: Callable[[Any], Any]) -> None:
+        """Handle events of a new type with `handler(data)`.
+        
+        Like trade listeners, handlers of a checkpointed run must be picklable.
+        """
+        self._handlers[self.event_queue.register(event_type)] = handler
+    
+    def schedule_wakeup(self, agent: BaseAgent, timestamp: datetime) -> None:
+        """Call the agent's on_time_update at `timestamp` in an event-driven run."""
+        if self.fixed_step:
+            return  # Every agent is already called at every step
+        self._timer_sequence += 1
+        heapq.heappush(self._timers, (timestamp, self._timer_sequence, agent.agent_id))
     
     def process_order(self, order: Order) -> List[Trade]:
         """Process an order through the appropriate exchange."""
@@ -80,62 +246,166 @@ class MarketSimulation:
             return []
             
         exchange = self.exchanges[order.symbol]
+        self._track_order(order)
         trades = exchange.process_order(order)
+        self._dirty_symbols.add(order.symbol)
         
         # Record trades and notify agents
-        for trade in trades:
-            self.trades.append(trade)
-            self._notify_agents_of_trade(trade)
+        if trades:
+            self._record_trades(trades)
+        if order.status in _DONE:
+            self._order_done(order.id)
+        
+        return trades
+    
+    def cancel_order(self, symbol: str, order_id: Union[int, str]) -> Optional[Order]:
+        """Cancel a resting order on a symbol's exchange, returning it if it was live."""
+        exchange = self.exchanges.get(symbol)
+        if exchange is None:
+            self.logger.warning(f"No exchange found for symbol {symbol}")
+            return None
+        order = exchange.cancel_order(order_id)
+        if order is not None:
+            self._dirty_symbols.add(symbol)
+            self._order_done(order.id)
+        return order
+    
+    def process_orders(self, orders: List[Order]) -> List[Trade]:
+        """Process a batch of orders, preserving their order within each symbol.
+        
+        Each exchange matches its share of the batch in one call and every
+        trade subscriber receives a single on_trades callback for the whole
+        batch.
+        """
+        by_symbol: Dict[str, List[Order]] = {}
+        for order in orders:
+            by_symbol.setdefault(order.symbol, []).append(order)
+        
+        trades = []
+        routed = []
+        for symbol, symbol_orders in by_symbol.items():
+            exchange = self.exchanges.get(symbol)
+            if exchange is None:
+                self.logger.warning(f"No exchange found for symbol {symbol}")
+                continue
+            self._dirty_symbols.add(symbol)
+            for order in symbol_orders:
+                self._track_order(order)
+            if self.exchange_host is not None:
+                routed.extend(symbol_orders)
+            else:
+                trades.extend(exchange.process_orders(symbol_orders))
+        if routed:
+            # One round trip matches every shard's share in parallel
+            trades = self.exchange_host.process_orders(routed)
         
+        if trades:
+            self._record_trades(trades)
+        for order in orders:
+            if order.status in _DONE:
+                self._order_done(order.id)
         return trades
     
-    def _notify_agents_of_trade(self, trade: Trade) -> None:
-        """Notify all agents of a trade."""
-        for agent in self.agents.values():
-            agent.on_trade(trade)
+    def _track_order(self, order: Order) -> None:
+        """Index an agent's order so its fills can be routed to the agent."""
+        agent = self.agents.get(order.agent_id)
+        if agent is not None:
+            self._order_owners[order.id] = (agent, order)
+    
+    def _order_done(self, order_id: int) -> None:
+        """Forget a finished order, telling its owner unless a fill already did."""
+        owner = self._order_owners.pop(order_id, None)
+        if owner is not None and owner[1].status is not OrderStatus.FILLED:
+            owner[0].on_order_done(owner[1])
+    
+    def _record_trades(self, trades: List[Trade]) -> None:
+        """Record a batch of trades, send each fill to its two owners, then publish the batch."""
+        self.trades.extend(trades)
+        for listener in self._trade_listeners:
+            listener(trades)
+        owners = self._order_owners
+        done = []
+        for trade in trades:
+            for order_id in (trade.buyer_order_id, trade.seller_order_id):
+                owner = owners.get(order_id)
+                if owner is not None:
+                    agent, order = owner
+                    agent.on_order_fill(order, trade)
+                    if order.status in _DONE:
+                        done.append(order_id)
+        # Orders finish after their last fill of the batch, which may come later
+        for order_id in done:
+            self._order_done(order_id)
+        self.market_data.publish_trades(trades)
     
     def _update_order_books(self) -> None:
-        """Update order book snapshots and notify agents."""
-        for symbol, exchange in self.exchanges.items():
-            bids, asks = exchange.get_order_book_snapshot()
+        """Update order book snapshots and notify subscribed agents.
+        
+        Fixed-step runs cover every book each step; event-driven runs only
+        the books that changed since the last notification, plus those
+        with a throttled update now due.
+        """
+        if self.fixed_step:
+            symbols = list(self.exchanges)
+        else:
+            held = self.market_data.held_symbols(self.current_time)
+            symbols = [symbol for symbol in self.exchanges if symbol in self._dirty_symbols or symbol in held]
+        self._dirty_symbols.clear()
+        snapshots = [] if self._sample_due('order_book_snapshots') else None
+        for symbol in symbols:
+            exchange = self.exchanges[symbol]
             
             # Record snapshot
-            self.metrics['order_book_snapshots'].append({
-                'timestamp': self.current_time,
-                'symbol': symbol,
-                'bids': bids,
-                'asks': asks
-            })
+            if snapshots is not None:
+                bids, asks = exchange.get_order_book_snapshot()
+                snapshots.append({
+                    'timestamp': self.current_time,
+                    'symbol': symbol,
+                    'bids': bids,
+                    'asks': asks
+                })
             
-            # Notify agents
-            for agent in self.agents.values():
-                agent.on_order_book_update(symbol, bids, asks)
+            # Notify subscribers, sending any order they return to the gateway
+            deltas = exchange.drain_deltas() if self.market_data_level else None
+            for order in self.market_data.publish_book(symbol, exchange, self.current_time, deltas):
+                self.gateway.submit(order)
+        if snapshots:
+            self.metrics_sink.write('order_book_snapshots', snapshots)
+    
+    def _sample_due(self, family: str) -> bool:
+        """Whether a metric family should be recorded at the current time."""
+        interval = self.metrics_intervals.get(family)
+        if not interval:
+            return True
+        due = self._next_samples.get(family)
+        if due is not None and self.current_time < due:
+            return False
+        self._next_samples[family] = self.current_time + interval
+        return True
     
     def _collect_metrics(self) -> None:
-        """Collect various simulation metrics."""
-        # Get current prices for portfolio calculations
-        current_prices = {}
-        for symbol, exchange in self.exchanges.items():
-            bids, asks = exchange.get_order_book_snapshot()
-            if bids and asks:  # Use mid price if available
-                current_prices[symbol] = (Decimal(str(bids[0][0])) + Decimal(str(asks[0][0]))) / 2
+        """Collect various simulation metrics.
         
-        # Collect agent metrics
-        for agent in self.agents.values():
-            portfolio_summary = agent.get_portfolio_summary(current_prices)
-            self.metrics['agent_metrics'].append({
-                'timestamp': self.current_time,
-                **portfolio_summary
-            })
-        
-        # Collect market metrics
+        All portfolios are marked to the mid prices in one vectorized pass
+        per step; per-agent summary dicts are only built when agent metrics
+        are sampled.
+        """
+        sample_market = self._sample_due('market_metrics')
+        market_metrics = []
+        prices = np.full(len(self.portfolio.symbols), np.nan)
         for symbol, exchange in self.exchanges.items():
             bids, asks = exchange.get_order_book_snapshot()
-            if bids and asks:
-                spread = Decimal(str(asks[0][0])) - Decimal(str(bids[0][0]))
-                spread_pct = spread / Decimal(str(bids[0][0])) * 100
+            if not (bids and asks):
+                continue
+            # Use mid price for portfolio valuation
+            prices[self.portfolio.symbol_index(symbol)] = (bids[0][0] + asks[0][0]) / 2
+            
+            # Collect market metrics
+            if sample_market:
+                spread = asks[0][0] - bids[0][0]
+                spread_pct = spread / bids[0][0] * 100
                 
-                self.metrics['market_metrics'].append({
+                market_metrics.append({
                     'timestamp': self.current_time,
                     'symbol': symbol,
                     'bid': bids[0][0],
@@ -145,38 +415,170 @@ class MarketSimulation:
                     'bid_volume': sum(qty for _, qty in bids),
                     'ask_volume': sum(qty for _, qty in asks)
                 })
+        if market_metrics:
+            self.metrics_sink.write('market_metrics', market_metrics)
+        
+        valuation = self.portfolio_valuation = self.portfolio.valuation(prices)
+        
+        # Collect agent metrics
+        if self._sample_due('agent_metrics') and self.agents:
+            summaries = self.portfolio.summaries(prices, valuation)
+            for summary in summaries:
+                agent = self.agents[summary['agent_id']]
+                summary['timestamp'] = self.current_time
+                summary['open_orders'] = len(agent.orders)
+                summary['total_trades'] = len(agent.trades)
+            self.metrics_sink.write('agent_metrics', summaries)
     
     def run(self) -> Dict[str, Any]:
         """Run the simulation."""
         self.logger.info(f"Starting simulation from {self.start_time} to {self.end_time}")
+        use_id_sequences(self.id_sequences)
+        if self.checkpoint_interval:
+            self._check_picklable()
         
         while self.current_time <= self.end_time:
-            # Process scheduled events
-            while self.event_queue and self.event_queue[0].timestamp <= self.current_time:
-                event = heapq.heappop(self.event_queue)
-                self._process_event(event)
+            self.step_count += 1
+            
+            # Expire GTD orders that are due, before anything can trade with them
+            if self.exchange_host is not None:
+                expired = self.exchange_host.expire_orders(self.current_time)
+            else:
+                expired = []
+                for exchange in self.exchanges.values():
+                    expired.extend(exchange.expire_orders(self.current_time))
+            self._dirty_symbols.update(order.symbol for order in expired)
+            for order in expired:
+                self._order_done(order.id)
+            
+            # Process scheduled events, batching consecutive orders
+            orders = []
+            for code, data in self.event_queue.pop_due(datetime_to_ns(self.current_time)):
+                if code == EventType.ORDER:
+                    orders.append(data)
+                    continue
+                if orders:
+                    self.process_orders(orders)
+                    orders = []
+                self._handlers[code](data)
+            if orders:
+                self.process_orders(orders)
             
             # Update agents
-            for agent in self.agents.values():
+            for agent in self._agents_to_wake():
                 agent.on_time_update(self.current_time)
+            self.gateway.flush()
             
             # Update order books and collect metrics
             self._update_order_books()
+            self.gateway.flush()
             self._collect_metrics()
             
             # Advance time
-            self.current_time += self.time_step
+            next_time = self._next_wakeup()
+            if next_time is None:
+                break
+            self.current_time = next_time
+            
+            if self._next_checkpoint is not None and self.current_time >= self._next_checkpoint:
+                self._next_checkpoint = self.current_time + self.checkpoint_interval
+                self.checkpoint(self.checkpoint_path)
         
+        self.metrics_sink.close()
         self.logger.info("Simulation completed")
         return self._get_simulation_results()
     
-    def _process_event(self, event: SimulationEvent) -> None:
-        """Process a simulation event."""
-        if event.event_type == 'order':
-            self.process_order(event.data)
-        elif event.event_type == 'market_event':
-            self._handle_market_event(event.data)
-        # Add more event types as needed
+    def checkpoint(self, path: str) -> None:
+        """Save the full simulation state to a compressed file.
+        
+        The file holds the pickled simulation: clock, event queue, order
+        books, agents with their orders, positions and random streams,
+        trade listeners, event handlers, metrics sink and id sequences. A
+        run with a checkpoint_interval checks before its first step that
+        its listeners and handlers can be pickled. It is written
+        to a temporary file first, so an interrupted save leaves the last
+        checkpoint intact.
+        """
+        if self.exchange_host is not None:
+            raise ValueError("Simulations on a sharded exchange host cannot be checkpointed")
+        state = {'format': CHECKPOINT_FORMAT, 'simulation': self}
+        temporary = f"{path}.tmp"
+        with gzip.open(temporary, 'wb', compresslevel=6) as file:
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        self.logger.info(f"Checkpoint at {self.current_time} saved to {path}")
+    
+    def _check_picklable(self) -> None:
+        """Fail before the run, not at its first checkpoint, on callbacks pickle can't save."""
+        callbacks = [*self._trade_listeners, *(handler for code, handler in self._handlers.items()
+                                               if code not in _BUILTIN_HANDLERS)]
+        for callback in callbacks:
+            try:
+                pickle.dumps(callback, protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, AttributeError, TypeError) as error:
+                raise ValueError(f"Checkpointed runs need picklable trade listeners and event "
+                                 f"handlers; {callback!r} is not: {error}") from error
+    
+    @classmethod
+    def restore(cls, path: str, metrics_sink: Optional[MetricsSink] = None) -> 'MarketSimulation':
+        """Load a checkpoint; run() then continues exactly where it was saved.
+        
+        The restored simulation's id sequences become current.
+        Pass a metrics_sink to fork a run without writing to the original
+        run's sink, which a file sink would otherwise continue.
+        """
+        with gzip.open(path, 'rb') as file:
+            state = pickle.load(file)
+        if state.get('format') != CHECKPOINT_FORMAT:
+            raise ValueError(f"Unsupported checkpoint format: {state.get('format')}")
+        sim = state['simulation']
+        use_id_sequences(sim.id_sequences)
+        if metrics_sink is not None:
+            sim.metrics_sink = metrics_sink
+        return sim
+    
+    def _agents_to_wake(self) -> List[BaseAgent]:
+        """Agents due an on_time_update now: all of them in a fixed-step run."""
+        if self.fixed_step:
+            return list(self.agents.values())
+        due: Dict[str, None] = {}  # Ordered set, in request order
+        while self._timers and self._timers[0][0] <= self.current_time:
+            due[heapq.heappop(self._timers)[2]] = None
+        return [self.agents[agent_id] for agent_id in due if agent_id in self.agents]
+    
+    def _next_wakeup(self) -> Optional[datetime]:
+        """Time of the next step to run, or None when nothing is left to do.
+        
+        Event-driven runs wake at the first time step not before the next
+        event, timer or GTD expiry, or at the next step if agents changed a
+        book while being notified, so results match a fixed-step run of
+        passive agents.
+        """
+        next_step = self.current_time + self.time_step
+        if self.fixed_step:
+            return next_step
+        candidates = []
+        next_event = self.event_queue.peek_ns()
+        if next_event is not None:
+            candidates.append(next_event)
+        if self._timers:
+            candidates.append(datetime_to_ns(self._timers[0][0]))
+        held = self.market_data.next_held()
+        if held is not None:
+            candidates.append(datetime_to_ns(held))
+        if self.exchange_host is not None:
+            expiries = [self.exchange_host.next_expiry()]
+        else:
+            expiries = [exchange.next_expiry() for exchange in self.exchanges.values()]
+        candidates.extend(datetime_to_ns(expiry) for expiry in expiries if expiry is not None)
+        if self._dirty_symbols:
+            candidates.append(datetime_to_ns(next_step))
+        if not candidates:
+            return None
+        # Round up onto the start_time + k * time_step grid
+        step_ns = self.time_step // timedelta(microseconds=1) * 1000
+        steps = -((datetime_to_ns(self.start_time) - min(candidates)) // step_ns)
+        return max(self.start_time + steps * self.time_step, next_step)
     
     def _handle_market_event(self, event_data: Dict) -> None:
         """Handle various market events."""
@@ -206,7 +608,9 @@ class MarketSimulation:
         return {
             'start_time': self.start_time,
             'end_time': self.end_time,
-            'trades': self.trades,
+            'trades': self.trades.trades(),          # Lazily materialized Trade objects
+            'trade_tape': self.trades.view(),        # Zero-copy columnar view
+            'trade_symbols': self.trades.symbols,    # Symbol index -> symbol
             'metrics': self.metrics,
             'final_state': {
                 'agents': {
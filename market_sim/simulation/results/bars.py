@@ -0,0 +1,162 @@
+"""
+OHLCV bars.
+
+BarAggregator listens to a simulation's trades and builds open/high/low/
+close/volume/VWAP bars per symbol at several intervals as the run goes,
+instead of filtering the full trade list afterwards. Bars are aligned to
+multiples of their interval since the epoch and only exist for intervals
+that saw trades.
+
+Bars convert to rows of the raw_stock_data table (ticker, date, open, high,
+low, close, volume) and to the date-indexed Open/High/Low/Close/Volume
+frames DatabaseManager.save_raw_stock_data stores, so simulated prices can
+go through the same StockAnalyzer tooling as market data. The table keeps
+one row per ticker and date, so only daily bars convert; intraday bars
+raise ValueError rather than collide on the date key.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.models.base import Trade
+from core.utils.time_utils import datetime_to_ns, ns_to_datetime
+
+try:
+    import pandas as pd
+except ImportError:  # Optional dependency, only needed by BarAggregator.to_frame
+    pd = None
+
+DAY = timedelta(days=1)
+
+@dataclass(slots=True)
+class Bar:
+    """Trades of one symbol in [start, start + interval)."""
+    symbol: str
+    start: datetime
+    interval: timedelta
+    open: Decimal
+    high: Decimal
+    low: Decimal
+    close: Decimal
+    volume: Decimal
+    notional: Decimal  # Sum of price * quantity
+    trades: int = 1
+
+    @property
+    def vwap(self) -> Decimal:
+        return self.notional / self.volume
+
+    def add(self, price: Decimal, quantity: Decimal) -> None:
+        if price > self.high:
+            self.high = price
+        elif price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += quantity
+        self.notional += price * quantity
+        self.trades += 1
+
+    @property
+    def whole_volume(self) -> int:
+        """Volume rounded to a whole number of shares (half to even), as the table stores it."""
+        return int(self.volume.to_integral_value(rounding=ROUND_HALF_EVEN))
+
+    def to_record(self) -> Dict[str, Any]:
+        """The bar as a raw_stock_data row; only daily bars have one."""
+        _require_daily(self.interval)
+        return {
+            'ticker': self.symbol,
+            'date': self.start.date(),
+            'open': self.open,
+            'high': self.high,
+            'low': self.low,
+            'close': self.close,
+            'volume': self.whole_volume
+        }
+
+class BarAggregator:
+    """Builds bars at every interval in `intervals` from a stream of trade batches.
+
+    Attach it with MarketSimulation.add_trade_listener(aggregator), or
+    call it with trades directly. `on_bar` is called with each bar as it
+    completes, i.e. when a later trade of its symbol falls past its end.
+    """
+
+    def __init__(self, intervals: Iterable[timedelta] = (timedelta(seconds=1), timedelta(minutes=1)),
+                 on_bar: Optional[Callable[[Bar], None]] = None):
+        self.intervals = list(intervals)
+        self.on_bar = on_bar
+        self._interval_ns = {interval: interval // timedelta(microseconds=1) * 1000 for interval in self.intervals}
+        # interval -> symbol -> completed bars, and the bar still open
+        self.completed: Dict[timedelta, Dict[str, List[Bar]]] = {interval: {} for interval in self.intervals}
+        self._open: Dict[Tuple[timedelta, str], Tuple[int, Bar]] = {}
+
+    def __call__(self, trades: List[Trade]) -> None:
+        self.add_trades(trades)
+
+    def add_trades(self, trades: Iterable[Trade]) -> None:
+        """Fold a batch of trades into the open bars, completing any they move past."""
+        for trade in trades:
+            timestamp_ns = datetime_to_ns(trade.timestamp)
+            for interval, interval_ns in self._interval_ns.items():
+                bucket = timestamp_ns // interval_ns
+                key = (interval, trade.symbol)
+                current = self._open.get(key)
+                if current is not None and current[0] == bucket:
+                    current[1].add(trade.price, trade.quantity)
+                    continue
+                if current is not None:
+                    self._complete(current[1])
+                bar = Bar(trade.symbol, ns_to_datetime(bucket * interval_ns), interval, trade.price, trade.price,
+                          trade.price, trade.price, trade.quantity, trade.price * trade.quantity)
+                self._open[key] = (bucket, bar)
+
+    def _complete(self, bar: Bar) -> None:
+        self.completed[bar.interval].setdefault(bar.symbol, []).append(bar)
+        if self.on_bar is not None:
+            self.on_bar(bar)
+
+    def flush(self) -> None:
+        """Complete every open bar, e.g. once the run has ended."""
+        for _, bar in sorted(self._open.values(), key=lambda item: item[1].start):
+            self._complete(bar)
+        self._open.clear()
+
+    def bars(self, interval: timedelta, symbol: str) -> List[Bar]:
+        """Bars of a symbol in time order, including the one still open."""
+        bars = list(self.completed[interval].get(symbol, []))
+        current = self._open.get((interval, symbol))
+        if current is not None:
+            bars.append(current[1])
+        return bars
+
+    def symbols(self) -> List[str]:
+        return sorted({symbol for bars in self.completed.values() for symbol in bars} |
+                      {symbol for _, symbol in self._open})
+
+    def records(self, interval: timedelta) -> List[Dict[str, Any]]:
+        """raw_stock_data rows for every symbol's daily bars."""
+        _require_daily(interval)
+        return [bar.to_record() for symbol in self.symbols() for bar in self.bars(interval, symbol)]
+
+    def to_frame(self, interval: timedelta, symbol: str) -> 'pd.DataFrame':
+        """A symbol's daily bars as the date-indexed frame save_raw_stock_data takes. Requires pandas."""
+        if pd is None:
+            raise ImportError("BarAggregator.to_frame requires pandas")
+        _require_daily(interval)
+        bars = self.bars(interval, symbol)
+        return pd.DataFrame({
+            'Open': [float(bar.open) for bar in bars],
+            'High': [float(bar.high) for bar in bars],
+            'Low': [float(bar.low) for bar in bars],
+            'Close': [float(bar.close) for bar in bars],
+            'Volume': [bar.whole_volume for bar in bars],
+            'VWAP': [float(bar.vwap) for bar in bars],
+            'Trades': [bar.trades for bar in bars]
+        }, index=pd.DatetimeIndex([bar.start.date() for bar in bars], name='date'))
+
+def _require_daily(interval: timedelta) -> None:
+    if interval != DAY:
+        raise ValueError(f"raw_stock_data holds one row per ticker and date; {interval} bars would collide")
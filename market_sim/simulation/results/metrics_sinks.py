@@ -0,0 +1,192 @@
+"""
+Metrics sinks.
+
+MarketSimulation hands each metric family ('order_book_snapshots',
+'agent_metrics', 'market_metrics') to a sink as a batch of records per
+step. The in-memory sink keeps them as lists of dicts, as results have
+always been returned; the file sinks stream them to disk so memory stays
+flat over long runs, and the null sink drops them.
+"""
+
+import csv
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Optional dependency, only needed by ParquetMetricsSink
+    pa = pq = None
+
+METRIC_FAMILIES = ('order_book_snapshots', 'agent_metrics', 'market_metrics')
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _flatten(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Make a record tabular: Decimals become floats and nested values JSON strings."""
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, Decimal):
+            value = float(value)
+        elif isinstance(value, (list, tuple, dict)):
+            value = json.dumps(value, default=_json_default)
+        row[key] = value
+    return row
+
+class MetricsSink(ABC):
+    """Destination for batches of metric records."""
+
+    @abstractmethod
+    def write(self, family: str, records: List[Dict[str, Any]]) -> None:
+        """Accept a batch of records of one metric family."""
+        pass
+
+    def close(self) -> None:
+        """Flush anything buffered; called when the simulation finishes."""
+        pass
+
+    def results(self) -> Dict[str, Any]:
+        """What the simulation reports under results['metrics']."""
+        return {}
+
+class InMemoryMetricsSink(MetricsSink):
+    """Keeps every record in per-family lists."""
+
+    def __init__(self):
+        self.metrics: Dict[str, List[Dict]] = {family: [] for family in METRIC_FAMILIES}
+
+    def write(self, family: str, records: List[Dict[str, Any]]) -> None:
+        self.metrics.setdefault(family, []).extend(records)
+
+    def results(self) -> Dict[str, Any]:
+        return self.metrics
+
+class NullMetricsSink(MetricsSink):
+    """Discards all records."""
+
+    def write(self, family: str, records: List[Dict[str, Any]]) -> None:
+        pass
+
+class CsvMetricsSink(MetricsSink):
+    """Streams each family to `<directory>/<family>.csv`.
+
+    Columns come from the family's first record; nested values are stored
+    as JSON. A pickled sink remembers how far each file was written; the
+    unpickled copy truncates a file to that point when it next writes to
+    it, so a restored simulation checkpoint continues the same files.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._files: Dict[str, Any] = {}
+        self._writers: Dict[str, csv.DictWriter] = {}
+        self._fieldnames: Dict[str, List[str]] = {}
+        # Set when unpickled: where to truncate each file before appending
+        self._resume_offsets: Dict[str, int] = {}
+        self.rows: Dict[str, int] = {}
+
+    def path(self, family: str) -> str:
+        return os.path.join(self.directory, f"{family}.csv")
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        offsets = dict(self._resume_offsets)
+        for family, file in self._files.items():
+            file.flush()
+            offsets[family] = file.tell()
+        state.update(_files={}, _writers={}, _resume_offsets=offsets)
+        return state
+
+    def write(self, family: str, records: List[Dict[str, Any]]) -> None:
+        if not records:
+            return
+        writer = self._writers.get(family)
+        if writer is None:
+            offset = self._resume_offsets.pop(family, None)
+            if offset is None:
+                file = self._files[family] = open(self.path(family), 'w', newline='')
+                self._fieldnames[family] = list(records[0])
+            else:
+                file = self._files[family] = open(self.path(family), 'r+', newline='')
+                file.truncate(offset)
+                file.seek(offset)
+            writer = self._writers[family] = csv.DictWriter(file, fieldnames=self._fieldnames[family],
+                                                            extrasaction='ignore')
+            if offset is None:
+                writer.writeheader()
+                self.rows[family] = 0
+        writer.writerows(_flatten(record) for record in records)
+        self.rows[family] += len(records)
+
+    def close(self) -> None:
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
+        self._writers.clear()
+
+    def results(self) -> Dict[str, Any]:
+        return {family: self.path(family) for family in self.rows}
+
+class ParquetMetricsSink(MetricsSink):
+    """Streams each family to `<directory>/<family>.parquet` in row groups.
+
+    Records are buffered until `row_group_size` of a family have arrived and
+    then written as one row group. The schema is taken from the first row
+    group; nested values are stored as JSON strings. Requires pyarrow.
+    """
+
+    def __init__(self, directory: str, row_group_size: int = 50_000):
+        if pa is None:
+            raise ImportError("ParquetMetricsSink requires pyarrow")
+        self.directory = directory
+        self.row_group_size = row_group_size
+        os.makedirs(directory, exist_ok=True)
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._writers: Dict[str, Any] = {}
+        self.rows: Dict[str, int] = {}
+
+    def path(self, family: str) -> str:
+        return os.path.join(self.directory, f"{family}.parquet")
+
+    def write(self, family: str, records: List[Dict[str, Any]]) -> None:
+        buffer = self._buffers.setdefault(family, [])
+        buffer.extend(_flatten(record) for record in records)
+        if len(buffer) >= self.row_group_size:
+            self._flush(family)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        raise TypeError("ParquetMetricsSink cannot be checkpointed; Parquet files cannot be appended to")
+
+    def _flush(self, family: str) -> None:
+        buffer = self._buffers.get(family)
+        if not buffer:
+            return
+        writer = self._writers.get(family)
+        if writer is None:
+            table = pa.Table.from_pylist(buffer)
+            writer = self._writers[family] = pq.ParquetWriter(self.path(family), table.schema)
+        else:
+            table = pa.Table.from_pylist(buffer, schema=writer.schema)
+        writer.write_table(table)
+        self.rows[family] = self.rows.get(family, 0) + len(buffer)
+        buffer.clear()
+
+    def close(self) -> None:
+        for family in list(self._buffers):
+            self._flush(family)
+        for writer in self._writers.values():
+            writer.close()
+        self._writers.clear()
+
+    def results(self) -> Dict[str, Any]:
+        return {family: self.path(family) for family in self.rows}
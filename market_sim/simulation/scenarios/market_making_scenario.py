@@ -9,18 +9,38 @@ This scenario simulates a market with:
 
 from datetime import datetime, timedelta
 from decimal import Decimal
-import random
-from typing import List, Dict
+from typing import Any, List, Dict, Optional
 import numpy as np
 
 from core.models.base import Asset, OrderSide, OrderType, Trade
 from market.agents.base_agent import BaseAgent
+from market.agents.trader_population import TraderPopulation
+from market.exchange.market_data import Subscription
 from strategies.hft.market_maker import MarketMaker
 from simulation.engine.simulation_engine import MarketSimulation
+from simulation.results.bars import BarAggregator
+from simulation.results.metrics_sinks import MetricsSink
 from core.utils.time_utils import utc_now
 
+# MarketMaker settings of the scenario; market_maker_params overrides them
+DEFAULT_MARKET_MAKER_PARAMS: Dict[str, Any] = {
+    'max_position': Decimal('10000'),
+    'target_spread': Decimal('0.002'),  # 0.2% spread
+    'position_limit': Decimal('50000'),
+    'risk_factor': Decimal('0.5'),
+    'order_size': Decimal('100'),
+    'min_spread': Decimal('0.001'),
+    'max_spread': Decimal('0.005'),
+    'volatility_window': 100,
+    'reference_price': Decimal('100')  # Opening mid price the market maker quotes around
+}
+
+# Price and size grid of every symbol in the scenario
+TICK_SIZE = Decimal('0.01')
+LOT_SIZE = Decimal('1')
+
 class RandomTrader(BaseAgent):
-    """Simple trader that randomly places market orders."""
+    """Simple trader that randomly places market orders in whole multiples of min_trade_size."""
     def __init__(self, agent_id: str, initial_balance: Decimal,
                  symbols: List[str],
                  trade_frequency: float = 0.1,  # Probability of trading each update
@@ -33,29 +53,31 @@ class RandomTrader(BaseAgent):
         self.max_trade_size = max_trade_size
         self.last_prices: Dict[str, Decimal] = {}
     
+    def market_data_subscriptions(self) -> List[Subscription]:
+        """Books and trades of the traded symbols."""
+        return [Subscription(symbols=self.symbols, trades=True)]
+    
     def on_order_book_update(self, symbol: str, bids: List[tuple], asks: List[tuple]) -> None:
         """Possibly place a random trade."""
         if symbol not in self.symbols or not bids or not asks:
             return
             
-        if random.random() > self.trade_frequency:
+        if self.rng.random() > self.trade_frequency:
             return
             
         # Update last known price
-        mid_price = (Decimal(str(bids[0][0])) + Decimal(str(asks[0][0]))) / 2
+        mid_price = (bids[0][0] + asks[0][0]) / 2
         self.last_prices[symbol] = mid_price
         
         # Randomly choose direction and size
-        side = random.choice([OrderSide.BUY, OrderSide.SELL])
-        size = Decimal(str(random.uniform(
-            float(self.min_trade_size),
-            float(self.max_trade_size)
-        )))
+        side = self.rng.choice([OrderSide.BUY, OrderSide.SELL])
+        size = self.rng.randint(1, int(self.max_trade_size // self.min_trade_size)) * self.min_trade_size
         
         # Create and validate order
         order = self.create_market_order(symbol, side, size)
         if self.validate_order(order, self.last_prices):
             return order
+        self.orders.pop(str(order.id), None)
     
     def on_trade(self, trade: Trade) -> None:
         """Update last known price on trades."""
@@ -71,9 +93,21 @@ def create_market_making_scenario(
     duration: timedelta = timedelta(hours=1),
     symbols: List[str] = None,
     num_random_traders: int = 10,
-    include_market_events: bool = True
+    include_market_events: bool = True,
+    seed: Optional[int] = None,
+    market_maker_params: Optional[Dict[str, Any]] = None,
+    metrics_sink: Optional[MetricsSink] = None,
+    num_population_traders: int = 0,
+    fixed_point: bool = False
 ) -> MarketSimulation:
-    """Create a market making scenario."""
+    """Create a market making scenario; a seed makes the run reproducible.
+    
+    market_maker_params overrides entries of DEFAULT_MARKET_MAKER_PARAMS;
+    numbers given for Decimal settings are converted. num_population_traders
+    adds that many noise traders, simulated together as one TraderPopulation.
+    With fixed_point the exchanges match on integer ticks and lots; every
+    agent keeps its prices and sizes on that grid.
+    """
     
     # Set default values
     if start_time is None:
@@ -85,7 +119,9 @@ def create_market_making_scenario(
     sim = MarketSimulation(
         start_time=start_time,
         end_time=start_time + duration,
-        time_step=timedelta(milliseconds=100)
+        time_step=timedelta(milliseconds=100),
+        seed=seed,
+        metrics_sink=metrics_sink
     )
     
     # Add assets
@@ -95,26 +131,25 @@ def create_market_making_scenario(
             name=f"Stock {symbol}",
             asset_type="stock",
             decimals=2,
-            min_trade_size=Decimal('1'),
+            min_trade_size=LOT_SIZE,
             max_trade_size=Decimal('1000000'),
-            tick_size=Decimal('0.01')
+            tick_size=TICK_SIZE
         )
         sim.add_asset(asset)
-        sim.add_exchange(symbol)
+        sim.add_exchange(symbol, fixed_point=fixed_point)
     
     # Add market maker
+    params = dict(DEFAULT_MARKET_MAKER_PARAMS)
+    for name, value in (market_maker_params or {}).items():
+        default = DEFAULT_MARKET_MAKER_PARAMS.get(name)
+        params[name] = Decimal(str(value)) if isinstance(default, Decimal) else value
     market_maker = MarketMaker(
         agent_id="MM_001",
         initial_balance=Decimal('1000000'),
         symbols=symbols,
-        max_position=Decimal('10000'),
-        target_spread=Decimal('0.002'),  # 0.2% spread
-        position_limit=Decimal('50000'),
-        risk_factor=Decimal('0.5'),
-        order_size=Decimal('100'),
-        min_spread=Decimal('0.001'),
-        max_spread=Decimal('0.005'),
-        volatility_window=100
+        tick_size=TICK_SIZE,
+        lot_size=LOT_SIZE,
+        **params
     )
     sim.add_agent(market_maker)
     
@@ -129,6 +164,17 @@ def create_market_making_scenario(
             max_trade_size=Decimal('1000')
         )
         sim.add_agent(trader)
+    
+    if num_population_traders:
+        sim.add_agent(TraderPopulation(
+            agent_id="POPULATION",
+            num_traders=num_population_traders,
+            initial_balance=Decimal('100000'),
+            symbols=symbols,
+            trade_frequency=0.01,
+            min_trade_size=Decimal('1'),
+            max_trade_size=Decimal('100')
+        ))
 
     # Schedule initial market orders to seed trading
     for symbol in symbols:
@@ -169,12 +215,12 @@ def _add_market_events(
     # Add some price shocks
     for symbol in symbols:
         # Add 2-3 price shocks per symbol
-        num_shocks = random.randint(2, 3)
+        num_shocks = sim.rng.randint(2, 3)
         for _ in range(num_shocks):
             shock_time = start_time + timedelta(
-                seconds=random.uniform(0, duration.total_seconds())
+                seconds=sim.rng.uniform(0, duration.total_seconds())
             )
-            magnitude = random.uniform(-5, 5)  # -5% to +5% price shock
+            magnitude = sim.rng.uniform(-5, 5)  # -5% to +5% price shock
             
             sim.schedule_event(
                 timestamp=shock_time,
@@ -189,12 +235,12 @@ def _add_market_events(
     # Add volatility regime changes
     for symbol in symbols:
         # Add 1-2 volatility changes per symbol
-        num_changes = random.randint(1, 2)
+        num_changes = sim.rng.randint(1, 2)
         for _ in range(num_changes):
             change_time = start_time + timedelta(
-                seconds=random.uniform(0, duration.total_seconds())
+                seconds=sim.rng.uniform(0, duration.total_seconds())
             )
-            new_volatility = random.uniform(0.1, 0.4)  # 10% to 40% annualized volatility
+            new_volatility = sim.rng.uniform(0.1, 0.4)  # 10% to 40% annualized volatility
             
             sim.schedule_event(
                 timestamp=change_time,
@@ -221,8 +267,13 @@ if __name__ == '__main__':
         include_market_events=True
     )
     
+    # Aggregate trades into bars as the run goes
+    bars = BarAggregator(intervals=[timedelta(seconds=1), timedelta(minutes=1)])
+    sim.add_trade_listener(bars)
+    
     print(f"Running simulation...")
     results = sim.run()
+    bars.flush()
     
     print("\nSimulation completed!")
     print(f"Total trades: {len(results['trades'])}")
@@ -230,11 +281,13 @@ if __name__ == '__main__':
     
     # Print some basic statistics
     for symbol in symbols:
-        symbol_trades = [t for t in results['trades'] if t.symbol == symbol]
-        if symbol_trades:
-            prices = [float(t.price) for t in symbol_trades]
+        minute_bars = bars.bars(timedelta(minutes=1), symbol)
+        if minute_bars:
+            volume = sum(bar.volume for bar in minute_bars)
+            vwap = sum(bar.notional for bar in minute_bars) / volume
+            closes = [float(bar.close) for bar in bars.bars(timedelta(seconds=1), symbol)]
             print(f"\n{symbol} Statistics:")
-            print(f"Number of trades: {len(symbol_trades)}")
-            print(f"Average price: ${np.mean(prices):.2f}")
-            print(f"Price range: ${min(prices):.2f} - ${max(prices):.2f}")
-            print(f"Price volatility: {np.std(prices):.4f}") 
\ No newline at end of file
+            print(f"Number of trades: {sum(bar.trades for bar in minute_bars)}")
+            print(f"VWAP: ${vwap:.2f}")
+            print(f"Price range: ${min(bar.low for bar in minute_bars):.2f} - ${max(bar.high for bar in minute_bars):.2f}")
+            print(f"Price volatility (1s closes): {np.std(closes):.4f}")
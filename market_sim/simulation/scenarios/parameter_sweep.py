@@ -0,0 +1,238 @@
+"""
+Parameter Sweep
+
+Runs the market making scenario over many configurations in a process pool:
+1. Configurations come from a grid or a random search over MarketMaker
+   parameters and scenario settings such as the number of random traders
+2. Every run gets its own seed derived from the sweep seed and the
+   configuration, so a run gives the same result wherever and whenever it runs
+3. One summary row per run is appended to a CSV results table as runs finish
+4. Runs already in the table are skipped, so an interrupted sweep resumes
+5. A run that raises is logged and left out of the table, so the rest of the
+   sweep still completes and a rerun retries it
+"""
+
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+from simulation.results.metrics_sinks import NullMetricsSink
+from simulation.scenarios.market_making_scenario import create_market_making_scenario
+
+# Configuration keys passed to create_market_making_scenario; every other key
+# is a MarketMaker parameter
+SCENARIO_KEYS = ('num_random_traders', 'include_market_events', 'num_population_traders', 'fixed_point')
+
+SUMMARY_FIELDS = (
+    'num_trades', 'volume', 'mm_trades', 'mm_volume', 'mm_cash_balance', 'mm_total_value',
+    'mm_pnl', 'mm_realized_pnl', 'mm_gross_position', 'steps', 'elapsed_seconds'
+)
+
+SWEEP_START = datetime(2025, 1, 2, 14, 30, tzinfo=timezone.utc)
+
+logger = logging.getLogger(__name__)
+
+def grid_search(space: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """Every combination of the values listed per parameter."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+def random_search(space: Dict[str, Union[Sequence[Any], Tuple[Any, Any]]], num_samples: int,
+                  seed: int = 0) -> List[Dict[str, Any]]:
+    """Draw `num_samples` configurations from `space`.
+
+    A list is sampled uniformly; a (low, high) tuple is a range, drawn as an
+    integer when both bounds are ints and as a uniform float otherwise.
+    """
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(num_samples):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    config[name] = rng.randint(low, high)
+                else:
+                    config[name] = rng.uniform(float(low), float(high))
+            else:
+                config[name] = rng.choice(list(values))
+        configs.append(config)
+    return configs
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """Stable short hash of a configuration, independent of key order."""
+    canonical = json.dumps(config, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode()).hexdigest()[:16]
+
+def run_seed(base_seed: int, run_id: str) -> int:
+    """Seed of one run, derived from the sweep seed and the run id."""
+    return int(hashlib.sha1(f"{base_seed}:{run_id}".encode()).hexdigest()[:8], 16)
+
+def run_configuration(config: Dict[str, Any], seed: int, duration: timedelta,
+                      symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run one scenario and summarize it; runs in a worker process."""
+    scenario_args = {key: config[key] for key in SCENARIO_KEYS if key in config}
+    market_maker_params = {key: value for key, value in config.items() if key not in SCENARIO_KEYS}
+    started = time.perf_counter()
+    sim = create_market_making_scenario(
+        start_time=SWEEP_START,
+        duration=duration,
+        symbols=symbols,
+        seed=seed,
+        market_maker_params=market_maker_params,
+        metrics_sink=NullMetricsSink(),
+        **scenario_args
+    )
+    market_maker = sim.agents['MM_001']
+    initial_balance = float(market_maker.balance)
+    results = sim.run()
+    elapsed = time.perf_counter() - started
+
+    tape = results['trade_tape']
+    summary = {
+        'num_trades': len(tape),
+        'volume': float(tape['quantity'].sum()),
+        'mm_trades': len(market_maker.trades),
+        'mm_volume': float(market_maker.trades.view()['quantity'].sum()),
+        'mm_cash_balance': float(market_maker.balance),
+        'mm_realized_pnl': float(sum(p.realized_pnl for p in market_maker.positions.values())),
+        'mm_gross_position': float(sum(abs(p.quantity) for p in market_maker.positions.values())),
+        'steps': sim.step_count,
+        'elapsed_seconds': round(elapsed, 3)
+    }
+    # Mark to the last mid prices, as computed for the final step
+    valuation = sim.portfolio_valuation
+    if valuation is not None:
+        total_value = float(valuation.total_value[sim.portfolio.agent_index('MM_001')])
+    else:
+        total_value = summary['mm_cash_balance']
+    summary['mm_total_value'] = total_value
+    summary['mm_pnl'] = total_value - initial_balance
+    return summary
+
+class ParameterSweep:
+    """Runs configurations of the market making scenario across a process pool.
+
+    Each configuration runs `replicates` times with different seeds. Rows
+    are appended to `results_path` as runs finish; rerunning the same sweep
+    skips the run ids already in the file. Runs that raise are recorded in
+    `failures` (run id -> error) rather than stopping the sweep.
+    """
+
+    def __init__(self, configs: Iterable[Dict[str, Any]], results_path: str,
+                 duration: timedelta = timedelta(minutes=5),
+                 symbols: Optional[List[str]] = None,
+                 replicates: int = 1,
+                 seed: int = 0,
+                 max_workers: Optional[int] = None):
+        self.configs = list(configs)
+        self.results_path = results_path
+        self.duration = duration
+        self.symbols = symbols
+        self.replicates = replicates
+        self.seed = seed
+        self.max_workers = max_workers
+        self.param_names = sorted({name for config in self.configs for name in config})
+        self.fieldnames = ['run_id', 'config_hash', 'replicate', 'seed', *self.param_names, *SUMMARY_FIELDS]
+        self.failures: Dict[str, str] = {}
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """All runs of the sweep as run id, hash, replicate, seed and config."""
+        runs = []
+        for config in self.configs:
+            digest = config_hash(config)
+            for replicate in range(self.replicates):
+                run_id = f"{digest}-{replicate}"
+                runs.append({'run_id': run_id, 'config_hash': digest, 'replicate': replicate,
+                             'seed': run_seed(self.seed, run_id), 'config': config})
+        return runs
+
+    def completed_runs(self) -> Set[str]:
+        """Run ids with a complete row in the results table."""
+        if not os.path.exists(self.results_path):
+            return set()
+        self._truncate_partial_row()
+        with open(self.results_path, newline='') as file:
+            return {row['run_id'] for row in csv.DictReader(file) if row.get('elapsed_seconds')}
+
+    def run(self) -> List[Dict[str, Any]]:
+        """Run every pending configuration, returning the rows written."""
+        self.failures = {}
+        completed = self.completed_runs()
+        pending = [run for run in self.runs() if run['run_id'] not in completed]
+        if not pending:
+            return []
+
+        new_file = not os.path.exists(self.results_path) or os.path.getsize(self.results_path) == 0
+        fieldnames = self.fieldnames if new_file else self._existing_fieldnames()
+        rows = []
+        with open(self.results_path, 'a', newline='') as file, \
+                ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction='ignore')
+            if new_file:
+                writer.writeheader()
+            futures = {
+                pool.submit(run_configuration, run['config'], run['seed'], self.duration, self.symbols): run
+                for run in pending
+            }
+            for future in as_completed(futures):
+                run = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as error:
+                    logger.error(f"Run {run['run_id']} ({run['config']}) failed: {error!r}")
+                    self.failures[run['run_id']] = repr(error)
+                    continue
+                row = {key: run[key] for key in ('run_id', 'config_hash', 'replicate', 'seed')}
+                row.update({name: _csv_value(value) for name, value in run['config'].items()})
+                row.update(summary)
+                writer.writerow(row)
+                file.flush()
+                rows.append(row)
+        if self.failures:
+            logger.warning(f"{len(self.failures)} of {len(pending)} runs failed: {sorted(self.failures)}")
+        return rows
+
+    def _existing_fieldnames(self) -> List[str]:
+        with open(self.results_path, newline='') as file:
+            header = next(csv.reader(file))
+        missing = set(self.fieldnames) - set(header)
+        if missing:
+            raise ValueError(f"Results table {self.results_path} lacks columns {sorted(missing)}")
+        return header
+
+    def _truncate_partial_row(self) -> None:
+        """Drop a last row left half-written by an interrupted sweep."""
+        with open(self.results_path, 'rb+') as file:
+            data = file.read()
+            if data and not data.endswith(b'\n'):
+                file.truncate(data.rfind(b'\n') + 1)
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, (Decimal, np.floating)):
+        return float(value)
+    return value
+
+if __name__ == '__main__':
+    configs = grid_search({
+        'target_spread': ['0.001', '0.002', '0.004'],
+        'risk_factor': ['0.25', '0.5', '1.0'],
+        'num_random_traders': [5, 10],
+    })
+    sweep = ParameterSweep(configs, 'market_making_sweep.csv', duration=timedelta(minutes=1), replicates=2)
+    print(f"Running {len(sweep.runs())} runs ({len(sweep.completed_runs())} already done)...")
+    for row in sweep.run():
+        print(f"{row['run_id']}: trades={row['num_trades']} mm_pnl={row['mm_pnl']:.2f}")
+    for run_id, error in sweep.failures.items():
+        print(f"{run_id}: failed with {error}")
@@ -8,13 +8,15 @@ This module implements a basic market making strategy that:
 4. Uses position limits and risk controls
 """
 
-from decimal import Decimal
-from typing import List, Dict, Optional, Tuple
+from decimal import ROUND_CEILING, ROUND_DOWN, ROUND_FLOOR, Decimal
+from typing import List, Dict, Optional, Tuple, Union
 from datetime import datetime, timedelta
-import numpy as np
+import heapq
+import math
 from market.agents.base_agent import BaseAgent
-from core.models.base import Order, Trade, OrderSide, OrderType
-from core.utils.time_utils import utc_now
+from market.exchange.market_data import Subscription
+from core.models.base import Order, Trade, OrderSide, OrderType, TimeInForce
+from core.utils.rolling_stats import EwmaVolatility, RollingVolatility
 
 class MarketMaker(BaseAgent):
     def __init__(self, agent_id: str, initial_balance: Decimal,
@@ -27,7 +29,12 @@ class MarketMaker(BaseAgent):
                  min_spread: Decimal = Decimal('0.001'),  # 0.1% minimum spread
                  max_spread: Decimal = Decimal('0.05'),   # 5% maximum spread
                  volatility_window: int = 100,            # Number of trades to calculate volatility
-                 inventory_target: Decimal = Decimal('0')):
+                 volatility_span: Optional[float] = None, # EWMA span; replaces the window when given
+                 inventory_target: Decimal = Decimal('0'),
+                 quote_lifetime: timedelta = timedelta(seconds=5),
+                 reference_price: Optional[Decimal] = None,
+                 tick_size: Optional[Decimal] = None,     # Quote prices are rounded away from the mid onto this grid
+                 lot_size: Optional[Decimal] = None):     # Quote sizes are rounded down to whole lots
         
         super().__init__(agent_id, initial_balance)
         self.symbols = symbols
@@ -39,24 +46,42 @@ class MarketMaker(BaseAgent):
         self.min_spread = min_spread
         self.max_spread = max_spread
         self.volatility_window = volatility_window
+        self.volatility_span = volatility_span
         self.inventory_target = inventory_target
+        self.quote_lifetime = quote_lifetime
+        # Mid price to quote around while a book has no two-sided market yet
+        self.reference_price = reference_price
+        self.last_mid: Dict[str, Decimal] = {}
+        self.tick_size = tick_size
+        self.lot_size = lot_size
+        # Quoting the ask side needs short positions up to the position limit
+        self.max_short_position = position_limit
         
         # State variables
-        self.last_prices: Dict[str, List[Decimal]] = {symbol: [] for symbol in symbols}
+        # Streaming volatility of each symbol's mid and trade prices
+        self.volatility: Dict[str, Union[RollingVolatility, EwmaVolatility]] = {
+            symbol: EwmaVolatility(span=volatility_span) if volatility_span else RollingVolatility(volatility_window)
+            for symbol in symbols
+        }
         self.current_quotes: Dict[str, Dict[str, Order]] = {
             symbol: {'bid': None, 'ask': None} for symbol in symbols
         }
-        self.last_order_update = utc_now()
+        self.last_order_update: Optional[datetime] = None
         self.update_interval = timedelta(milliseconds=100)  # 100ms update frequency
+        # Quotes are GTD orders; this heap of (expires_at, order id, symbol)
+        # lets on_time_update visit only the quotes that are due
+        self.quote_expiries: List[Tuple[datetime, int, str]] = []
         
+    def market_data_subscriptions(self) -> List[Subscription]:
+        """Books and trades of the quoted symbols."""
+        return [Subscription(symbols=self.symbols, trades=True)]
+    
     def calculate_volatility(self, symbol: str) -> Decimal:
         """Calculate recent price volatility."""
-        prices = self.last_prices[symbol][-self.volatility_window:]
-        if len(prices) < 2:
+        estimator = self.volatility[symbol]
+        if len(estimator) == 0:
             return Decimal('0')
-        
-        returns = np.diff(np.log([float(p) for p in prices]))
-        return Decimal(str(np.std(returns) * np.sqrt(252)))
+        return Decimal(str(estimator.std() * math.sqrt(252)))
     
     def calculate_spread(self, symbol: str, mid_price: Decimal) -> Tuple[Decimal, Decimal]:
         """Calculate bid-ask spread based on volatility and inventory."""
@@ -84,6 +109,11 @@ class MarketMaker(BaseAgent):
         bid_price = mid_price * (1 - bid_spread)
         ask_price = mid_price * (1 + ask_spread)
         
+        # Round bids down and asks up so the spread is never narrowed
+        if self.tick_size:
+            bid_price = (bid_price / self.tick_size).to_integral_value(ROUND_FLOOR) * self.tick_size
+            ask_price = (ask_price / self.tick_size).to_integral_value(ROUND_CEILING) * self.tick_size
+        
         return bid_price, ask_price
     
     def should_update_orders(self, symbol: str, bids: List[tuple], asks: List[tuple]) -> bool:
@@ -96,30 +126,35 @@ class MarketMaker(BaseAgent):
             return True
             
         # Check if our orders are still at the top of the book
-        best_bid = Decimal(str(bids[0][0]))
-        best_ask = Decimal(str(asks[0][0]))
+        best_bid = bids[0][0]
+        best_ask = asks[0][0]
         
         our_bid = current_quotes['bid'].price
         our_ask = current_quotes['ask'].price
         
-        return (our_bid != best_bid or our_ask != best_ask or 
-                utc_now() - self.last_order_update > self.update_interval)
+        return (our_bid != best_bid or our_ask != best_ask or self.last_order_update is None or
+                self.clock() - self.last_order_update > self.update_interval)
     
     def on_order_book_update(self, symbol: str, bids: List[tuple], asks: List[tuple]) -> None:
         """Update quotes based on order book changes."""
-        if symbol not in self.symbols or not bids or not asks:
+        if symbol not in self.symbols:
             return
+        
+        # Calculate mid price, falling back to the last one (or the
+        # reference price) while a side of the book is empty
+        if bids and asks:
+            mid_price = (bids[0][0] + asks[0][0]) / 2
+        else:
+            mid_price = self.last_mid.get(symbol, self.reference_price)
+            if mid_price is None:
+                return
             
         if not self.should_update_orders(symbol, bids, asks):
             return
-            
-        # Calculate mid price
-        mid_price = (Decimal(str(bids[0][0])) + Decimal(str(asks[0][0]))) / 2
+        self.last_mid[symbol] = mid_price
         
         # Store price for volatility calculation
-        self.last_prices[symbol].append(mid_price)
-        if len(self.last_prices[symbol]) > self.volatility_window:
-            self.last_prices[symbol].pop(0)
+        self.volatility[symbol].update(float(mid_price))
         
         # Calculate new bid and ask prices
         bid_price, ask_price = self.calculate_spread(symbol, mid_price)
@@ -144,40 +179,49 @@ class MarketMaker(BaseAgent):
             adjustment = min(abs(position.quantity) / self.position_limit, Decimal('1'))
             bid_size *= (1 + adjustment)
             ask_size *= (1 - adjustment)
+        if self.lot_size:
+            bid_size = (bid_size / self.lot_size).to_integral_value(ROUND_DOWN) * self.lot_size
+            ask_size = (ask_size / self.lot_size).to_integral_value(ROUND_DOWN) * self.lot_size
         
         # Place new orders if within position limits
-        if abs(position.quantity + bid_size) <= self.position_limit:
-            bid_order = self.create_limit_order(symbol, OrderSide.BUY, bid_size, bid_price)
+        now = self.clock()
+        expires_at = now + self.quote_lifetime
+        if bid_size > 0 and abs(position.quantity + bid_size) <= self.position_limit:
+            bid_order = self.create_limit_order(symbol, OrderSide.BUY, bid_size, bid_price,
+                                                TimeInForce.GTD, expires_at)
             self.current_quotes[symbol]['bid'] = bid_order
+            self.submit_order(bid_order)
+            heapq.heappush(self.quote_expiries, (expires_at, bid_order.id, symbol))
             
-        if abs(position.quantity - ask_size) <= self.position_limit:
-            ask_order = self.create_limit_order(symbol, OrderSide.SELL, ask_size, ask_price)
+        if ask_size > 0 and abs(position.quantity - ask_size) <= self.position_limit:
+            ask_order = self.create_limit_order(symbol, OrderSide.SELL, ask_size, ask_price,
+                                                TimeInForce.GTD, expires_at)
             self.current_quotes[symbol]['ask'] = ask_order
+            self.submit_order(ask_order)
+            heapq.heappush(self.quote_expiries, (expires_at, ask_order.id, symbol))
         
-        self.last_order_update = utc_now()
+        self.last_order_update = now
+        self.request_wakeup(expires_at)
     
     def on_trade(self, trade: Trade) -> None:
         """Handle trade updates."""
         if trade.symbol in self.symbols:
             # Store price for volatility calculation
-            self.last_prices[trade.symbol].append(trade.price)
-            if len(self.last_prices[trade.symbol]) > self.volatility_window:
-                self.last_prices[trade.symbol].pop(0)
+            self.volatility[trade.symbol].update(float(trade.price))
     
     def on_time_update(self, timestamp: datetime) -> None:
         """Handle time-based updates."""
-        # Check for stale orders
-        for symbol in self.symbols:
+        # Drop expired quotes; replaced or cancelled ones are skipped
+        while self.quote_expiries and self.quote_expiries[0][0] <= timestamp:
+            _, order_id, symbol = heapq.heappop(self.quote_expiries)
             quotes = self.current_quotes[symbol]
-            for side, order in quotes.items():
-                if order and (timestamp - order.created_at) > timedelta(seconds=5):
-                    self.cancel_current_quotes(symbol)
-                    break
+            if any(order is not None and order.id == order_id for order in quotes.values()):
+                self.cancel_current_quotes(symbol)
     
     def cancel_current_quotes(self, symbol: str) -> None:
         """Cancel current quotes for a symbol."""
         quotes = self.current_quotes[symbol]
         for side in ['bid', 'ask']:
             if quotes[side]:
-                self.cancel_all_orders()
+                self.cancel_order(quotes[side])
                 quotes[side] = None 
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""Sharded exchange host: worker-process matching must match local engines."""
+
+import copy
+import random
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from core.data.shared_ring import SharedRingBuffer
+from core.models.base import Order, OrderSide, OrderStatus, TimeInForce
+from market.agents.base_agent import BaseAgent
+from market.exchange.matching_engine import MatchingEngine
+from market.exchange.market_data import BookDelta, BookEventType
+from market.exchange.sharded_exchange import ShardedExchangeHost, _delta_from_record, _delta_records
+from simulation.engine.simulation_engine import MarketSimulation
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD', 'EEE']
+
+def generate_batches(seed: int, num_batches: int = 40, batch_size: int = 50):
+    """Random multi-symbol limit and market order batches."""
+    rng = random.Random(seed)
+    batches = []
+    for _ in range(num_batches):
+        batch = []
+        for _ in range(batch_size):
+            symbol = rng.choice(SYMBOLS)
+            side = rng.choice([OrderSide.BUY, OrderSide.SELL])
+            quantity = Decimal(rng.randint(1, 20))
+            if rng.random() < 0.2:
+                batch.append(Order.create_market_order(symbol, side, quantity, 'T'))
+            else:
+                offset = Decimal(rng.randint(-3, 20)) / 4
+                price = Decimal(100) - offset if side == OrderSide.BUY else Decimal(100) + offset
+                batch.append(Order.create_limit_order(symbol, side, quantity, price, 'T'))
+        batches.append(batch)
+    return batches
+
+def trade_key(trade):
+    return (trade.symbol, trade.price, trade.quantity, trade.buyer_order_id, trade.seller_order_id)
+
+def test_ring_buffer_wraps_and_preserves_order():
+    ring = SharedRingBuffer(np.dtype([('value', np.int64)]), capacity=8)
+    try:
+        seen = []
+        for start in range(0, 60, 5):
+            ring.write(np.arange(start, start + 5).astype([('value', np.int64)]))
+            seen.extend(ring.read()['value'].tolist())
+        assert seen == list(range(60))
+        assert len(ring) == 0
+    finally:
+        ring.close()
+
+def test_delta_records_round_trip_decimals_exactly():
+    deltas = [BookDelta(1, 'AAA', BookEventType.LEVEL_UPDATE, OrderSide.BUY, Decimal('0.1'), Decimal('101.37'), None, T0),
+              BookDelta(2, 'BBB', BookEventType.LEVEL_DELETE, OrderSide.SELL, Decimal('99.990'), None, None, T0)]
+    records = _delta_records(deltas, {'AAA': 0, 'BBB': 1})
+    decoded = [_delta_from_record(row, ['AAA', 'BBB']) for row in records]
+    assert decoded == deltas
+    assert [str(delta.price) for delta in decoded] == ['0.1', '99.990']
+
+@pytest.mark.integration
+def test_sharded_host_matches_local_engines():
+    batches = generate_batches(seed=3)
+    local_batches = copy.deepcopy(batches)
+    local = {symbol: MatchingEngine(symbol, clock=lambda: T0) for symbol in SYMBOLS}
+
+    with ShardedExchangeHost(num_workers=2, ring_capacity=64, clock=lambda: T0) as host:
+        for symbol in SYMBOLS:
+            host.add_symbol(symbol)
+        sharded_trades, local_trades = [], []
+        for batch, local_batch in zip(batches, local_batches):
+            sharded_trades.extend(host.process_orders(batch))
+            for order in local_batch:
+                local_trades.extend(local[order.symbol].process_order(order))
+
+        resting = next(order for order in batches[-1] if order.status == OrderStatus.PENDING)
+        cancelled = host.engines[resting.symbol].cancel_order(str(resting.id))
+        local[resting.symbol].cancel_order(str(resting.id))
+
+        assert cancelled is resting and resting.status == OrderStatus.CANCELLED
+        assert sorted(map(trade_key, sharded_trades)) == sorted(map(trade_key, local_trades))
+        assert len({trade.id for trade in sharded_trades}) == len(sharded_trades)
+        for symbol in SYMBOLS:
+            assert [trade_key(t) for t in host.engines[symbol].trades] == \
+                [trade_key(t) for t in local_trades if t.symbol == symbol]
+            assert host.engines[symbol].get_order_book_snapshot(5) == local[symbol].get_order_book_snapshot(5)
+        for batch, local_batch in zip(batches, local_batches):
+            for order, local_order in zip(batch, local_batch):
+                assert (order.status, order.filled_quantity, order.remaining_quantity) == \
+                    (local_order.status, local_order.filled_quantity, local_order.remaining_quantity)
+
+class BookKeeper(BaseAgent):
+    """Records the books it rebuilds from deltas."""
+
+    def on_order_book_update(self, symbol, bids, asks):
+        self.last_books = getattr(self, 'last_books', {})
+        self.last_books[symbol] = (bids, asks)
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        pass
+
+@pytest.mark.integration
+def test_simulation_runs_on_sharded_host():
+    batches = generate_batches(seed=7, num_batches=10)
+    expiring = Order.create_limit_order('AAA', OrderSide.BUY, Decimal('1'), Decimal('50'), 'T',
+                                        time_in_force=TimeInForce.GTD, expires_at=T0 + timedelta(seconds=1))
+
+    def run(host):
+        sim = MarketSimulation(T0, T0 + timedelta(seconds=2), market_data_level=2, exchange_host=host)
+        for symbol in SYMBOLS:
+            sim.add_exchange(symbol)
+        agent = BookKeeper('BOOKS', Decimal('0'))
+        sim.add_agent(agent)
+        orders = copy.deepcopy((batches, expiring))
+        for i, batch in enumerate(orders[0]):
+            for order in batch:
+                sim.schedule_event(T0 + timedelta(milliseconds=100 * i), 'order', order)
+        sim.schedule_event(T0, 'order', orders[1])
+        results = sim.run()
+        books = {symbol: sim.exchanges[symbol].get_order_book_snapshot() for symbol in SYMBOLS}
+        return results, books, agent.last_books, orders[1].status
+
+    with ShardedExchangeHost(num_workers=2) as host:
+        sharded = run(host)
+    local = run(None)
+
+    assert sorted(map(trade_key, sharded[0]['trades'])) == sorted(map(trade_key, local[0]['trades']))
+    assert sharded[1] == local[1]
+    assert sharded[2] == sharded[1]
+    assert sharded[3] == local[3] == OrderStatus.EXPIRED
+
+@pytest.mark.integration
+def test_host_reports_the_next_resting_expiry():
+    with ShardedExchangeHost(num_workers=2, clock=lambda: T0) as host:
+        for symbol in SYMBOLS:
+            host.add_symbol(symbol)
+        soon, later = (Order.create_limit_order(symbol, OrderSide.BUY, Decimal('1'), Decimal('50'), 'T',
+                                                time_in_force=TimeInForce.GTD, expires_at=T0 + timedelta(seconds=s))
+                       for symbol, s in (('AAA', 1), ('BBB', 3)))
+        host.process_orders([later, soon])
+        assert host.engines['CCC'].next_expiry() == soon.expires_at
+        host.cancel_order('AAA', str(soon.id))
+        assert host.next_expiry() == later.expires_at
+        assert host.expire_orders(T0 + timedelta(seconds=3)) == [later]
+        assert host.next_expiry() is None
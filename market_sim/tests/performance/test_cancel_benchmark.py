@@ -0,0 +1,44 @@
+"""Cancel-heavy benchmark: a market maker re-quoting against a deep book."""
+
+import time
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide
+from market.exchange.matching_engine import MatchingEngine
+
+TICK = Decimal('0.01')
+MID = Decimal('1000.00')
+
+@pytest.mark.performance
+@pytest.mark.parametrize('resting_orders', [1_000, 100_000])
+def test_cancel_requote_throughput(resting_orders):
+    """Measure cancel+requote cycles/s with many orders resting behind the quotes."""
+    engine = MatchingEngine('BENCH')
+    levels = max(resting_orders // 20, 1)
+    for i in range(resting_orders // 2):
+        offset = (i % levels + 5) * TICK
+        engine.process_order(Order.create_limit_order(
+            'BENCH', OrderSide.BUY, Decimal('10'), MID - offset, 'BACKGROUND'))
+        engine.process_order(Order.create_limit_order(
+            'BENCH', OrderSide.SELL, Decimal('10'), MID + offset, 'BACKGROUND'))
+    
+    # The quotes join the back of busy levels, as a market maker's would
+    quotes = []
+    cycles = 10_000
+    start = time.perf_counter()
+    for i in range(cycles):
+        for order in quotes:
+            assert engine.cancel_order(str(order.id)) is order
+        offset = (i % levels + 5) * TICK
+        quotes = [
+            Order.create_limit_order('BENCH', OrderSide.BUY, Decimal('5'), MID - offset, 'MM'),
+            Order.create_limit_order('BENCH', OrderSide.SELL, Decimal('5'), MID + offset, 'MM'),
+        ]
+        for order in quotes:
+            engine.process_order(order)
+    elapsed = time.perf_counter() - start
+    
+    print(f"\n{resting_orders:>7} resting: {cycles / elapsed:,.0f} cancel/requote cycles/s")
+    
+    assert len(engine.order_book.order_index) == resting_orders + 2
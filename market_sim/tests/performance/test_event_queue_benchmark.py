@@ -0,0 +1,49 @@
+"""Benchmark of bulk event scheduling and draining.
+
+Runs 1M events by default; set MARKET_SIM_BENCH_FULL=1 for 10M.
+"""
+
+import heapq
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from simulation.engine.event_queue import EventQueue, EventType, SimulationEvent
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+T0_NS = int(T0.timestamp()) * 10**9
+NUM_EVENTS = 10_000_000 if os.environ.get('MARKET_SIM_BENCH_FULL') else 1_000_000
+
+@pytest.mark.performance
+def test_schedule_and_drain_events():
+    rng = random.Random(3)
+    # Pre-generated flow over one simulated hour, in ns
+    timestamps = [T0_NS + rng.randrange(3600 * 10**9) for _ in range(NUM_EVENTS)]
+    
+    queue = EventQueue()
+    start = time.perf_counter()
+    queue.schedule_many((timestamp, EventType.ORDER, None) for timestamp in timestamps)
+    schedule_elapsed = time.perf_counter() - start
+    
+    start = time.perf_counter()
+    drained = 0
+    for _ in queue.pop_due(T0_NS + 3600 * 10**9):
+        drained += 1
+    drain_elapsed = time.perf_counter() - start
+    assert drained == NUM_EVENTS
+    
+    # Object events with a Python-level __lt__, as MarketSimulation used before
+    sample = timestamps[:NUM_EVENTS // 10]
+    start = time.perf_counter()
+    heap = []
+    for timestamp in sample:
+        heapq.heappush(heap, SimulationEvent(T0 + timedelta(microseconds=(timestamp - T0_NS) // 1000), 'order', None))
+    while heap:
+        heapq.heappop(heap)
+    legacy_elapsed = time.perf_counter() - start
+    
+    print(f"\nschedule {NUM_EVENTS:,}: {NUM_EVENTS / schedule_elapsed:,.0f} events/s")
+    print(f"drain {NUM_EVENTS:,}: {NUM_EVENTS / drain_elapsed:,.0f} events/s")
+    print(f"legacy push+pop {len(sample):,}: {len(sample) / legacy_elapsed:,.0f} events/s")
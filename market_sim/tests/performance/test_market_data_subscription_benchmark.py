@@ -0,0 +1,58 @@
+"""Benchmark of one book-notification tick for 1,000 agents x 500 symbols."""
+
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from market.agents.base_agent import BaseAgent
+from market.exchange.market_data import Subscription
+from simulation.engine.simulation_engine import MarketSimulation
+
+NUM_AGENTS = 1_000
+NUM_SYMBOLS = 500
+SYMBOLS_PER_AGENT = 5
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+class Counter(BaseAgent):
+    def __init__(self, agent_id, symbols=None):
+        super().__init__(agent_id, Decimal('1000'))
+        self.symbols = symbols
+        self.updates = 0
+
+    def market_data_subscriptions(self):
+        return [Subscription(symbols=self.symbols)]
+
+    def on_order_book_update(self, symbol, bids, asks):
+        self.updates += 1
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        pass
+
+def tick_seconds(targeted: bool, ticks: int) -> float:
+    symbols = [f"S{i:03d}" for i in range(NUM_SYMBOLS)]
+    sim = MarketSimulation(T0, T0 + timedelta(seconds=1))
+    for symbol in symbols:
+        sim.add_exchange(symbol)
+    for i in range(NUM_AGENTS):
+        chosen = [symbols[(i * SYMBOLS_PER_AGENT + k) % NUM_SYMBOLS] for k in range(SYMBOLS_PER_AGENT)]
+        sim.add_agent(Counter(f"A{i:04d}", chosen if targeted else None))
+    start = time.perf_counter()
+    for _ in range(ticks):
+        sim._update_order_books()
+    elapsed = (time.perf_counter() - start) / ticks
+    expected = SYMBOLS_PER_AGENT if targeted else NUM_SYMBOLS
+    assert all(agent.updates == expected * ticks for agent in sim.agents.values())
+    return elapsed
+
+@pytest.mark.performance
+def test_subscription_dispatch_per_tick():
+    everything = tick_seconds(targeted=False, ticks=2)
+    targeted = tick_seconds(targeted=True, ticks=20)
+    print(f"\nevery agent x every symbol: {everything * 1000:.0f} ms/tick ({NUM_AGENTS * NUM_SYMBOLS:,} callbacks)")
+    print(f"{SYMBOLS_PER_AGENT} subscribed symbols per agent: {targeted * 1000:.1f} ms/tick "
+          f"({NUM_AGENTS * SYMBOLS_PER_AGENT:,} callbacks)")
+    assert targeted < everything
@@ -0,0 +1,80 @@
+"""Microbenchmark of Order/Trade construction cost: legacy layout vs slotted models."""
+
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID, uuid4
+
+import pytest
+from core.models.base import Order, Trade, OrderSide, OrderStatus, OrderType
+from core.utils.time_utils import utc_now
+
+N = 100_000
+SIM_TIME = datetime(2025, 1, 1)
+
+@dataclass
+class LegacyOrder:
+    """The pre-slots Order layout: dict-backed, uuid4 id, wall-clock stamps."""
+    id: UUID
+    symbol: str
+    side: OrderSide
+    type: OrderType
+    quantity: Decimal
+    price: Optional[Decimal]
+    stop_price: Optional[Decimal]
+    status: OrderStatus
+    filled_quantity: Decimal
+    remaining_quantity: Decimal
+    created_at: datetime
+    updated_at: datetime
+    agent_id: str
+
+    @classmethod
+    def create_limit_order(cls, symbol, side, quantity, price, agent_id):
+        now = utc_now()
+        return cls(uuid4(), symbol, side, OrderType.LIMIT, quantity, price, None,
+                   OrderStatus.PENDING, Decimal('0'), quantity, now, now, agent_id)
+
+def measure(factory):
+    """Return (ns per object, bytes allocated per retained object)."""
+    start = time.perf_counter_ns()
+    for _ in range(N):
+        factory()
+    ns_per_object = (time.perf_counter_ns() - start) / N
+    
+    tracemalloc.start()
+    retained = [factory() for _ in range(N)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return ns_per_object, allocated / N
+
+@pytest.mark.performance
+def test_order_and_trade_allocation():
+    quantity, price = Decimal('100'), Decimal('101.25')
+    results = {
+        'legacy order': measure(lambda: LegacyOrder.create_limit_order(
+            'BENCH', OrderSide.BUY, quantity, price, 'A')),
+        'slotted order': measure(lambda: Order.create_limit_order(
+            'BENCH', OrderSide.BUY, quantity, price, 'A', timestamp=SIM_TIME)),
+        'slotted trade': measure(lambda: Trade.create(
+            'BENCH', price, quantity, 1, 2, timestamp=SIM_TIME)),
+    }
+    
+    print()
+    for name, (ns, size) in results.items():
+        print(f"{name:>14}: {ns:8.0f} ns/object, {size:6.0f} bytes/object")
+    
+    assert results['slotted order'][1] < results['legacy order'][1]
+
+def test_ids_are_sequential_with_lazy_uuid():
+    first = Order.create_market_order('BENCH', OrderSide.BUY, Decimal('1'), 'A', timestamp=SIM_TIME)
+    second = Order.create_market_order('BENCH', OrderSide.SELL, Decimal('1'), 'A', timestamp=SIM_TIME)
+    
+    assert second.id == first.id + 1
+    assert first.created_at == SIM_TIME
+    assert first.uuid.int == first.id and isinstance(first.uuid, UUID)
+    assert not hasattr(first, '__dict__')
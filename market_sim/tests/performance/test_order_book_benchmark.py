@@ -0,0 +1,57 @@
+"""Throughput benchmark for the price-level indexed order book."""
+
+import random
+import time
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide
+from core.utils.fixed_point import FixedPointScale
+from market.exchange.matching_engine import MatchingEngine
+
+TICK = Decimal('0.01')
+MID = Decimal('1000.00')
+
+def build_engine(levels: int, fixed_point: bool = False) -> MatchingEngine:
+    """Build an engine with `levels` resting price levels on each side."""
+    engine = MatchingEngine('BENCH', scale=FixedPointScale(TICK) if fixed_point else None)
+    for i in range(1, levels + 1):
+        engine.process_order(Order.create_limit_order(
+            'BENCH', OrderSide.BUY, Decimal('10'), MID - i * TICK, 'MAKER'))
+        engine.process_order(Order.create_limit_order(
+            'BENCH', OrderSide.SELL, Decimal('10'), MID + i * TICK, 'MAKER'))
+    return engine
+
+@pytest.mark.performance
+@pytest.mark.parametrize('fixed_point', [False, True])
+@pytest.mark.parametrize('levels', [10, 1_000, 100_000])
+def test_matching_throughput(levels, fixed_point):
+    """Measure orders/s for a mix of passive inserts and aggressive fills."""
+    engine = build_engine(levels, fixed_point)
+    rng = random.Random(42)
+    num_orders = 20_000
+    
+    orders = []
+    for _ in range(num_orders // 2):
+        side = rng.choice([OrderSide.BUY, OrderSide.SELL])
+        offset = rng.randint(1, levels) * TICK
+        price = MID - offset if side == OrderSide.BUY else MID + offset
+        # A passive order that rests inside the book...
+        orders.append(Order.create_limit_order('BENCH', side, Decimal('1'), price, 'PASSIVE'))
+        # ...and an aggressive one that takes liquidity at the top
+        taker_side = OrderSide.SELL if side == OrderSide.BUY else OrderSide.BUY
+        orders.append(Order.create_market_order('BENCH', taker_side, Decimal('1'), 'TAKER'))
+    
+    start = time.perf_counter()
+    trades = 0
+    for order in orders:
+        trades += len(engine.process_order(order))
+    elapsed = time.perf_counter() - start
+    
+    mode = 'fixed-point' if fixed_point else 'decimal'
+    print(f"\n{levels:>7} levels ({mode}): {num_orders / elapsed:,.0f} orders/s "
+          f"({trades} trades, best bid {engine.order_book.bids.best_price()}, "
+          f"best ask {engine.order_book.asks.best_price()})")
+    
+    assert trades == num_orders // 2
+    assert engine.order_book.bids.best_price() < engine.order_book.asks.best_price()
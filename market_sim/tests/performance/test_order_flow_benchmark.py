@@ -0,0 +1,75 @@
+"""Benchmark of order-flow parsing and replay.
+
+Parses a 1M-event CSV file; set MARKET_SIM_BENCH_FULL=1 for 10M. The first
+200k events are replayed through a simulation for the match rate.
+"""
+
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from core.data.order_flow import read_order_events_csv
+from core.utils.time_utils import datetime_to_ns
+from simulation.engine.order_flow_replay import OrderFlowReplay
+from simulation.engine.simulation_engine import MarketSimulation
+from simulation.results.metrics_sinks import NullMetricsSink
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+SYMBOLS = ['AAA', 'BBB', 'CCC', 'DDD']
+NUM_EVENTS = 10_000_000 if os.environ.get('MARKET_SIM_BENCH_FULL') else 1_000_000
+REPLAYED_EVENTS = 200_000
+EVENTS_PER_SECOND = 2_000
+
+def write_flow(path, num_events, block=1_000_000):
+    """Synthetic flow: limit orders around 100, cancels of earlier orders and market orders."""
+    rng = np.random.default_rng(5)
+    with open(path, 'w') as file:
+        file.write('timestamp,event,order_id,symbol,side,price,quantity\n')
+        for first in range(0, num_events, block):
+            n = min(block, num_events - first)
+            ids = np.arange(first, first + n)
+            timestamps = datetime_to_ns(T0) + ids * (10**9 // EVENTS_PER_SECOND)
+            kinds = rng.choice(np.array(['A', 'C', 'X']), n, p=[0.6, 0.3, 0.1])
+            sides = rng.choice(np.array(['B', 'S']), n)
+            symbols = rng.choice(np.array(SYMBOLS), n)
+            offsets = rng.integers(-2, 20, n) / 100
+            prices = np.where(sides == 'B', 100 - offsets, 100 + offsets).round(2)
+            quantities = rng.integers(1, 100, n)
+            targets = np.maximum(ids - rng.integers(1, 500, n), 0)
+            lines = []
+            for i in range(n):
+                kind = kinds[i]
+                if kind == 'A':
+                    lines.append(f"{timestamps[i]},A,{ids[i]},{symbols[i]},{sides[i]},{prices[i]},{quantities[i]}\n")
+                elif kind == 'C':
+                    lines.append(f"{timestamps[i]},C,{targets[i]},{symbols[i]},,,\n")
+                else:
+                    lines.append(f"{timestamps[i]},X,{ids[i]},{symbols[i]},{sides[i]},,{quantities[i]}\n")
+            file.write(''.join(lines))
+
+@pytest.mark.performance
+def test_order_flow_parse_and_replay(tmp_path):
+    path = str(tmp_path / 'flow.csv')
+    write_flow(path, NUM_EVENTS)
+
+    start = time.perf_counter()
+    parsed = sum(len(chunk) for chunk in read_order_events_csv(path))
+    elapsed = time.perf_counter() - start
+    assert parsed == NUM_EVENTS
+    print(f"\nparse: {parsed / elapsed:,.0f} events/s ({os.path.getsize(path) / elapsed / 2**20:,.0f} MB/s)")
+
+    duration = timedelta(seconds=REPLAYED_EVENTS / EVENTS_PER_SECOND)
+    sim = MarketSimulation(T0, T0 + duration - timedelta(microseconds=1), time_step=timedelta(milliseconds=100),
+                           metrics_sink=NullMetricsSink())
+    for symbol in SYMBOLS:
+        sim.add_exchange(symbol)
+    replay = OrderFlowReplay(sim, path, chunk_bytes=1 << 20)
+    start = time.perf_counter()
+    sim.run()
+    elapsed = time.perf_counter() - start
+    stats = replay.stats()
+    print(f"replay: {REPLAYED_EVENTS / elapsed:,.0f} events/s, match rate {stats['match_rate']:.1%}, "
+          f"{stats['missed_cancels_and_modifies']:,} of {stats['cancels']:,} cancels found no live order")
+    assert stats['orders_submitted'] > 0 and stats['orders_matched'] > 0
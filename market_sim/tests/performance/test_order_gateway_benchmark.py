@@ -0,0 +1,70 @@
+"""Benchmark of the order gateway's batched pre-trade checks and the routed scenario flow."""
+
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from core.models.base import Order, OrderSide
+from market.agents.base_agent import BaseAgent
+from simulation.engine.simulation_engine import MarketSimulation
+from simulation.scenarios.market_making_scenario import create_market_making_scenario
+
+NUM_AGENTS = 1_000
+NUM_SYMBOLS = 20
+BATCH = 20_000
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+class Idle(BaseAgent):
+    def on_order_book_update(self, symbol, bids, asks):
+        pass
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        pass
+
+@pytest.mark.performance
+def test_pre_trade_check_throughput():
+    rng = random.Random(1)
+    symbols = [f"S{i:03d}" for i in range(NUM_SYMBOLS)]
+    sim = MarketSimulation(T0, T0 + timedelta(seconds=1))
+    for symbol in symbols:
+        sim.add_exchange(symbol)
+    agents = [Idle(f"A{i:04d}", Decimal('100000')) for i in range(NUM_AGENTS)]
+    for agent in agents:
+        sim.add_agent(agent)
+    orders = [Order.create_limit_order(rng.choice(symbols), rng.choice([OrderSide.BUY, OrderSide.SELL]),
+                                       Decimal(rng.randint(1, 100)), Decimal(rng.randint(90, 110)),
+                                       rng.choice(agents).agent_id, T0)
+              for _ in range(BATCH)]
+
+    start = time.perf_counter()
+    legacy = [sim.agents[order.agent_id].validate_order(order, {}) for order in orders]
+    legacy_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    ok = sim.gateway.check(orders)
+    batched_elapsed = time.perf_counter() - start
+
+    print(f"\nper-order validate_order: {BATCH / legacy_elapsed:,.0f} orders/s")
+    print(f"batched gateway check: {BATCH / batched_elapsed:,.0f} orders/s")
+    # Sells need a position nobody has; buys pass until an agent's cash runs out
+    sells = np.array([order.side == OrderSide.SELL for order in orders])
+    assert not ok[sells].any() and not np.array(legacy)[sells].any()
+    assert ok[~sells].sum() > 0
+
+@pytest.mark.performance
+def test_scenario_order_flow_throughput():
+    sim = create_market_making_scenario(start_time=T0, duration=timedelta(minutes=2), symbols=['AAA', 'BBB'],
+                                        num_random_traders=10, seed=3)
+    start = time.perf_counter()
+    results = sim.run()
+    elapsed = time.perf_counter() - start
+    gateway = sim.gateway
+    print(f"\nscenario: {gateway.submitted:,} orders ({gateway.rejected:,} rejected, {gateway.cancels:,} cancels), "
+          f"{len(results['trades']):,} trades in {elapsed:.2f}s: {gateway.submitted / elapsed:,.0f} orders/s")
+    assert gateway.routed > 0 and len(results['trades']) > 0
@@ -0,0 +1,60 @@
+"""Benchmark of marking 1,000 agents x 100 symbols to market."""
+
+import random
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from core.data.portfolio_matrix import PortfolioMatrix
+from core.models.base import Trade
+from market.agents.base_agent import BaseAgent
+
+NUM_AGENTS = 1_000
+NUM_SYMBOLS = 100
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+class Holder(BaseAgent):
+    def on_order_book_update(self, symbol, bids, asks):
+        pass
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        pass
+
+@pytest.mark.performance
+def test_portfolio_valuation_throughput():
+    rng = random.Random(1)
+    symbols = [f"S{i:03d}" for i in range(NUM_SYMBOLS)]
+    matrix = PortfolioMatrix()
+    agents = []
+    for i in range(NUM_AGENTS):
+        agent = Holder(f"A{i:04d}", Decimal('1000000'))
+        matrix.add_agent(agent.agent_id, agent.balance)
+        agent.portfolio_mirror = matrix
+        agents.append(agent)
+        for symbol in rng.sample(symbols, 20):
+            agent.update_position(Trade.create(symbol, Decimal('100'), Decimal(rng.randint(1, 50)), 1, 2, T0), False)
+    current_prices = {symbol: Decimal(rng.randint(9000, 11000)) / 100 for symbol in symbols}
+    prices = np.array([float(current_prices[symbol]) for symbol in matrix.symbols])
+    
+    ticks = 5
+    start = time.perf_counter()
+    for _ in range(ticks):
+        for agent in agents:
+            agent.get_portfolio_summary(current_prices)
+    legacy_elapsed = (time.perf_counter() - start) / ticks
+    
+    ticks = 200
+    start = time.perf_counter()
+    for _ in range(ticks):
+        valuation = matrix.valuation(prices)
+    vectorized_elapsed = (time.perf_counter() - start) / ticks
+    
+    print(f"\nper-agent Decimal summaries: {legacy_elapsed * 1000:.1f} ms/tick")
+    print(f"vectorized valuation: {vectorized_elapsed * 1000:.2f} ms/tick")
+    assert valuation.total_value.shape == (NUM_AGENTS,)
+    assert vectorized_elapsed < legacy_elapsed
@@ -0,0 +1,59 @@
+"""Benchmark of a 500-symbol universe matched in-process versus on a sharded host."""
+
+import os
+import random
+import time
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide
+from market.exchange.matching_engine import MatchingEngine
+from market.exchange.sharded_exchange import ShardedExchangeHost
+
+NUM_SYMBOLS = 500
+NUM_BATCHES = 40
+BATCH_SIZE = 5_000
+
+def generate_batches(symbols):
+    rng = random.Random(11)
+    batches = []
+    for _ in range(NUM_BATCHES):
+        batch = []
+        for _ in range(BATCH_SIZE):
+            side = rng.choice([OrderSide.BUY, OrderSide.SELL])
+            offset = Decimal(rng.randint(-2, 30))
+            price = Decimal(1000) - offset if side == OrderSide.BUY else Decimal(1000) + offset
+            batch.append(Order.create_limit_order(rng.choice(symbols), side, Decimal(rng.randint(1, 10)), price, 'B'))
+        batches.append(batch)
+    return batches
+
+@pytest.mark.performance
+def test_sharded_host_throughput():
+    symbols = [f"S{i:03d}" for i in range(NUM_SYMBOLS)]
+    num_orders = NUM_BATCHES * BATCH_SIZE
+
+    engines = {symbol: MatchingEngine(symbol) for symbol in symbols}
+    batches = generate_batches(symbols)
+    start = time.perf_counter()
+    local_trades = 0
+    for batch in batches:
+        by_symbol = {}
+        for order in batch:
+            by_symbol.setdefault(order.symbol, []).append(order)
+        for symbol, orders in by_symbol.items():
+            local_trades += len(engines[symbol].process_orders(orders))
+    local_elapsed = time.perf_counter() - start
+
+    workers = min(os.cpu_count() or 1, 8)
+    with ShardedExchangeHost(num_workers=workers) as host:
+        for symbol in symbols:
+            host.add_symbol(symbol)
+        host.start()
+        batches = generate_batches(symbols)
+        start = time.perf_counter()
+        sharded_trades = sum(len(host.process_orders(batch)) for batch in batches)
+        sharded_elapsed = time.perf_counter() - start
+
+    print(f"\nin-process: {num_orders / local_elapsed:,.0f} orders/s")
+    print(f"{workers} shards: {num_orders / sharded_elapsed:,.0f} orders/s")
+    assert sharded_trades == local_trades > 0
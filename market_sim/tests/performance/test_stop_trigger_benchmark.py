@@ -0,0 +1,54 @@
+"""Benchmark of stop triggering with 100k resting stop orders."""
+
+import time
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide
+from core.utils.fixed_point import FixedPointScale
+from market.exchange.matching_engine import MatchingEngine
+
+TICK = Decimal('0.01')
+MID = Decimal('1000.00')
+NUM_STOPS = 100_000
+
+@pytest.mark.performance
+def test_trading_with_100k_resting_stops():
+    engine = MatchingEngine('BENCH', scale=FixedPointScale(TICK))
+    # Deep two-sided book: 2,000 levels of liquidity each side
+    for i in range(1, 2001):
+        engine.process_order(Order.create_limit_order(
+            'BENCH', OrderSide.BUY, Decimal('100'), MID - i * TICK, 'MAKER'))
+        engine.process_order(Order.create_limit_order(
+            'BENCH', OrderSide.SELL, Decimal('100'), MID + i * TICK, 'MAKER'))
+    
+    start = time.perf_counter()
+    for i in range(NUM_STOPS // 2):
+        offset = (i % 1500 + 150) * TICK
+        engine.process_order(Order.create_stop_order(
+            'BENCH', OrderSide.BUY, Decimal('1'), MID + offset, 'STOPS'))
+        engine.process_order(Order.create_stop_order(
+            'BENCH', OrderSide.SELL, Decimal('1'), MID - offset, 'STOPS'))
+    add_elapsed = time.perf_counter() - start
+    assert len(engine.stops) == NUM_STOPS
+    
+    # Small trades around the top of book: each checks triggers but fires none
+    num_orders = 20_000
+    start = time.perf_counter()
+    for i in range(num_orders):
+        side = OrderSide.BUY if i % 2 else OrderSide.SELL
+        engine.process_order(Order.create_market_order('BENCH', side, Decimal('1'), 'TAKER'))
+    quiet_elapsed = time.perf_counter() - start
+    assert len(engine.stops) == NUM_STOPS
+    
+    # One large buy sweeps past the nearest stop prices and sets off a cascade
+    start = time.perf_counter()
+    trades = engine.process_order(Order.create_market_order('BENCH', OrderSide.BUY, Decimal('15000'), 'TAKER'))
+    cascade_elapsed = time.perf_counter() - start
+    triggered = NUM_STOPS - len(engine.stops)
+    
+    print(f"\nadd {NUM_STOPS:,} stops: {NUM_STOPS / add_elapsed:,.0f} stops/s")
+    print(f"trading with {NUM_STOPS:,} resting stops: {num_orders / quiet_elapsed:,.0f} orders/s")
+    print(f"cascade: {triggered:,} stops triggered, {len(trades):,} trades in {cascade_elapsed * 1000:.1f} ms")
+    
+    assert triggered > 0
@@ -0,0 +1,45 @@
+"""Benchmark of one decision tick: 100,000 vectorized noise traders vs. RandomTrader objects."""
+
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from market.agents.trader_population import TraderPopulation
+from simulation.scenarios.market_making_scenario import RandomTrader
+
+NUM_TRADERS = 100_000
+NUM_OBJECTS = 1_000
+SYMBOLS = [f"S{i:02d}" for i in range(10)]
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+BIDS = [(Decimal('99.99'), Decimal('1000'))]
+ASKS = [(Decimal('100.01'), Decimal('1000'))]
+
+@pytest.mark.performance
+def test_population_tick_throughput():
+    population = TraderPopulation('CROWD', NUM_TRADERS, Decimal('100000'), SYMBOLS, trade_frequency=0.01)
+    for symbol in SYMBOLS:
+        population.on_order_book_update(symbol, BIDS, ASKS)
+    ticks = 20
+    start = time.perf_counter()
+    orders = 0
+    for _ in range(ticks):
+        orders += len(population.decide(T0))
+    population_elapsed = (time.perf_counter() - start) / ticks
+
+    # RandomTrader decides per symbol on each book update
+    traders = [RandomTrader(f"T{i:04d}", Decimal('100000'), SYMBOLS, trade_frequency=0.01) for i in range(NUM_OBJECTS)]
+    start = time.perf_counter()
+    for trader in traders:
+        for symbol in SYMBOLS:
+            trader.on_order_book_update(symbol, BIDS, ASKS)
+    objects_elapsed = time.perf_counter() - start
+
+    per_trader_population = population_elapsed / NUM_TRADERS
+    per_trader_objects = objects_elapsed / NUM_OBJECTS
+    print(f"\n{NUM_TRADERS:,}-trader population: {population_elapsed * 1000:.1f} ms/tick, "
+          f"{orders / ticks:,.0f} orders/tick")
+    print(f"{NUM_OBJECTS:,} RandomTrader objects: {objects_elapsed * 1000:.1f} ms/tick "
+          f"({per_trader_objects / per_trader_population:,.0f}x the cost per trader)")
+    assert orders > 0
+    assert per_trader_population < per_trader_objects
@@ -0,0 +1,100 @@
+"""OHLCV bars built online from the trade stream."""
+
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide, Trade
+from simulation.engine.simulation_engine import MarketSimulation
+from simulation.results import bars as bars_module
+from simulation.results.bars import BarAggregator
+
+START = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+SECOND = timedelta(seconds=1)
+MINUTE = timedelta(minutes=1)
+
+def trade(symbol, price, quantity, seconds):
+    return Trade.create(symbol, Decimal(price), Decimal(quantity), 1, 2, START + timedelta(seconds=seconds))
+
+def test_bars_per_interval_and_symbol():
+    completed = []
+    aggregator = BarAggregator(intervals=[SECOND, MINUTE], on_bar=completed.append)
+    aggregator([trade('AAA', '100', '10', 0.1), trade('AAA', '102', '5', 0.5), trade('BBB', '50', '1', 0.6)])
+    aggregator([trade('AAA', '99', '5', 0.9), trade('AAA', '101', '20', 1.2), trade('AAA', '98', '1', 61)])
+
+    second = aggregator.bars(SECOND, 'AAA')
+    assert [bar.start for bar in second] == [START, START + SECOND, START + timedelta(seconds=61)]
+    first = second[0]
+    assert (first.open, first.high, first.low, first.close) == (Decimal('100'), Decimal('102'), Decimal('99'), Decimal('99'))
+    assert first.volume == Decimal('20') and first.trades == 3
+    assert first.vwap == Decimal('2005') / 20
+
+    minute = aggregator.bars(MINUTE, 'AAA')
+    assert [bar.start for bar in minute] == [START, START + MINUTE]
+    assert minute[0].trades == 4 and minute[0].close == Decimal('101') and minute[0].volume == Decimal('40')
+    assert aggregator.bars(MINUTE, 'BBB')[0].trades == 1
+
+    # Only bars a later trade moved past have completed; flush closes the rest
+    assert [(bar.interval, bar.start) for bar in completed] == [(SECOND, START), (SECOND, START + SECOND),
+                                                                (MINUTE, START)]
+    aggregator.flush()
+    assert len(completed) == 7
+    assert aggregator.symbols() == ['AAA', 'BBB']
+    assert aggregator.bars(SECOND, 'AAA') == second
+
+def test_records_match_raw_stock_data_columns():
+    aggregator = BarAggregator(intervals=[timedelta(days=1)])
+    aggregator([trade('AAA', '100.25', '10', 5), trade('AAA', '100.75', '2.6', 3600),
+                trade('AAA', '100.5', '2.5', 24 * 3600)])
+    records = aggregator.records(timedelta(days=1))
+    # Volumes are rounded to whole shares, half to even
+    assert records == [{'ticker': 'AAA', 'date': date(2025, 1, 2), 'open': Decimal('100.25'),
+                        'high': Decimal('100.75'), 'low': Decimal('100.25'), 'close': Decimal('100.75'),
+                        'volume': 13},
+                       {'ticker': 'AAA', 'date': date(2025, 1, 3), 'open': Decimal('100.5'),
+                        'high': Decimal('100.5'), 'low': Decimal('100.5'), 'close': Decimal('100.5'),
+                        'volume': 2}]
+
+def test_intraday_bars_have_no_raw_stock_data_rows():
+    aggregator = BarAggregator(intervals=[SECOND])
+    aggregator([trade('AAA', '100', '10', 0.1), trade('AAA', '102', '10', 1.5)])
+    with pytest.raises(ValueError, match='collide'):
+        aggregator.records(SECOND)
+    with pytest.raises(ValueError, match='collide'):
+        aggregator.bars(SECOND, 'AAA')[0].to_record()
+
+def test_to_frame_requires_pandas(monkeypatch):
+    monkeypatch.setattr(bars_module, 'pd', None)
+    with pytest.raises(ImportError):
+        BarAggregator().to_frame(SECOND, 'AAA')
+
+def test_to_frame():
+    pd = pytest.importorskip('pandas')
+    day = timedelta(days=1)
+    aggregator = BarAggregator(intervals=[SECOND, day])
+    aggregator([trade('AAA', '100', '10', 0.1), trade('AAA', '102', '10.5', 24 * 3600)])
+    frame = aggregator.to_frame(day, 'AAA')
+    assert list(frame.columns[:5]) == ['Open', 'High', 'Low', 'Close', 'Volume']
+    assert frame.index[1] == pd.Timestamp(date(2025, 1, 3))
+    assert frame['Volume'].tolist() == [10, 10]
+    with pytest.raises(ValueError):
+        aggregator.to_frame(SECOND, 'AAA')
+
+def test_listener_sees_every_simulated_trade():
+    sim = MarketSimulation(START, START + timedelta(seconds=3))
+    sim.add_exchange('AAA')
+    aggregator = BarAggregator(intervals=[SECOND])
+    sim.add_trade_listener(aggregator)
+    for second, price in enumerate(['100', '101', '99']):
+        timestamp = START + timedelta(seconds=second, milliseconds=100)
+        sim.schedule_event(timestamp, 'order', Order.create_limit_order(
+            'AAA', OrderSide.SELL, Decimal('5'), Decimal(price), 'S', timestamp))
+        sim.schedule_event(timestamp, 'order', Order.create_market_order('AAA', OrderSide.BUY, Decimal('3'), 'B', timestamp))
+    trades = sim.run()['trades']
+    aggregator.flush()
+
+    bars = aggregator.bars(SECOND, 'AAA')
+    assert sum(bar.trades for bar in bars) == len(trades) > 0
+    assert sum(bar.volume for bar in bars) == sum(t.quantity for t in trades)
+    assert bars[-1].close == trades[-1].price
+    assert all(bar.start.second == bar.start.timestamp() % 60 for bar in bars)
@@ -0,0 +1,119 @@
+"""Batched order submission must match submitting the same orders one by one."""
+
+import copy
+import random
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide, OrderType
+from market.exchange.matching_engine import MatchingEngine
+from simulation.engine.simulation_engine import MarketSimulation
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+SYMBOLS = ['AAA', 'BBB']
+
+def generate_flow(seed: int, symbols=('AAA',), num_orders: int = 3000):
+    """Random limit, market, stop and stop-limit orders with cancels in between."""
+    rng = random.Random(seed)
+    flow = []
+    live = []
+    for _ in range(num_orders):
+        action = rng.random()
+        symbol = rng.choice(symbols)
+        side = rng.choice([OrderSide.BUY, OrderSide.SELL])
+        sign = 1 if side == OrderSide.BUY else -1
+        quantity = Decimal(rng.randint(1, 30))
+        if action < 0.1 and live:
+            flow.append(('cancel', live.pop(rng.randrange(len(live)))))
+            continue
+        if action < 0.25:
+            order = Order.create_market_order(symbol, side, quantity, 'T')
+        elif action < 0.35:
+            # Stops a little away from the market, some with a limit
+            stop = Decimal(100) + sign * Decimal(rng.randint(1, 8)) / 4
+            limit = stop + sign * Decimal('0.5') if rng.random() < 0.5 else None
+            order = Order.create_stop_order(symbol, side, quantity, stop, 'T', limit_price=limit)
+        else:
+            offset = Decimal(rng.randint(-2, 20)) / 4
+            order = Order.create_limit_order(symbol, side, quantity, Decimal(100) - sign * offset, 'T')
+        if order.type != OrderType.MARKET:
+            live.append((symbol, str(order.id)))
+        flow.append(('order', order))
+    return flow
+
+def one_by_one(flow, symbols=('AAA',)):
+    engines = {symbol: MatchingEngine(symbol, clock=lambda: T0) for symbol in symbols}
+    trades = []
+    for action, payload in flow:
+        if action == 'cancel':
+            engines[payload[0]].cancel_order(payload[1])
+        else:
+            trades.extend(engines[payload.symbol].process_order(payload))
+    return engines, trades
+
+def trade_keys(trades):
+    return [(t.symbol, t.price, t.quantity, t.buyer_order_id, t.seller_order_id) for t in trades]
+
+def order_states(flow):
+    return [(o.status, o.filled_quantity, o.remaining_quantity) for action, o in flow if action == 'order']
+
+def book_state(engine):
+    return engine.get_order_book_snapshot(100), len(engine.stops), engine.last_price
+
+@pytest.mark.parametrize('seed', [1, 2])
+def test_engine_batches_match_single_orders(seed):
+    flow = generate_flow(seed)
+    batched_flow = copy.deepcopy(flow)
+    engines, expected = one_by_one(flow)
+
+    # Orders between two cancels go in as one batch
+    engine = MatchingEngine('AAA', clock=lambda: T0)
+    trades, batch = [], []
+    for action, payload in batched_flow + [('cancel', ('AAA', 'none'))]:
+        if action == 'order':
+            batch.append(payload)
+            continue
+        trades.extend(engine.process_orders(batch))
+        batch = []
+        engine.cancel_order(payload[1])
+
+    assert len(expected) > 500 and any(o.type in (OrderType.STOP, OrderType.STOP_LIMIT) and o.filled_quantity
+                                       for action, o in flow if action == 'order')
+    assert trade_keys(trades) == trade_keys(expected)
+    assert trade_keys(engine.trades) == trade_keys(engines['AAA'].trades)
+    assert book_state(engine) == book_state(engines['AAA'])
+    assert order_states(batched_flow) == order_states(flow)
+
+def test_simulation_batches_match_single_orders():
+    flow = generate_flow(3, SYMBOLS)
+    batched_flow, pristine = copy.deepcopy(flow), copy.deepcopy(flow)
+    engines, expected = one_by_one(flow, SYMBOLS)
+
+    # Every order and cancel is due in the same step: the run loop batches the
+    # orders between cancels and process_orders splits them by symbol
+    sim = MarketSimulation(T0, T0)
+    for symbol in SYMBOLS:
+        sim.add_exchange(symbol)
+    sim.register_event_handler('cancel', lambda payload: sim.cancel_order(*payload))
+    for action, payload in batched_flow:
+        sim.schedule_event(T0, action, payload)
+    results = sim.run()
+
+    assert sim.step_count == 1
+    for symbol in SYMBOLS:
+        assert trade_keys(sim.exchanges[symbol].trades) == trade_keys(engines[symbol].trades)
+        assert book_state(sim.exchanges[symbol]) == book_state(engines[symbol])
+    assert sorted(trade_keys(results['trades'])) == sorted(trade_keys(expected))
+    assert order_states(batched_flow) == order_states(flow)
+
+    # An 'orders' event submits a whole batch at once
+    batch_sim = MarketSimulation(T0, T0)
+    for symbol in SYMBOLS:
+        batch_sim.add_exchange(symbol)
+    orders = [payload for action, payload in pristine if action == 'order'][:200]
+    reference, _ = one_by_one([('order', order) for order in copy.deepcopy(orders)], SYMBOLS)
+    batch_sim.schedule_event(T0, 'orders', orders)
+    batch_sim.run()
+    for symbol in SYMBOLS:
+        assert book_state(batch_sim.exchanges[symbol]) == book_state(reference[symbol])
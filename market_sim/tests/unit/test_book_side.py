@@ -0,0 +1,63 @@
+"""Tests for BookSide's price heap with lazily deleted levels."""
+
+from decimal import Decimal
+
+from core.models.base import BookSide, OrderSide
+
+def prices(*values):
+    return [Decimal(value) for value in values]
+
+def make_side(side, *values):
+    book = BookSide(side)
+    for price in prices(*values):
+        book.get_or_create_level(price)
+    return book
+
+def test_best_price_moves_on_when_the_best_level_empties():
+    bids = make_side(OrderSide.BUY, '99', '101', '100')
+    asks = make_side(OrderSide.SELL, '103', '102', '104')
+    assert bids.best_price() == Decimal('101') and asks.best_price() == Decimal('102')
+
+    bids.remove_level(Decimal('101'))
+    asks.remove_level(Decimal('102'))
+    assert bids.best_price() == Decimal('100') and asks.best_price() == Decimal('103')
+    assert bids.best_level().price == Decimal('100')
+
+    for price in prices('100', '99'):
+        bids.remove_level(price)
+    assert bids.best_price() is None and bids.best_level() is None and not bids
+    assert list(bids.prices()) == []
+
+def test_level_readded_at_a_stale_price_is_listed_once():
+    asks = make_side(OrderSide.SELL, '100', '101', '102')
+    # 101 is not at the top, so its heap entry stays behind as stale
+    asks.remove_level(Decimal('101'))
+    assert Decimal('101') not in asks
+    assert list(asks.prices()) == prices('100', '102')
+
+    level = asks.get_or_create_level(Decimal('101'))
+    assert asks[Decimal('101')] is level
+    assert list(asks.prices()) == prices('100', '101', '102')
+    assert sorted(asks._heap) == sorted(set(asks._heap))
+
+    asks.remove_level(Decimal('100'))
+    assert asks.best_price() == Decimal('101')
+    # A level emptied at the top is popped and pushed again when re-added
+    asks.remove_level(Decimal('101'))
+    asks.get_or_create_level(Decimal('101'))
+    assert list(asks.prices()) == prices('101', '102')
+
+def test_compaction_keeps_price_order():
+    bids = make_side(OrderSide.BUY, *range(1, 301))
+    for price in range(1, 300, 2):
+        bids.remove_level(Decimal(price))
+    # Stale entries outnumbered live levels, so the heap was rebuilt
+    assert len(bids._heap) <= 2 * len(bids) + 64
+    assert bids._in_heap == {-key for key in bids._heap} >= set(bids.levels)
+    assert list(bids.prices()) == prices(*range(300, 0, -2))
+    assert [level.price for level in bids.values()] == list(bids.keys())
+
+    bids.remove_level(Decimal('300'))
+    bids.get_or_create_level(Decimal('299'))
+    assert bids.best_price() == Decimal('299')
+    assert list(bids.prices())[:3] == prices('299', '298', '296')
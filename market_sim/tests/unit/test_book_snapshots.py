@@ -0,0 +1,81 @@
+"""Cached depth snapshots and level totals must track every change to the book."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide, OrderStatus, TimeInForce
+from core.utils.fixed_point import FixedPointScale
+from market.exchange.matching_engine import MatchingEngine
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+DEPTH = 10
+
+def limit(side, quantity, price, **kwargs):
+    return Order.create_limit_order('TEST', side, Decimal(quantity), Decimal(price), 'T', **kwargs)
+
+def recomputed(engine, book):
+    """Top levels rebuilt from the resting orders themselves."""
+    levels = []
+    for price in sorted(book.levels, reverse=book.side == OrderSide.BUY)[:DEPTH]:
+        quantity = sum(order.remaining_quantity for order in book.levels[price])
+        if engine.scale is not None:
+            price = engine.scale.from_ticks(price)
+        levels.append((price, quantity))
+    return levels
+
+def check(engine):
+    for book in (engine.order_book.bids, engine.order_book.asks):
+        for level in book.levels.values():
+            assert level.total == sum(node.quantity for node in level.nodes())
+    assert engine.get_order_book_snapshot(DEPTH) == (recomputed(engine, engine.order_book.bids),
+                                                     recomputed(engine, engine.order_book.asks))
+
+@pytest.mark.parametrize('scale', [None, FixedPointScale(Decimal('0.01'))])
+def test_snapshots_follow_every_mutation(scale):
+    clock = {'now': T0}
+    engine = MatchingEngine('TEST', scale=scale, clock=lambda: clock['now'])
+    for price in ['101', '102', '103']:
+        engine.process_order(limit(OrderSide.SELL, '10', price))
+        engine.process_order(limit(OrderSide.SELL, '5', price))
+    resting_bid = limit(OrderSide.BUY, '10', '99')
+    expiring = limit(OrderSide.BUY, '4', '99', time_in_force=TimeInForce.GTD,
+                     expires_at=T0 + timedelta(seconds=1))
+    engine.process_order(resting_bid)
+    engine.process_order(expiring)
+    check(engine)
+    # Unchanged sides are served from the cache
+    assert engine.get_order_book_snapshot(DEPTH)[1] is engine.get_order_book_snapshot(DEPTH)[1]
+
+    # Partial fill of the first order at the best ask
+    engine.process_order(limit(OrderSide.BUY, '3', '101'))
+    check(engine)
+    assert engine.get_order_book_snapshot(DEPTH)[1][0] == (Decimal('101'), Decimal('12'))
+
+    # Cancel behind the best bid's queue head
+    assert engine.cancel_order(str(resting_bid.id)) is resting_bid
+    check(engine)
+
+    # GTD expiry empties the bid side
+    clock['now'] = T0 + timedelta(seconds=2)
+    assert engine.expire_orders(clock['now']) == [expiring]
+    check(engine)
+    assert engine.get_order_book_snapshot(DEPTH)[0] == []
+
+    # A stop-limit triggered by a trade rests its remainder at its limit
+    stop = Order.create_stop_order('TEST', OrderSide.BUY, Decimal('30'), Decimal('102'), 'T',
+                                   limit_price=Decimal('102'))
+    engine.process_order(stop)
+    check(engine)
+    engine.process_order(Order.create_market_order('TEST', OrderSide.BUY, Decimal('13'), 'T'))
+    assert stop.status == OrderStatus.PARTIAL
+    check(engine)
+    assert engine.get_order_book_snapshot(DEPTH) == ([(Decimal('102'), Decimal('16'))],
+                                                     [(Decimal('103'), Decimal('15'))])
+
+    # A stop already crossed sweeps the bids as a market order
+    sell_stop = Order.create_stop_order('TEST', OrderSide.SELL, Decimal('20'), Decimal('103'), 'T')
+    engine.process_order(sell_stop)
+    assert sell_stop.status == OrderStatus.CANCELLED and sell_stop.filled_quantity == Decimal('16')
+    check(engine)
+    assert engine.get_order_book_snapshot(DEPTH)[0] == []
@@ -0,0 +1,84 @@
+"""Event-driven runs skip idle steps but match fixed-step results."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+from core.models.base import Order, OrderSide, OrderStatus, TimeInForce
+from market.agents.base_agent import BaseAgent
+from simulation.engine.simulation_engine import MarketSimulation
+
+START = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+class Sleeper(BaseAgent):
+    """Wakes itself once and records every call it gets."""
+
+    def __init__(self, agent_id, wake_at):
+        super().__init__(agent_id, Decimal('0'))
+        self.wake_at = wake_at
+        self.time_updates = []
+        self.book_updates = []
+
+    def on_order_book_update(self, symbol, bids, asks):
+        self.book_updates.append((self.clock(), symbol))
+        if not self.time_updates:
+            self.request_wakeup(self.wake_at)
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        self.time_updates.append(timestamp)
+
+def run(fixed_step):
+    sim = MarketSimulation(START, START + timedelta(hours=1), fixed_step=fixed_step, seed=5)
+    sim.add_exchange('AAA')
+    agent = Sleeper('SLEEPER', START + timedelta(minutes=30, milliseconds=30))
+    sim.add_agent(agent)
+    for minute in (1, 20, 59):
+        at = START + timedelta(minutes=minute, milliseconds=50)
+        sim.schedule_event(at, 'order', Order.create_limit_order(
+            'AAA', OrderSide.SELL, Decimal('5'), Decimal('100'), 'X', at))
+        sim.schedule_event(at, 'order', Order.create_market_order('AAA', OrderSide.BUY, Decimal('2'), 'Y', at))
+    return sim.run(), sim, agent
+
+def test_event_driven_run_matches_fixed_step():
+    fixed, fixed_sim, _ = run(fixed_step=True)
+    driven, driven_sim, agent = run(fixed_step=False)
+    
+    assert len(driven['trade_tape']) > 0
+    assert np.array_equal(fixed['trade_tape'], driven['trade_tape'])
+    assert fixed_sim.step_count == 36_001
+    assert driven_sim.step_count < 10
+    # Books are only pushed when they change, on the fixed-step grid
+    assert [t for t, _ in agent.book_updates] == \
+        [START + timedelta(minutes=m, milliseconds=100) for m in (1, 20, 59)]
+    # The wake-up request is honoured, rounded up to the next step
+    assert agent.time_updates == [START + timedelta(minutes=30, milliseconds=100)]
+
+def run_expiry(fixed_step):
+    sim = MarketSimulation(START, START + timedelta(seconds=10), fixed_step=fixed_step, seed=5)
+    sim.add_exchange('AAA')
+    agent = Sleeper('SLEEPER', START + timedelta(hours=1))
+    sim.add_agent(agent)
+    # Rests until 1.05s; nothing is scheduled between its arrival and expiry
+    expiring = Order.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('100'), 'X', START,
+                                        time_in_force=TimeInForce.GTD, expires_at=START + timedelta(seconds=1.05))
+    sim.schedule_event(START, 'order', expiring)
+    for second in (1.1, 4):
+        at = START + timedelta(seconds=second)
+        sim.schedule_event(at, 'order', Order.create_market_order('AAA', OrderSide.BUY, Decimal('2'), 'Y', at))
+    return sim.run(), sim, agent, expiring
+
+def test_gtd_expiry_is_the_same_in_both_modes():
+    fixed, _, fixed_agent, fixed_order = run_expiry(fixed_step=True)
+    driven, driven_sim, driven_agent, driven_order = run_expiry(fixed_step=False)
+
+    # Expiry runs before the step's orders, so neither buy reaches the order
+    assert len(fixed['trade_tape']) == len(driven['trade_tape']) == 0
+    assert fixed_order.status == driven_order.status == OrderStatus.EXPIRED
+    assert fixed_order.updated_at == driven_order.updated_at == START + timedelta(seconds=1.1)
+    # The event-driven run wakes for the expiry and publishes the emptied book
+    assert driven_sim.step_count < 10
+    assert [t for t, _ in driven_agent.book_updates] == [
+        START, START + timedelta(seconds=1.1), START + timedelta(seconds=4)]
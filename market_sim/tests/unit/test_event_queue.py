@@ -0,0 +1,70 @@
+"""Tests for the typed, tie-broken simulation event queue."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from simulation.engine.event_queue import EventQueue, EventType
+from simulation.engine.simulation_engine import MarketSimulation
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+def drain(queue, until):
+    return [data for _, data in queue.pop_due(until)]
+
+def test_ties_break_on_priority_then_schedule_order():
+    queue = EventQueue()
+    later = T0 + timedelta(seconds=1)
+    queue.push(later, 'order', 'late')
+    queue.push(T0, 'order', 'first')
+    queue.push(T0, 'market_event', 'urgent', priority=0)
+    queue.push(T0, 'order', 'low', priority=5)
+    queue.push(T0, EventType.ORDERS, 'second')
+    
+    t0_ns = queue.peek_ns()
+    assert drain(queue, t0_ns) == ['first', 'urgent', 'second', 'low']
+    assert [event.event_type for event in queue] == ['order']
+    assert next(iter(queue)).timestamp == later
+
+def test_bulk_scheduling_and_cancellation():
+    queue = EventQueue()
+    handle = queue.push(T0, 'order', 'kept-early')
+    handles = queue.schedule_many((T0 + timedelta(milliseconds=i), 'order', i) for i in range(100, 0, -1))
+    queue.cancel(handles[0])  # The event at +100ms
+    queue.cancel(handle)
+    
+    assert len(queue) == 99
+    assert drain(queue, queue.peek_ns() + 10**12) == list(range(1, 100))
+    assert len(queue) == 0 and queue.peek_ns() is None
+    
+    with pytest.raises(ValueError):
+        queue.push(T0, 'no_such_event', None)
+
+def test_cancel_ignores_handles_that_are_not_pending():
+    queue = EventQueue()
+    first, second, third = (queue.push(T0 + timedelta(seconds=i), 'order', i) for i in range(3))
+    
+    assert queue.cancel(second) is True
+    assert queue.cancel(second) is False  # Already cancelled
+    assert len(queue) == 2
+    assert queue.pop()[2] == 0
+    assert queue.cancel(first) is False   # Already run
+    assert queue.cancel(12345) is False   # Never issued
+    assert len(queue) == 1 and [event.data for event in queue] == [2]
+    
+    assert drain(queue, queue.peek_ns()) == [2]
+    assert queue.cancel(third) is False
+    assert len(queue) == 0 and queue.peek_ns() is None
+    # The queue stays consistent for later events
+    fourth = queue.push(T0, 'order', 4)
+    assert len(queue) == 1 and queue.cancel(fourth) and len(queue) == 0
+
+def test_simulation_dispatches_registered_event_types():
+    sim = MarketSimulation(T0, T0 + timedelta(seconds=1))
+    seen = []
+    sim.register_event_handler('note', seen.append)
+    sim.schedule_event(T0 + timedelta(milliseconds=500), 'note', 'b')
+    sim.schedule_event(T0, 'note', 'a')
+    cancelled = sim.schedule_event(T0, 'note', 'never')
+    sim.cancel_event(cancelled)
+    sim.run()
+    assert seen == ['a', 'b']
@@ -0,0 +1,123 @@
+"""Fills reach only their two owners; public trades only subscribers."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from core.models.base import Order, OrderSide, OrderStatus, Position, TimeInForce
+from market.agents.base_agent import BaseAgent
+from simulation.engine.simulation_engine import MarketSimulation
+
+START = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+class Recorder(BaseAgent):
+    def __init__(self, agent_id):
+        super().__init__(agent_id, Decimal('10000'))
+        self.fills = []
+        self.prints = []
+        self.done = []
+
+    def on_order_book_update(self, symbol, bids, asks):
+        pass
+
+    def on_trade(self, trade):
+        self.prints.append(trade)
+
+    def on_order_fill(self, order, trade):
+        self.fills.append((order.id, trade.id))
+        super().on_order_fill(order, trade)
+
+    def on_order_done(self, order):
+        self.done.append((order.id, order.status))
+        super().on_order_done(order)
+
+    def on_time_update(self, timestamp):
+        pass
+
+def build():
+    sim = MarketSimulation(START, START + timedelta(seconds=5))
+    sim.add_exchange('AAA')
+    agents = [Recorder(name) for name in ('MAKER', 'TAKER', 'WATCHER', 'IDLE')]
+    for agent in agents:
+        sim.add_agent(agent)
+    sim.subscribe_trades('WATCHER')
+    return sim, agents
+
+def test_fills_go_to_the_counterparties_only():
+    sim, (maker, taker, watcher, idle) = build()
+    ask = maker.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('10'))
+    sim.process_order(ask)
+    first = taker.create_market_order('AAA', OrderSide.BUY, Decimal('2'))
+    second = taker.create_market_order('AAA', OrderSide.BUY, Decimal('3'))
+    trades = sim.process_orders([first, second])
+
+    assert maker.fills == [(ask.id, trades[0].id), (ask.id, trades[1].id)]
+    assert taker.fills == [(first.id, trades[0].id), (second.id, trades[1].id)]
+    assert watcher.prints == trades and watcher.fills == []
+    assert idle.prints == [] and idle.fills == []
+    assert maker.prints == [] and taker.prints == []
+
+    # Positions, cash and the agents' open orders follow the fills
+    assert maker.positions['AAA'].quantity == Decimal('-5') and maker.balance == Decimal('10050')
+    assert taker.positions['AAA'].quantity == Decimal('5') and taker.balance == Decimal('9950')
+    assert maker.orders == {} and taker.orders == {}
+    assert len(maker.trades) == 2
+    assert sim._order_owners == {}
+
+def test_owner_index_forgets_cancelled_and_expired_orders():
+    sim, (maker, taker, watcher, idle) = build()
+    resting = maker.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('10'))
+    expiring = maker.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('11'), TimeInForce.GTD,
+                                        START + timedelta(seconds=1))
+    sim.process_orders([resting, expiring])
+    assert set(sim._order_owners) == {resting.id, expiring.id}
+    sim.cancel_order('AAA', str(resting.id))
+    sim.run()
+    assert sim._order_owners == {}
+
+    # Orders of unknown agents still trade, without fill callbacks
+    sim.process_order(Order.create_limit_order('AAA', OrderSide.SELL, Decimal('1'), Decimal('9'), 'NOBODY'))
+    sim.process_order(taker.create_market_order('AAA', OrderSide.BUY, Decimal('1')))
+    assert len(taker.fills) == 1 and len(watcher.prints) == 1
+
+def open_orders(agent):
+    return agent.get_portfolio_summary({})['open_orders']
+
+def test_orders_ending_unfilled_leave_the_agents_books():
+    sim, (maker, taker, watcher, idle) = build()
+    resting = maker.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('10'))
+    expiring = maker.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('12'), TimeInForce.GTD,
+                                        START + timedelta(seconds=1))
+    sim.process_orders([resting, expiring])
+    assert open_orders(maker) == 2
+
+    # IOC remainder and post-only rejection
+    ioc = taker.create_limit_order('AAA', OrderSide.BUY, Decimal('8'), Decimal('11'), TimeInForce.IOC)
+    post_only = taker.create_limit_order('AAA', OrderSide.BUY, Decimal('1'), Decimal('12'), TimeInForce.POST_ONLY)
+    sim.process_orders([ioc, post_only])
+    assert ioc.status == OrderStatus.CANCELLED and ioc.filled_quantity == Decimal('5')
+    assert taker.done == [(ioc.id, OrderStatus.CANCELLED), (post_only.id, OrderStatus.REJECTED)]
+    assert open_orders(taker) == 0
+    assert maker.done == [] and open_orders(maker) == 1
+
+    # GTD expiry during the run, and a gateway rejection for lack of cash
+    too_big = taker.create_limit_order('AAA', OrderSide.BUY, Decimal('1000'), Decimal('50'))
+    taker.submit_order(too_big)
+    sim.run()
+    assert maker.done == [(expiring.id, OrderStatus.EXPIRED)] and open_orders(maker) == 0
+    assert taker.done[-1] == (too_big.id, OrderStatus.REJECTED) and open_orders(taker) == 0
+    assert sim._order_owners == {}
+    assert all(metrics['open_orders'] == 0 for metrics in sim.metrics['agent_metrics'][-4:])
+
+def test_position_updates_long_short_and_reversal():
+    position = Position.create('A', 'AAA', START)
+    position.update(Decimal('10'), Decimal('100'), OrderSide.BUY)
+    position.update(Decimal('10'), Decimal('110'), OrderSide.BUY)
+    assert position.quantity == Decimal('20') and position.average_entry_price == Decimal('105')
+    position.update(Decimal('5'), Decimal('115'), OrderSide.SELL)
+    assert position.realized_pnl == Decimal('50') and position.average_entry_price == Decimal('105')
+    # Selling through zero opens a short at the trade price
+    position.update(Decimal('20'), Decimal('100'), OrderSide.SELL)
+    assert position.quantity == Decimal('-5') and position.average_entry_price == Decimal('100')
+    assert position.realized_pnl == Decimal('-25')
+    position.update(Decimal('5'), Decimal('90'), OrderSide.BUY)
+    assert position.quantity == 0 and position.realized_pnl == Decimal('25')
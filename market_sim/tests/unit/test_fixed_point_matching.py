@@ -0,0 +1,102 @@
+"""Differential test: fixed-point matching must reproduce the Decimal engine exactly."""
+
+import copy
+import random
+from decimal import Decimal
+
+import pytest
+from core.models.base import Asset, Order, OrderSide, OrderStatus
+from core.utils.fixed_point import FixedPointScale
+from market.exchange.matching_engine import MatchingEngine
+
+ASSET = Asset(
+    symbol='TEST',
+    name='Test stock',
+    asset_type='stock',
+    decimals=2,
+    min_trade_size=Decimal('1'),
+    max_trade_size=None,
+    tick_size=Decimal('0.01')
+)
+
+def generate_flow(seed: int, num_orders: int = 5000):
+    """Random on-grid limit, market and cancel flow around a mid price."""
+    rng = random.Random(seed)
+    flow = []
+    live_ids = []
+    for _ in range(num_orders):
+        action = rng.random()
+        side = rng.choice([OrderSide.BUY, OrderSide.SELL])
+        quantity = Decimal(rng.randint(1, 50))
+        if action < 0.15 and live_ids:
+            flow.append(('cancel', live_ids.pop(rng.randrange(len(live_ids)))))
+        elif action < 0.35:
+            flow.append(('order', Order.create_market_order('TEST', side, quantity, 'T')))
+        else:
+            # Bids below and asks above 100.00 most of the time, crossing sometimes
+            offset = Decimal(rng.randint(-5, 40)) * ASSET.tick_size
+            price = Decimal('100.00') - offset if side == OrderSide.BUY else Decimal('100.00') + offset
+            order = Order.create_limit_order('TEST', side, quantity, price, 'T')
+            live_ids.append(str(order.id))
+            flow.append(('order', order))
+    return flow
+
+def run_flow(engine: MatchingEngine, flow):
+    trades = []
+    for action, payload in flow:
+        if action == 'cancel':
+            engine.cancel_order(payload)
+        else:
+            trades.extend(engine.process_order(payload))
+    return trades
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_fixed_point_trades_match_decimal(seed):
+    flow = generate_flow(seed)
+    fixed_flow = copy.deepcopy(flow)
+    
+    decimal_engine = MatchingEngine('TEST')
+    fixed_engine = MatchingEngine('TEST', scale=FixedPointScale.from_asset(ASSET))
+    decimal_trades = run_flow(decimal_engine, flow)
+    fixed_trades = run_flow(fixed_engine, fixed_flow)
+    
+    assert len(decimal_trades) > 100
+    assert [(t.price, t.quantity, t.buyer_order_id, t.seller_order_id) for t in decimal_trades] == \
+           [(t.price, t.quantity, t.buyer_order_id, t.seller_order_id) for t in fixed_trades]
+    # Same exponent as well as same value, so str() output is identical too
+    assert [str(t.price) for t in decimal_trades] == [str(t.price) for t in fixed_trades]
+    
+    assert decimal_engine.get_order_book_snapshot(50) == fixed_engine.get_order_book_snapshot(50)
+    for (_, original), (_, converted) in zip(flow, fixed_flow):
+        if isinstance(original, Order):
+            assert (original.status, original.filled_quantity, original.remaining_quantity) == \
+                   (converted.status, converted.filled_quantity, converted.remaining_quantity)
+
+def test_off_grid_order_is_rejected():
+    engine = MatchingEngine('TEST', scale=FixedPointScale.from_asset(ASSET))
+    order = Order.create_limit_order('TEST', OrderSide.BUY, Decimal('1'), Decimal('100.005'), 'T')
+    
+    assert engine.process_order(order) == []
+    assert order.status == OrderStatus.REJECTED
+    assert not engine.order_book.bids
+
+def test_market_making_scenario_runs_the_same_in_fixed_point():
+    from datetime import datetime, timedelta, timezone
+    import numpy as np
+    from simulation.scenarios.market_making_scenario import TICK_SIZE, create_market_making_scenario
+
+    def run(fixed_point):
+        sim = create_market_making_scenario(
+            start_time=datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc), duration=timedelta(seconds=30),
+            symbols=['AAA', 'BBB'], num_random_traders=3, num_population_traders=1000, seed=11,
+            fixed_point=fixed_point)
+        return sim.run(), sim
+
+    decimal_results, _ = run(False)
+    fixed_results, fixed_sim = run(True)
+    assert all(exchange.scale is not None for exchange in fixed_sim.exchanges.values())
+    # Off-grid quotes or sizes would be rejected and change the trades
+    assert len(fixed_results['trade_tape']) > 100
+    assert np.array_equal(decimal_results['trade_tape'], fixed_results['trade_tape'])
+    assert all(trade.price % TICK_SIZE == 0 and trade.quantity % 1 == 0 for trade in fixed_results['trades'])
+    assert decimal_results['final_state'] == fixed_results['final_state']
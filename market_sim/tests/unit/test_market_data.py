@@ -0,0 +1,57 @@
+"""Tests for the incremental book event feed and local book reconstruction."""
+
+import random
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide
+from core.utils.fixed_point import FixedPointScale
+from market.exchange.market_data import BookEventType, LocalOrderBook
+from market.exchange.matching_engine import MatchingEngine
+
+@pytest.mark.parametrize('scale', [None, FixedPointScale(Decimal('0.01'))])
+def test_local_book_tracks_engine(scale):
+    rng = random.Random(7)
+    engine = MatchingEngine('TEST', scale=scale)
+    engine.enable_market_data(level=3)
+    local = LocalOrderBook('TEST')
+    resting = []
+    
+    for step in range(3000):
+        side = rng.choice([OrderSide.BUY, OrderSide.SELL])
+        quantity = Decimal(rng.randint(1, 20))
+        action = rng.random()
+        if action < 0.2 and resting:
+            engine.cancel_order(str(resting.pop(rng.randrange(len(resting))).id))
+        elif action < 0.35:
+            engine.process_order(Order.create_market_order('TEST', side, quantity, 'T'))
+        else:
+            offset = Decimal(rng.randint(-3, 25)) / 100
+            price = Decimal('50.00') - offset if side == OrderSide.BUY else Decimal('50.00') + offset
+            order = Order.create_limit_order('TEST', side, quantity, price, 'T')
+            engine.process_order(order)
+            resting.append(order)
+        
+        # Consumers drain at irregular intervals
+        if step % 17 == 0:
+            local.apply(engine.drain_deltas())
+            assert local.snapshot(100) == engine.get_order_book_snapshot(100)
+    
+    local.apply(engine.drain_deltas())
+    assert local.snapshot(100) == engine.get_order_book_snapshot(100)
+    assert set(local.orders) == {int(order_id) for order_id in engine.order_book.order_index}
+
+def test_unchanged_book_publishes_nothing_and_gaps_are_detected():
+    engine = MatchingEngine('TEST')
+    engine.enable_market_data()
+    engine.process_order(Order.create_limit_order('TEST', OrderSide.BUY, Decimal('5'), Decimal('10'), 'T'))
+    deltas = engine.drain_deltas()
+    
+    assert [d.type for d in deltas] == [BookEventType.LEVEL_ADD]
+    assert engine.drain_deltas() == []
+    
+    engine.process_order(Order.create_market_order('TEST', OrderSide.SELL, Decimal('5'), 'T'))
+    later = engine.drain_deltas()
+    assert [d.type for d in later] == [BookEventType.TRADE, BookEventType.LEVEL_DELETE]
+    with pytest.raises(ValueError):
+        LocalOrderBook('TEST').apply(later)
@@ -0,0 +1,104 @@
+"""Market data goes only to subscribers, at their depth and throttle."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from core.models.base import Order, OrderSide
+from market.agents.base_agent import BaseAgent
+from market.exchange.market_data import Subscription
+from simulation.engine.simulation_engine import MarketSimulation
+
+START = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+STEP = timedelta(milliseconds=100)
+
+class Listener(BaseAgent):
+    def __init__(self, agent_id, subscriptions=None):
+        super().__init__(agent_id, Decimal('10000'))
+        self.subscriptions = subscriptions
+        self.books = []
+        self.prints = []
+        self.delta_batches = []
+
+    def market_data_subscriptions(self):
+        if self.subscriptions is None:
+            return super().market_data_subscriptions()
+        return self.subscriptions
+
+    def on_book_delta(self, symbol, deltas):
+        self.delta_batches.append((self.clock(), symbol, len(deltas)))
+        return super().on_book_delta(symbol, deltas)
+
+    def on_order_book_update(self, symbol, bids, asks):
+        self.books.append((self.clock(), symbol, len(bids)))
+
+    def on_trade(self, trade):
+        self.prints.append(trade.symbol)
+
+    def on_time_update(self, timestamp):
+        pass
+
+def build(**kwargs):
+    sim = MarketSimulation(START, START + timedelta(seconds=1), **kwargs)
+    for symbol in ('AAA', 'BBB'):
+        sim.add_exchange(symbol)
+    return sim
+
+def schedule_book(sim, symbol, at, levels=3):
+    for i in range(levels):
+        sim.schedule_event(at, 'order', Order.create_limit_order(
+            symbol, OrderSide.BUY, Decimal('1'), Decimal(100 - i), 'SOMEONE', at))
+        sim.schedule_event(at, 'order', Order.create_limit_order(
+            symbol, OrderSide.SELL, Decimal('1'), Decimal(101 + i), 'SOMEONE', at))
+
+def test_dispatch_follows_symbols_depth_and_kind():
+    sim = build()
+    everything = Listener('ALL')
+    narrow = Listener('NARROW', [Subscription(symbols=['AAA'], depth=1, trades=True)])
+    prints = Listener('PRINTS', [Subscription(books=False, trades=True)])
+    for agent in (everything, narrow, prints):
+        sim.add_agent(agent)
+    schedule_book(sim, 'AAA', START)
+    schedule_book(sim, 'BBB', START)
+    for symbol in ('AAA', 'BBB'):
+        sim.schedule_event(START + STEP, 'order', Order.create_market_order(
+            symbol, OrderSide.BUY, Decimal('1'), 'SOMEONE'))
+    sim.run()
+
+    steps = 11
+    assert len(everything.books) == 2 * steps
+    assert {symbol for _, symbol, _ in narrow.books} == {'AAA'} and len(narrow.books) == steps
+    assert {depth for _, _, depth in narrow.books} == {1}
+    assert {depth for _, symbol, depth in everything.books if symbol == 'AAA'} == {3}
+    assert prints.books == [] and sorted(prints.prints) == ['AAA', 'BBB']
+    assert narrow.prints == ['AAA'] and everything.prints == []
+
+    sim.unsubscribe('ALL')
+    sim.subscribe('NARROW', Subscription(symbols=['BBB'], books=False, trades=True))
+    sim.process_order(Order.create_market_order('BBB', OrderSide.BUY, Decimal('1'), 'SOMEONE'))
+    assert narrow.prints == ['AAA', 'BBB']
+
+def test_throttled_snapshots_are_conflated():
+    sim = build()
+    slow = Listener('SLOW', [Subscription(symbols=['AAA'], throttle=timedelta(milliseconds=300))])
+    sim.add_agent(slow)
+    sim.run()
+    assert [time - START for time, _, _ in slow.books] == [timedelta(milliseconds=ms) for ms in (0, 300, 600, 900)]
+
+def test_throttled_deltas_arrive_together_in_event_driven_runs():
+    sim = build(market_data_level=2, fixed_step=False)
+    slow = Listener('SLOW', [Subscription(throttle=timedelta(milliseconds=500))])
+    fast = Listener('FAST')
+    sim.add_agent(slow)
+    sim.add_agent(fast)
+    for i in range(3):
+        schedule_book(sim, 'AAA', START + i * STEP, levels=1)
+    sim.schedule_event(START + 4 * STEP, 'order', Order.create_market_order(
+        'AAA', OrderSide.BUY, Decimal('1'), 'SOMEONE'))
+    sim.run()
+
+    # The fast agent sees every change; the slow one the first at once and
+    # the rest conflated into one batch when its throttle allows
+    assert [time - START for time, _, _ in fast.delta_batches] == [i * STEP for i in (0, 1, 2, 4)]
+    assert [time - START for time, _, _ in slow.delta_batches] == [timedelta(0), 5 * STEP]
+    assert sum(n for _, _, n in slow.delta_batches) == sum(n for _, _, n in fast.delta_batches)
+    assert slow.local_books['AAA'].snapshot() == sim.exchanges['AAA'].get_order_book_snapshot()
@@ -0,0 +1,53 @@
+"""Tests for metrics sinks and per-family sampling intervals."""
+
+import csv
+import json
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from core.models.base import Order, OrderSide
+from simulation.engine.simulation_engine import MarketSimulation
+from simulation.results.metrics_sinks import CsvMetricsSink, NullMetricsSink, ParquetMetricsSink
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+def make_sim(**kwargs):
+    sim = MarketSimulation(T0, T0 + timedelta(seconds=10), **kwargs)
+    sim.add_exchange('AAA')
+    for side, price in ((OrderSide.BUY, '99'), (OrderSide.SELL, '101')):
+        sim.schedule_event(T0, 'order', Order.create_limit_order('AAA', side, Decimal('5'), Decimal(price), 'X', T0))
+    return sim
+
+def test_in_memory_sink_keeps_every_step_by_default():
+    results = make_sim().run()
+    assert len(results['metrics']['order_book_snapshots']) == 101
+    assert len(results['metrics']['market_metrics']) == 101
+
+def test_sampling_intervals_per_family():
+    sim = make_sim(metrics_intervals={'order_book_snapshots': timedelta(seconds=1),
+                                      'market_metrics': timedelta(seconds=5)})
+    metrics = sim.run()['metrics']
+    assert [m['timestamp'] for m in metrics['market_metrics']] == [T0 + timedelta(seconds=s) for s in (0, 5, 10)]
+    assert len(metrics['order_book_snapshots']) == 11
+    assert metrics['agent_metrics'] == []  # No agents
+
+def test_csv_sink_streams_records(tmp_path):
+    sink = CsvMetricsSink(str(tmp_path))
+    results = make_sim(metrics_sink=sink).run()
+    
+    with open(results['metrics']['order_book_snapshots'], newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 101
+    assert json.loads(rows[0]['bids']) == [['99', '5']]
+    assert sink.rows['market_metrics'] == 101
+
+def test_null_sink_records_nothing():
+    assert make_sim(metrics_sink=NullMetricsSink()).run()['metrics'] == {}
+
+def test_parquet_sink_writes_row_groups(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+    results = make_sim(metrics_sink=ParquetMetricsSink(str(tmp_path), row_group_size=40)).run()
+    parquet_file = pq.ParquetFile(results['metrics']['market_metrics'])
+    assert parquet_file.metadata.num_rows == 101
+    assert parquet_file.metadata.num_row_groups == 3
@@ -0,0 +1,92 @@
+"""Order-flow files: chunked CSV parsing and replay into a simulation."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from core.data.order_flow import read_order_events_csv
+from core.models.base import Asset, OrderSide
+from core.utils.time_utils import datetime_to_ns
+from simulation.engine.order_flow_replay import OrderFlowReplay
+from simulation.engine.simulation_engine import MarketSimulation
+
+START = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+def ns(seconds):
+    return datetime_to_ns(START + timedelta(seconds=seconds))
+
+# Columns deliberately out of the canonical order, with empty fields
+FLOW = [
+    (ns(0.0), 'A', 1, 'AAA', 'S', '101.5', '10'),
+    (ns(0.0), 'A', 2, 'AAA', 'B', '100', '5'),
+    (ns(0.1), 'A', 3, 'ZZZ', 'B', '1', '1'),      # No exchange: skipped
+    (ns(0.5), 'M', 2, 'AAA', 'B', '101.5', '4'),  # Crosses: trades 4 with order 1
+    (ns(1.0), 'X', 4, 'AAA', 'B', '', '2'),       # Takes 2 more from order 1
+    (ns(1.2), 'C', 1, 'AAA', '', '', ''),         # Cancels the remaining 4
+    (ns(1.3), 'C', 99, 'AAA', '', '', ''),        # Unknown order
+    (ns(1.5), 'X', 5, 'AAA', 'S', '', '3'),       # Empty book
+    (ns(9.0), 'A', 6, 'AAA', 'B', '99', '1'),     # After the end: skipped
+]
+
+def write_flow(path):
+    with open(path, 'w') as file:
+        file.write('symbol,order_id,timestamp,event,side,quantity,price\n')
+        for timestamp, event, order_id, symbol, side, price, quantity in FLOW:
+            file.write(f"{symbol},{order_id},{timestamp},{event},{side},{quantity},{price}\n")
+
+def test_chunked_csv_matches_whole_file(tmp_path):
+    path = str(tmp_path / 'flow.csv')
+    write_flow(path)
+    whole = np.concatenate(list(read_order_events_csv(path)))
+    chunks = list(read_order_events_csv(path, chunk_bytes=64))
+    assert len(chunks) > 3
+    assert np.concatenate(chunks).tobytes() == whole.tobytes()
+
+    assert whole['order_id'].tolist() == [row[2] for row in FLOW]
+    assert whole['timestamp'].tolist() == [row[0] for row in FLOW]
+    assert whole['symbol'][3] == b'AAA' and whole['event'][3] == b'M'
+    assert np.isnan(whole['price'][4]) and whole['quantity'][4] == 2
+    assert np.isnan(whole['quantity'][5]) and whole['side'][5] == b''
+
+def test_replay_into_simulation(tmp_path):
+    path = str(tmp_path / 'flow.csv')
+    write_flow(path)
+    sim = MarketSimulation(START, START + timedelta(seconds=5))
+    sim.add_exchange('AAA')
+    replay = OrderFlowReplay(sim, path, chunk_bytes=64)
+    results = sim.run()
+
+    trades = results['trades']
+    assert [(t.price, t.quantity) for t in trades] == [(Decimal('101.5'), Decimal('4')), (Decimal('101.5'), Decimal('2'))]
+    assert sim.exchanges['AAA'].get_order_book_snapshot() == ([], [])
+    stats = replay.stats()
+    assert replay.finished
+    assert stats['events_parsed'] == len(FLOW)
+    assert stats['events_skipped'] == 2
+    # Orders 1, 2, the modified 2, and both market orders; 1, new 2 and the first market order traded
+    assert stats['orders_submitted'] == 5
+    assert stats['orders_matched'] == 3
+    assert stats['match_rate'] == 3 / 5
+    assert (stats['cancels'], stats['modifies'], stats['missed_cancels_and_modifies']) == (2, 1, 1)
+
+@pytest.mark.parametrize('fixed_point', [False, True])
+def test_orders_missing_fields_are_skipped(tmp_path, fixed_point):
+    path = str(tmp_path / 'flow.csv')
+    with open(path, 'w') as file:
+        file.write('timestamp,event,order_id,symbol,side,price,quantity\n')
+        file.write(f"{ns(0.0)},A,1,AAA,S,101,10\n")
+        file.write(f"{ns(0.5)},A,2,AAA,B,,5\n")     # Empty price: would cross the ask as NaN
+        file.write(f"{ns(0.6)},X,3,AAA,B,,\n")      # Market order without a quantity
+        file.write(f"{ns(0.7)},M,1,AAA,,100.5,\n")  # Modify without a quantity
+        file.write(f"{ns(1.0)},X,4,AAA,B,,3\n")
+    sim = MarketSimulation(START, START + timedelta(seconds=5))
+    sim.add_asset(Asset('AAA', 'AAA', 'stock', 2, Decimal('1'), None, Decimal('0.01')))
+    sim.add_exchange('AAA', fixed_point=fixed_point)
+    replay = OrderFlowReplay(sim, path)
+    results = sim.run()
+
+    assert [(t.price, t.quantity) for t in results['trades']] == [(Decimal('101'), Decimal('3'))]
+    stats = replay.stats()
+    assert stats['events_skipped'] == 3
+    assert (stats['orders_submitted'], stats['modifies']) == (2, 0)
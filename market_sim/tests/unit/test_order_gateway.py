@@ -0,0 +1,136 @@
+"""Order gateway: batched pre-trade checks, queued and sync routing, cancels."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+from core.models.base import Order, OrderSide, OrderStatus
+from market.agents.base_agent import BaseAgent
+from simulation.engine.order_gateway import _running_total
+from simulation.engine.simulation_engine import MarketSimulation
+
+START = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+class Agent(BaseAgent):
+    """Returns the next of its scripted orders on each book update."""
+
+    def __init__(self, agent_id, balance='1000', script=()):
+        super().__init__(agent_id, Decimal(balance))
+        self.script = list(script)
+
+    def on_order_book_update(self, symbol, bids, asks):
+        if self.script:
+            side, quantity, price = self.script.pop(0)
+            return self.create_limit_order(symbol, side, Decimal(quantity), Decimal(price))
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        pass
+
+def build(**kwargs):
+    sim = MarketSimulation(START, START + timedelta(seconds=1), **kwargs)
+    sim.add_exchange('AAA')
+    sim.add_exchange('BBB')
+    return sim
+
+def test_checks_count_earlier_orders_of_the_batch():
+    sim = build()
+    buyer, seller, short_seller = Agent('BUYER'), Agent('SELLER'), Agent('SHORT')
+    short_seller.max_short_position = Decimal('5')
+    for agent in (buyer, seller, short_seller):
+        sim.add_agent(agent)
+
+    orders = [
+        buyer.create_limit_order('AAA', OrderSide.BUY, Decimal('4'), Decimal('100')),
+        seller.create_limit_order('AAA', OrderSide.SELL, Decimal('1'), Decimal('100')),  # No position
+        buyer.create_limit_order('BBB', OrderSide.BUY, Decimal('6'), Decimal('100')),    # Uses the last cash
+        short_seller.create_limit_order('AAA', OrderSide.SELL, Decimal('3'), Decimal('101')),
+        buyer.create_limit_order('AAA', OrderSide.BUY, Decimal('1'), Decimal('1')),      # Out of cash
+        short_seller.create_limit_order('AAA', OrderSide.SELL, Decimal('3'), Decimal('101')),  # Past the limit
+        short_seller.create_limit_order('BBB', OrderSide.SELL, Decimal('5'), Decimal('101')),
+        buyer.create_market_order('BBB', OrderSide.BUY, Decimal('1')),                   # Empty book: no price
+        Order.create_limit_order('AAA', OrderSide.BUY, Decimal('1'), Decimal('1'), 'NOBODY'),
+    ]
+    assert sim.gateway.check(orders).tolist() == [True, False, True, True, False, False, True, False, False]
+
+    # validate_order agrees one order at a time
+    assert not seller.validate_order(orders[1], {})
+    assert short_seller.validate_order(orders[3], {})
+
+def test_queued_orders_route_at_flush():
+    sim = build()
+    agent = Agent('A', balance='10000')
+    sim.add_agent(agent)
+    resting = agent.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('10'))
+    sim.process_order(resting)
+
+    buy = agent.create_limit_order('AAA', OrderSide.BUY, Decimal('2'), Decimal('10'))
+    assert agent.submit_order(buy) == []
+    assert buy.status == OrderStatus.PENDING
+    dropped = agent.create_limit_order('AAA', OrderSide.BUY, Decimal('2'), Decimal('10'))
+    agent.submit_order(dropped)
+    agent.cancel_order(dropped)
+    rejected = agent.create_limit_order('AAA', OrderSide.BUY, Decimal('2000'), Decimal('10'))
+    agent.submit_order(rejected)
+
+    trades = sim.gateway.flush()
+    assert [(t.buyer_order_id, t.quantity) for t in trades] == [(buy.id, Decimal('2'))]
+    assert dropped.status == OrderStatus.CANCELLED and rejected.status == OrderStatus.REJECTED
+    assert str(rejected.id) not in agent.orders and str(dropped.id) not in agent.orders
+    assert (sim.gateway.submitted, sim.gateway.routed, sim.gateway.rejected) == (3, 1, 1)
+
+    # Cancelling through the gateway takes the order off the book
+    agent.cancel_order(resting)
+    assert sim.exchanges['AAA'].get_order_book_snapshot() == ([], [])
+
+def test_short_limits_come_from_the_portfolio_matrix():
+    sim = build()
+    agents = [Agent(f"A{i}") for i in range(20)]
+    agents[3].max_short_position = Decimal('4')
+    for agent in agents:
+        sim.add_agent(agent)
+    def sell(agent):
+        return agent.create_limit_order('AAA', OrderSide.SELL, Decimal('4'), Decimal('100'))
+    assert sim.portfolio.max_short[3] == 4 and not sim.portfolio.max_short[[0, 19]].any()
+    assert sim.gateway.check([sell(agents[3]), sell(agents[19])]).tolist() == [True, False]
+
+    # A limit changed after registration applies to the next check
+    agents[19].max_short_position = Decimal('4')
+    agents[3].max_short_position = Decimal('0')
+    assert sim.gateway.check([sell(agents[3]), sell(agents[19])]).tolist() == [False, True]
+
+def test_sync_orders_match_on_submit():
+    sim = build(queue_agent_orders=False)
+    agent = Agent('A', balance='10000')
+    sim.add_agent(agent)
+    agent.max_short_position = Decimal('10')
+    agent.submit_order(agent.create_limit_order('AAA', OrderSide.SELL, Decimal('5'), Decimal('10')))
+    trades = agent.submit_order(agent.create_market_order('AAA', OrderSide.BUY, Decimal('3')))
+    assert [t.quantity for t in trades] == [Decimal('3')]
+
+def test_orders_returned_from_book_updates_reach_the_exchange():
+    sim = build()
+    maker = Agent('MAKER', script=[(OrderSide.SELL, '1', '10')] * 2)
+    maker.max_short_position = Decimal('100')
+    taker = Agent('TAKER', script=[(OrderSide.BUY, '1', '5'), (OrderSide.BUY, '1', '11')])
+    sim.add_agent(maker)
+    sim.add_agent(taker)
+    trades = sim.run()['trades']
+    # Each agent is asked once per symbol: on AAA the bid rests below the
+    # ask, on BBB the taker crosses it
+    assert [(t.symbol, t.price) for t in trades] == [('BBB', Decimal('10'))]
+    assert sim.exchanges['AAA'].get_order_book_snapshot() == ([(Decimal('5'), Decimal('1'))],
+                                                              [(Decimal('10'), Decimal('1'))])
+
+def test_running_total_matches_a_loop():
+    rng = np.random.default_rng(3)
+    keys = rng.integers(0, 5, 200)
+    values = rng.random(200)
+    expected = np.empty(200)
+    totals = {}
+    for i, (key, value) in enumerate(zip(keys, values)):
+        totals[key] = totals.get(key, 0.0) + value
+        expected[i] = totals[key]
+    assert np.allclose(_running_total(keys, values), expected)
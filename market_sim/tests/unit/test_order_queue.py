@@ -0,0 +1,80 @@
+"""Tests for the linked order queues of price levels and the book's order index."""
+
+from decimal import Decimal
+
+from core.models.base import Order, OrderBook, OrderSide
+from market.exchange.matching_engine import MatchingEngine
+
+def make_book(count=4):
+    book = OrderBook.create('TEST')
+    orders = [Order.create_limit_order('TEST', OrderSide.BUY, Decimal(i + 1), Decimal('100'), 'A')
+              for i in range(count)]
+    for order in orders:
+        book.add_order(order)
+    return book, orders
+
+def queue(book):
+    return list(book.bids[Decimal('100')])
+
+def check_links(level):
+    nodes = list(level.nodes())
+    assert len(nodes) == level.count
+    assert level.total == sum(node.quantity for node in nodes)
+    assert (level.head, level.tail) == ((nodes[0], nodes[-1]) if nodes else (None, None))
+    for before, after in zip(nodes, nodes[1:]):
+        assert before.next is after and after.prev is before
+
+def test_unlink_head_middle_and_tail():
+    book, (first, second, third, fourth) = make_book()
+    level = book.bids[Decimal('100')]
+    assert level.total == Decimal('10')
+
+    book.remove_order(second)
+    assert queue(book) == [first, third, fourth]
+    check_links(level)
+    book.remove_order(first)
+    assert queue(book) == [third, fourth]
+    check_links(level)
+    book.remove_order(fourth)
+    assert queue(book) == [third]
+    check_links(level)
+    assert level.total == Decimal('3')
+
+    # Later arrivals still queue behind the survivors
+    late = Order.create_limit_order('TEST', OrderSide.BUY, Decimal('7'), Decimal('100'), 'A')
+    book.add_order(late)
+    assert queue(book) == [third, late]
+    check_links(level)
+
+    book.remove_order(third)
+    book.remove_order(late)
+    assert Decimal('100') not in book.bids and not book.order_index
+
+def test_order_index_follows_the_queue():
+    book, orders = make_book()
+    assert set(book.order_index) == {order.id for order in orders}
+    assert book.get_order(orders[2].id) is orders[2]
+
+    assert book.remove_order_by_id(orders[2].id) is orders[2]
+    assert book.get_order(orders[2].id) is None
+    assert queue(book) == [orders[0], orders[1], orders[3]]
+
+def test_cancelling_unknown_or_removed_ids_changes_nothing():
+    book, orders = make_book()
+    version = book.bids.version
+    assert book.remove_order_by_id(-1) is None
+    assert book.remove_order_by_id(orders[0].id) is orders[0]
+    assert book.remove_order_by_id(orders[0].id) is None
+    assert queue(book) == orders[1:] and book.bids.version == version + 1
+
+    engine = MatchingEngine('TEST')
+    engine.process_order(orders[0])
+    assert engine.cancel_order(12345678) is None and engine.cancel_order('no-such-order') is None
+    assert engine.cancel_order(orders[0].id) is orders[0]
+    assert engine.cancel_order(orders[0].id) is None and engine.cancel_order(str(orders[0].id)) is None
+
+    # The string forms of an id still work at the engine's boundary
+    engine.process_orders([orders[1], orders[2]])
+    assert engine.cancel_order(str(orders[1].id)) is orders[1]
+    assert engine.cancel_order(str(orders[2].uuid)) is orders[2]
+    assert not engine.order_book.bids
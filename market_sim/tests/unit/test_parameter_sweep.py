@@ -0,0 +1,72 @@
+"""Parameter sweep: configuration generation, per-run seeds and resuming."""
+
+import csv
+from datetime import timedelta
+
+from simulation.scenarios.parameter_sweep import ParameterSweep, config_hash, grid_search, random_search
+
+def read_rows(path):
+    with open(path, newline='') as file:
+        return list(csv.DictReader(file))
+
+def test_grid_and_random_search():
+    grid = grid_search({'target_spread': ['0.001', '0.002'], 'num_random_traders': [2, 4, 8]})
+    assert len(grid) == 6
+    assert {'target_spread': '0.002', 'num_random_traders': 8} in grid
+
+    space = {'risk_factor': (0.1, 1.0), 'volatility_window': (10, 200), 'order_size': ['50', '100']}
+    configs = random_search(space, num_samples=20, seed=4)
+    assert configs == random_search(space, num_samples=20, seed=4)
+    for config in configs:
+        assert 0.1 <= config['risk_factor'] <= 1.0
+        assert isinstance(config['volatility_window'], int) and 10 <= config['volatility_window'] <= 200
+        assert config['order_size'] in ('50', '100')
+
+    assert config_hash({'a': 1, 'b': '2'}) == config_hash({'b': '2', 'a': 1})
+
+def test_sweep_resumes_and_is_reproducible(tmp_path):
+    configs = grid_search({'target_spread': ['0.001', '0.004'], 'num_random_traders': [2]})
+    path = tmp_path / 'sweep.csv'
+
+    def sweep(results_path):
+        return ParameterSweep(configs, str(results_path), duration=timedelta(seconds=2),
+                              symbols=['AAA'], replicates=2, seed=9, max_workers=1)
+
+    rows = sweep(path).run()
+    assert len(rows) == 4
+    assert len({row['seed'] for row in rows}) == 4
+    assert sweep(path).run() == []
+
+    # Simulate an interruption: one finished row lost and the next half-written
+    lines = path.read_text().splitlines(keepends=True)
+    path.write_text(''.join(lines[:-1]) + lines[-1][:10])
+    resumed = sweep(path).run()
+    assert [row['run_id'] for row in resumed] == [rows[-1]['run_id']]
+
+    written = read_rows(path)
+    assert sorted(row['run_id'] for row in written) == sorted(row['run_id'] for row in rows)
+
+    # A fresh sweep reproduces every run regardless of completion order
+    other = tmp_path / 'other.csv'
+    sweep(other).run()
+    def results(path):
+        rows = ({k: v for k, v in row.items() if k != 'elapsed_seconds'} for row in read_rows(path))
+        return sorted(rows, key=lambda row: row['run_id'])
+    assert results(other) == results(path)
+
+def test_failing_run_does_not_stop_the_sweep(tmp_path, caplog):
+    good = {'target_spread': '0.002', 'num_random_traders': 2}
+    bad = {'target_spread': '0.002', 'num_random_traders': 2, 'no_such_parameter': 1}
+    path = tmp_path / 'sweep.csv'
+    sweep = ParameterSweep([bad, good], str(path), duration=timedelta(seconds=2),
+                           symbols=['AAA'], replicates=2, max_workers=1)
+    rows = sweep.run()
+
+    assert sorted(row['run_id'] for row in rows) == [f"{config_hash(good)}-{i}" for i in range(2)]
+    assert sorted(sweep.failures) == [f"{config_hash(bad)}-{i}" for i in range(2)]
+    assert all('TypeError' in error for error in sweep.failures.values())
+    assert f"{config_hash(bad)}-0" in caplog.text
+    assert len(read_rows(path)) == 2
+
+    # Failed runs are not in the table, so a rerun retries just them
+    assert sweep.run() == [] and len(sweep.failures) == 2
@@ -0,0 +1,58 @@
+"""The vectorized portfolio mirror must agree with the agents' own Decimal books."""
+
+import random
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from core.data.portfolio_matrix import PortfolioMatrix
+from core.models.base import Trade
+from market.agents.base_agent import BaseAgent
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+SYMBOLS = ['AAA', 'BBB', 'CCC']
+
+class Holder(BaseAgent):
+    def on_order_book_update(self, symbol, bids, asks):
+        pass
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        pass
+
+def test_matrix_matches_portfolio_summaries():
+    rng = random.Random(9)
+    matrix = PortfolioMatrix(agent_capacity=2, symbol_capacity=1)  # Forces growth
+    agents = [Holder(f"A{i}", Decimal('100000')) for i in range(5)]
+    for i, agent in enumerate(agents):
+        matrix.add_agent(agent.agent_id, agent.balance, max_short=i)
+        agent.portfolio_mirror = matrix
+    # Short limits survive the growth and follow later changes
+    agents[1].max_short_position = Decimal('7.5')
+    assert matrix.max_short.tolist() == [0, 7.5, 2, 3, 4]
+    
+    for _ in range(300):
+        agent = rng.choice(agents)
+        trade = Trade.create(rng.choice(SYMBOLS), Decimal(rng.randint(9000, 11000)) / 100,
+                             Decimal(rng.randint(1, 20)), 1, 2, T0)
+        # Buy back only part of a short, never through zero
+        covering = agent.get_position(trade.symbol).quantity + trade.quantity < 0
+        agent.update_position(trade, is_buyer=covering and rng.random() < 0.3)
+    
+    current_prices = {'AAA': Decimal('100.5'), 'CCC': Decimal('99.25')}  # No price for BBB
+    prices = np.array([float(current_prices[s]) if s in current_prices else np.nan for s in matrix.symbols])
+    valuation = matrix.valuation(prices)
+    summaries = matrix.summaries(prices, valuation)
+    
+    for agent, summary in zip(agents, summaries):
+        expected = agent.get_portfolio_summary(current_prices)
+        assert summary['agent_id'] == expected['agent_id']
+        assert summary['cash_balance'] == pytest.approx(float(expected['cash_balance']))
+        assert summary['total_value'] == pytest.approx(float(expected['total_value']))
+        assert summary['positions'].keys() == expected['positions'].keys()
+        for symbol, position in expected['positions'].items():
+            for field, value in position.items():
+                assert summary['positions'][symbol][field] == pytest.approx(float(value))
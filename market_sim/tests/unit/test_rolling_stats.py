@@ -0,0 +1,68 @@
+"""Streaming volatility agrees with the batch formulas it replaces."""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from core.models.base import Trade
+from core.utils.rolling_stats import EwmaVolatility, RollingVolatility
+from strategies.hft.market_maker import MarketMaker
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.002, n))), 2)
+
+def batch_volatility(prices, window):
+    """MarketMaker's former calculate_volatility."""
+    prices = prices[-window:]
+    if len(prices) < 2:
+        return Decimal('0')
+    returns = np.diff(np.log([float(p) for p in prices]))
+    return Decimal(str(np.std(returns) * np.sqrt(252)))
+
+def test_rolling_matches_np_std_at_every_step():
+    prices = random_walk(2_000)
+    estimator = RollingVolatility(100)
+    for i, price in enumerate(prices):
+        estimator.update(float(price))
+        expected = np.std(np.diff(np.log(prices[max(0, i - 99):i + 1]))) if i else 0.0
+        assert estimator.std() == pytest.approx(expected, rel=1e-9, abs=1e-15)
+    assert len(estimator) == 99
+
+def test_market_maker_volatility_matches_the_batch_formula():
+    maker = MarketMaker('MM', Decimal('1000000'), ['AAA'], volatility_window=50)
+    history = []
+    for price in random_walk(500, seed=1):
+        price = Decimal(str(price))
+        history.append(price)
+        maker.on_trade(Trade.create('AAA', price, Decimal('1'), 1, 2, T0))
+        assert float(maker.calculate_volatility('AAA')) == pytest.approx(float(batch_volatility(history, 50)),
+                                                                         rel=1e-9, abs=1e-15)
+
+def test_ewma_matches_exponential_weights():
+    prices = random_walk(300, seed=2)
+    alpha = 2 / (20 + 1)
+    estimator = EwmaVolatility(span=20)
+    for price in prices:
+        estimator.update(float(price))
+    returns = np.diff(np.log(prices))
+    weights = alpha * (1 - alpha) ** np.arange(len(returns) - 1, -1, -1)
+    weights[0] = (1 - alpha) ** (len(returns) - 1)
+    mean = weights @ returns
+    assert estimator.std() == pytest.approx(np.sqrt(weights @ (returns - mean) ** 2), rel=1e-9)
+
+    maker = MarketMaker('MM', Decimal('1000000'), ['AAA'], volatility_span=20)
+    assert isinstance(maker.volatility['AAA'], EwmaVolatility)
+
+def test_constant_prices_and_bad_arguments():
+    for estimator in (RollingVolatility(10), EwmaVolatility(alpha=0.5)):
+        for _ in range(30):
+            estimator.update(101.5)
+        assert estimator.std() == pytest.approx(0.0, abs=1e-15)
+    with pytest.raises(ValueError):
+        RollingVolatility(1)
+    with pytest.raises(ValueError):
+        EwmaVolatility(span=10, alpha=0.1)
@@ -0,0 +1,80 @@
+"""Tests for stop and stop-limit order handling."""
+
+from decimal import Decimal
+
+from core.models.base import Order, OrderSide, OrderStatus
+from market.agents.base_agent import BaseAgent
+from market.exchange.matching_engine import MatchingEngine
+
+def limit(side, quantity, price):
+    return Order.create_limit_order('TEST', side, Decimal(quantity), Decimal(price), 'T')
+
+def test_stops_rest_until_crossed_and_cascade():
+    engine = MatchingEngine('TEST')
+    for price in ['101', '102', '103', '104']:
+        engine.process_order(limit(OrderSide.SELL, '10', price))
+    engine.process_order(limit(OrderSide.BUY, '10', '99'))
+    
+    # Buy stop at 101 lifts the 101 and 102 levels, which triggers the 102 stop
+    first = Order.create_stop_order('TEST', OrderSide.BUY, Decimal('20'), Decimal('101'), 'T')
+    second = Order.create_stop_order('TEST', OrderSide.BUY, Decimal('5'), Decimal('102'), 'T')
+    untouched = Order.create_stop_order('TEST', OrderSide.BUY, Decimal('5'), Decimal('110'), 'T')
+    sell_stop = Order.create_stop_order('TEST', OrderSide.SELL, Decimal('5'), Decimal('95'), 'T')
+    for stop in (first, second, untouched, sell_stop):
+        assert engine.process_order(stop) == []
+    assert len(engine.stops) == 4
+    
+    trades = engine.process_order(Order.create_market_order('TEST', OrderSide.BUY, Decimal('1'), 'T'))
+    
+    assert [(t.price, t.quantity) for t in trades] == [
+        (Decimal('101'), Decimal('1')),   # The triggering market order
+        (Decimal('101'), Decimal('9')),   # First stop...
+        (Decimal('102'), Decimal('10')),
+        (Decimal('103'), Decimal('1')),
+        (Decimal('103'), Decimal('5')),   # ...whose fills trigger the second
+    ]
+    assert first.status == OrderStatus.FILLED and second.status == OrderStatus.FILLED
+    assert len(engine.stops) == 2
+    assert engine.cancel_order(str(untouched.id)) is untouched
+    assert untouched.status == OrderStatus.CANCELLED
+    assert len(engine.stops) == 1
+
+def test_stop_limit_rests_at_limit_after_trigger():
+    engine = MatchingEngine('TEST')
+    engine.process_order(limit(OrderSide.BUY, '10', '100'))
+    engine.process_order(limit(OrderSide.BUY, '10', '98'))
+    stop_limit = Order.create_stop_order('TEST', OrderSide.SELL, Decimal('15'), Decimal('100'),
+                                         'T', limit_price=Decimal('99'))
+    engine.process_order(stop_limit)
+    
+    trades = engine.process_order(Order.create_market_order('TEST', OrderSide.SELL, Decimal('4'), 'T'))
+    
+    assert [(t.price, t.quantity) for t in trades] == [(Decimal('100'), Decimal('4')),
+                                                       (Decimal('100'), Decimal('6'))]
+    assert stop_limit.status == OrderStatus.PARTIAL
+    assert engine.get_order_book_snapshot()[1] == [(Decimal('99'), Decimal('9'))]
+
+class Idle(BaseAgent):
+    def on_order_book_update(self, symbol, bids, asks):
+        pass
+
+    def on_trade(self, trade):
+        pass
+
+    def on_time_update(self, timestamp):
+        pass
+
+def test_stop_without_a_stop_price_is_rejected():
+    engine = MatchingEngine('TEST')
+    engine.process_order(limit(OrderSide.SELL, '10', '101'))
+    stops = [Order.create_stop_order('TEST', OrderSide.BUY, Decimal('5'), None, 'T'),
+             Order.create_stop_order('TEST', OrderSide.SELL, Decimal('5'), None, 'T', limit_price=Decimal('99'))]
+    for stop in stops:
+        assert engine.process_order(stop) == []
+        assert stop.status == OrderStatus.REJECTED
+        assert not Idle('T', Decimal('1000000')).validate_order(stop, {'TEST': Decimal('100')})
+    assert len(engine.stops) == 0
+
+    # Later trades compare the last price only against real stops
+    engine.process_order(Order.create_market_order('TEST', OrderSide.BUY, Decimal('1'), 'T'))
+    assert engine.last_price == Decimal('101')
@@ -0,0 +1,79 @@
+"""Tests for time-in-force handling and GTD expiry in the matching engine."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from core.models.base import Order, OrderSide, OrderStatus, TimeInForce
+from market.exchange.matching_engine import MatchingEngine
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+def make_engine():
+    clock = {'now': T0}
+    engine = MatchingEngine('TEST', clock=lambda: clock['now'])
+    for price in ['101', '102']:
+        engine.process_order(Order.create_limit_order(
+            'TEST', OrderSide.SELL, Decimal('10'), Decimal(price), 'MAKER'))
+    return engine, clock
+
+def buy(quantity, price, time_in_force, expires_at=None):
+    return Order.create_limit_order('TEST', OrderSide.BUY, Decimal(quantity), Decimal(price), 'T',
+                                    time_in_force=time_in_force, expires_at=expires_at)
+
+def test_ioc_and_fok():
+    engine, _ = make_engine()
+    
+    ioc = buy('15', '101', TimeInForce.IOC)
+    assert sum(t.quantity for t in engine.process_order(ioc)) == Decimal('10')
+    assert ioc.status == OrderStatus.CANCELLED and not engine.order_book.bids
+    
+    fok_too_big = buy('11', '102', TimeInForce.FOK)
+    assert engine.process_order(fok_too_big) == []
+    assert fok_too_big.status == OrderStatus.CANCELLED
+    
+    fok = buy('10', '102', TimeInForce.FOK)
+    assert len(engine.process_order(fok)) == 1 and fok.status == OrderStatus.FILLED
+
+def test_post_only_rejects_crossing_orders():
+    engine, _ = make_engine()
+    crossing = buy('1', '101', TimeInForce.POST_ONLY)
+    passive = buy('1', '100', TimeInForce.POST_ONLY)
+    
+    assert engine.process_order(crossing) == [] and crossing.status == OrderStatus.REJECTED
+    assert engine.process_order(passive) == [] and passive.status == OrderStatus.PENDING
+    assert engine.order_book.bids.best_price() == Decimal('100')
+
+def test_gtd_orders_expire_on_the_engine_clock():
+    engine, clock = make_engine()
+    soon = buy('1', '99', TimeInForce.GTD, expires_at=T0 + timedelta(seconds=1))
+    later = buy('1', '98', TimeInForce.GTD, expires_at=T0 + timedelta(seconds=5))
+    filled = buy('1', '101', TimeInForce.GTD, expires_at=T0 + timedelta(seconds=1))
+    for order in (soon, later, filled):
+        engine.process_order(order)
+    
+    assert engine.expire_orders(T0) == []
+    clock['now'] = T0 + timedelta(seconds=2)
+    assert engine.expire_orders(clock['now']) == [soon]
+    assert soon.status == OrderStatus.EXPIRED and filled.status == OrderStatus.FILLED
+    assert engine.order_book.bids.best_price() == Decimal('98')
+    
+    no_expiry = buy('1', '97', TimeInForce.GTD)
+    assert engine.process_order(no_expiry) == [] and no_expiry.status == OrderStatus.REJECTED
+
+def test_triggered_gtd_stop_limit_keeps_one_expiry():
+    engine, clock = make_engine()
+    expires_at = T0 + timedelta(seconds=3)
+    stop = Order.create_stop_order('TEST', OrderSide.BUY, Decimal('15'), Decimal('101'), 'T',
+                                   limit_price=Decimal('101'), time_in_force=TimeInForce.GTD,
+                                   expires_at=expires_at)
+    engine.process_order(stop)
+    assert len(engine._expiries) == 1 and engine.next_expiry() == expires_at
+
+    # The trigger rests the remainder at 101 without scheduling its expiry again
+    engine.process_order(buy('1', '101', TimeInForce.GTC))
+    assert stop.status == OrderStatus.PARTIAL and engine.order_book.bids.best_price() == Decimal('101')
+    assert len(engine._expiries) == 1 and engine.next_expiry() == expires_at
+
+    clock['now'] = expires_at
+    assert engine.expire_orders(clock['now']) == [stop]
+    assert engine.next_expiry() is None and not engine._expiries
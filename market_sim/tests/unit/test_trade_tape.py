@@ -0,0 +1,52 @@
+"""Tests for the columnar trade tape."""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import numpy as np
+import pytest
+from core.data.trade_tape import TradeTape, decimal_from_fields, decimal_to_fields
+from core.models.base import Trade
+
+T0 = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+
+def test_tape_round_trips_trades_and_grows():
+    tape = TradeTape(capacity=2)
+    trades = [
+        Trade.create(symbol, Decimal('101.25'), Decimal('7'), 10 + i, 20 + i, timestamp=T0)
+        for i, symbol in enumerate(['AAPL', 'MSFT', 'AAPL', 'GOOGL', 'MSFT'])
+    ]
+    tape.append(trades[0])
+    tape.extend(trades[1:])
+    
+    assert len(tape) == 5
+    assert tape.symbols == ['AAPL', 'MSFT', 'GOOGL']
+    assert list(tape.view()['symbol']) == [0, 1, 0, 2, 1]
+    assert list(tape) == trades
+    assert tape[-1] == trades[-1]
+    assert [t.id for t in tape[1:3]] == [trades[1].id, trades[2].id]
+
+def test_view_is_zero_copy():
+    tape = TradeTape()
+    tape.append(Trade.create('AAPL', Decimal('1.5'), Decimal('2'), 1, 2, timestamp=T0))
+    
+    view = tape.view()
+    assert np.shares_memory(view, tape._data)
+    assert view['price'][0] == 1.5
+    assert view['timestamp'][0] == np.datetime64('2025-01-02T09:30', 'ns')
+
+def test_prices_and_quantities_round_trip_exactly():
+    values = ['0.1', '101.37', '0.30', '1E+3', '-2.5', '14.28714285714285714285714286',
+              '123456789012345678901234567890.123456']
+    tape = TradeTape()
+    trades = [Trade.create('AAPL', Decimal(value), Decimal(value).copy_abs() / 3, 1, 2, timestamp=T0)
+              for value in values]
+    tape.extend(trades)
+    
+    for stored, trade in zip(tape, trades):
+        # Same value and exponent, not the nearest float's shortest repr
+        assert str(stored.price) == str(trade.price) and str(stored.quantity) == str(trade.quantity)
+    assert tape.view()['price'][0] == 0.1
+    assert decimal_from_fields(*decimal_to_fields(None)) is None
+    with pytest.raises(ValueError):
+        decimal_to_fields(Decimal('1' * 37))
@@ -0,0 +1,92 @@
+"""A vectorized noise trader population keeps every trader within its own means."""
+
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import numpy as np
+from core.models.base import Order, OrderSide, OrderStatus, Trade
+from market.agents.trader_population import TraderPopulation
+from simulation.engine.simulation_engine import MarketSimulation
+
+START = datetime(2025, 1, 2, 9, 30, tzinfo=timezone.utc)
+SYMBOLS = ['AAA', 'BBB']
+
+def run(seed):
+    sim = MarketSimulation(START, START + timedelta(seconds=3), seed=seed)
+    for symbol in SYMBOLS:
+        sim.add_exchange(symbol)
+        # Deep liquidity from outside the simulation's agents
+        for side, price in ((OrderSide.BUY, '99'), (OrderSide.SELL, '101')):
+            sim.schedule_event(START, 'order', Order.create_limit_order(
+                symbol, side, Decimal('1000000'), Decimal(price), 'LP', START))
+    population = TraderPopulation('CROWD', 2_000, Decimal('500'), SYMBOLS, trade_frequency=0.05,
+                                  max_trade_size=Decimal('4'))
+    sim.add_agent(population)
+    results = sim.run()
+    return sim, population, results
+
+def test_population_trades_within_each_traders_means():
+    sim, population, results = run(seed=11)
+    trades = results['trades']
+    assert len(trades) > 100
+    assert {trade.price for trade in trades} == {Decimal('99'), Decimal('101')}
+    # Sells only come from traders holding the symbol, buys from traders with the cash
+    assert population.cash.min() >= 0 and population.holdings.min() >= 0
+    assert sim.gateway.rejected == 0
+    # Per-trader books add up to the agent's own
+    positions = [float(population.positions[symbol].quantity) for symbol in SYMBOLS]
+    assert np.allclose(population.holdings.sum(axis=0), positions)
+    assert np.isclose(population.cash.sum(), float(population.balance))
+    assert (population.holdings > 0).any(axis=1).sum() > 100
+
+def test_population_is_reproducible():
+    _, first, first_results = run(seed=5)
+    _, second, second_results = run(seed=5)
+    _, other, _ = run(seed=6)
+    assert np.array_equal(first.holdings, second.holdings)
+    assert np.array_equal(first_results['trade_tape'], second_results['trade_tape'])
+    assert not np.array_equal(first.holdings, other.holdings)
+
+def fill(order, quantity, price):
+    """Fill part of a population order from outside the simulation."""
+    order.filled_quantity += quantity
+    order.remaining_quantity -= quantity
+    order.status = OrderStatus.FILLED if not order.remaining_quantity else OrderStatus.PARTIAL
+    buyer, seller = (order.id, 0) if order.side == OrderSide.BUY else (0, order.id)
+    return Trade.create(order.symbol, price, quantity, buyer, seller, START)
+
+def test_orders_working_across_ticks_stay_booked_and_reserved():
+    population = TraderPopulation('CROWD', 50, Decimal('10'), SYMBOLS, trade_frequency=1.0,
+                                  max_trade_size=Decimal('1'))
+    population.rng.seed(3)
+    population.holdings[:, 1] = 1
+    population.best_bids[:] = 9
+    population.best_asks[:] = 10
+    first = population.decide(START)
+    buys = [order for order in first if order.side == OrderSide.BUY]
+    sells = [order for order in first if order.side == OrderSide.SELL]
+    assert buys and sells and all(order.symbol == 'BBB' for order in sells)
+    assert population.reserved_cash.sum() == 10 * len(buys)
+    assert population.reserved_holdings.sum() == len(sells)
+
+    # A trader's working buy takes all its cash and its working sell all its
+    # holding, and later ticks keep the first tick's owners
+    def committed(orders, side):
+        return {population._owners[order.id][0] for order in orders if order.side == side}
+    second = population.decide(START + timedelta(seconds=1))
+    assert committed(second, OrderSide.SELL) and committed(second, OrderSide.BUY)
+    assert not committed(first, OrderSide.BUY) & committed(second, OrderSide.BUY)
+    assert not committed(first, OrderSide.SELL) & committed(second, OrderSide.SELL)
+    assert all(order.id in population._owners for order in first)
+    population.on_order_fill(buys[0], fill(buys[0], Decimal('1'), Decimal('12')))
+    population.on_order_fill(sells[0], fill(sells[0], Decimal('1'), Decimal('9')))
+    for order in buys[1:] + sells[1:] + second:
+        order.status = OrderStatus.CANCELLED
+        population.on_order_done(order)
+
+    assert population._owners == {} and not population.orders
+    assert np.allclose(population.reserved_cash, 0) and np.allclose(population.reserved_holdings, 0)
+    assert population.cash.sum() == 10 * 50 - 12 + 9
+    expected = {'AAA': 0, 'BBB': 49}
+    expected[buys[0].symbol] += 1
+    assert population.holdings.sum(axis=0).tolist() == [expected[symbol] for symbol in SYMBOLS]